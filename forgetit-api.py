@@ -1,9 +1,49 @@
-from fastapi import FastAPI, HTTPException, Depends, Query
-from pydantic import BaseModel, Field
-from typing import Dict, List, Optional, Any
+from fastapi import FastAPI, HTTPException, Depends, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel, Field, ValidationError
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Any
 from datetime import datetime, timedelta
+import asyncio
+import base64
+import binascii
+import hashlib
+import heapq
+import itertools
+import json
+import logging
 import math
+import mmap
+import os
+import pickle
+import queue
+import re
+import signal
+import sqlite3
+import struct
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
 import uuid
+import zlib
+from abc import ABC, abstractmethod
+from array import array
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from multiprocessing.connection import Client, Listener
+import numpy as np
+from sortedcontainers import SortedList
+try:
+    import orjson
+except ImportError:  # Optional: responses fall back to the standard library encoder
+    orjson = None
+try:
+    import zstandard
+except ImportError:  # Optional: contents are compressed with zlib instead
+    zstandard = None
 from fastapi.middleware.cors import CORSMiddleware
 
 # Initialize FastAPI app
@@ -44,6 +84,28 @@ class ResourceResponse(ResourceBase):
     class Config:
         orm_mode = True
 
+class ResourceSummary(ResourceBase):
+    """Default representation of resources in listings: every field except the content"""
+    id: str
+    created_at: datetime
+    last_accessed: datetime
+    access_count: int = 0
+    memory_buoyancy: float = 0.0
+    preservation_value: float = 0.0
+
+class SearchMatch(ResourceSummary):
+    """A resource found by GET /search, with its relevance score"""
+    score: float
+
+class RelatedResource(ResourceSummary):
+    """A resource found by GET /resources/{resource_id}/related, with its estimated Jaccard similarity"""
+    similarity: float
+
+class ResourceCluster(BaseModel):
+    """A cluster of GET /resources/clusters: its number of resources and the most buoyant of them"""
+    size: int
+    resources: List[ResourceSummary]
+
 class ResourceUpdate(BaseModel):
     title: Optional[str] = None
     content: Optional[str] = None
@@ -55,18 +117,50 @@ class AccessLog(BaseModel):
     timestamp: datetime
     access_type: str = Field(..., description="Type of access e.g., 'view', 'edit', 'share'")
 
-# In-memory database for demonstration purposes
-resources_db: Dict[str, Dict] = {}
-access_logs: List[Dict] = []
+# Storage backend: "memory" (default) keeps all state in process memory,
+# "sqlite" persists resources and access events to FORGETIT_SQLITE_PATH,
+# "sharded" talks to the shard processes started by forgetit-cluster.py
+STORAGE_BACKEND = os.environ.get("FORGETIT_STORAGE", "memory").lower()
+SQLITE_PATH = os.environ.get("FORGETIT_SQLITE_PATH", "forgetit.db")
+SHARD_SOCKETS = [path for path in os.environ.get("FORGETIT_SHARD_SOCKETS", "").split(",") if path]
+SHARD_AUTHKEY = bytes.fromhex(os.environ.get("FORGETIT_SHARD_AUTHKEY", ""))
+
+# Durable in-memory mode: with FORGETIT_WAL_DIR set, the memory backend logs
+# every change there and takes periodic snapshots so it survives restarts
+WAL_DIR = os.environ.get("FORGETIT_WAL_DIR")
+WAL_FSYNC_INTERVAL = float(os.environ.get("FORGETIT_WAL_FSYNC_INTERVAL", "0.05"))
+SNAPSHOT_INTERVAL = float(os.environ.get("FORGETIT_SNAPSHOT_INTERVAL", "300"))
+
+# Lazy mode: Memory Buoyancy is evaluated in closed form whenever it is read or
+# filtered instead of being refreshed by periodic POST /update-metrics sweeps
+LAZY_MEMORY_BUOYANCY = os.environ.get("FORGETIT_LAZY_MB", "").lower() in ("1", "true", "yes")
+
+# Content type factors (some types may have inherently higher preservation value)
+CONTENT_TYPE_FACTORS = {
+    "document": 0.7,
+    "image": 0.8,
+    "email": 0.5,
+    "note": 0.4,
+    "code": 0.6
+}
+
+# Tags that indicate higher preservation value
+PRESERVATION_TAGS = ["important", "archive", "historical", "reference"]
+
+# Managed-forgetting thresholds of the candidate sets
+LOW_BUOYANCY_THRESHOLD = 0.3  # Memory Buoyancy below
+ARCHIVE_THRESHOLDS = (0.3, 0.7)  # Memory Buoyancy below, Preservation Value above
+DELETION_THRESHOLDS = (0.2, 0.2)  # Memory Buoyancy below, Preservation Value below
 
 # Helper functions for calculating Memory Buoyancy and Preservation Value
-def calculate_memory_buoyancy(resource: Dict) -> float:
+def calculate_memory_buoyancy(resource: Dict, now: Optional[datetime] = None) -> float:
     """
     Calculate Memory Buoyancy based on recency, frequency, and context
     
     Higher values mean the resource should be more accessible.
     """
-    now = datetime.now()
+    if now is None:
+        now = datetime.now()
     
     # Calculate recency factor (decreases with time since last access)
     time_diff = (now - resource["last_accessed"]).total_seconds() / 86400  # Convert to days
@@ -88,27 +182,113 @@ def calculate_memory_buoyancy(resource: Dict) -> float:
     
     return min(1.0, max(0.0, mb))  # Ensure value is between 0 and 1
 
-def calculate_preservation_value(resource: Dict) -> float:
+def memory_buoyancy_base(resource: Dict) -> float:
+    """
+    Time-independent part of Memory Buoyancy (frequency, context and tag factors)
+    
+    Together with the decay anchor (last_accessed) this determines Memory
+    Buoyancy at any point in time, see memory_buoyancy_at.
+    """
+    frequency_factor = min(1.0, resource["access_count"] / 10)
+    context_factor = 0.5
+    if resource["context"] and "importance" in resource["context"]:
+        context_factor = resource["context"]["importance"]
+    tag_factor = min(1.0, len(resource["tags"]) / 5)
+    
+    return (0.3 * frequency_factor) + (0.2 * context_factor) + (0.1 * tag_factor)
+
+def memory_buoyancy_at(base: float, last_accessed: datetime, now: datetime) -> float:
+    """Evaluate Memory Buoyancy in closed form from its base and decay anchor"""
+    time_diff = (now - last_accessed).total_seconds() / 86400
+    mb = (0.4 * math.exp(-0.1 * time_diff)) + base
+    
+    return min(1.0, max(0.0, mb))
+
+def memory_buoyancy_crossing(base: float, last_accessed: datetime, threshold: float) -> Optional[datetime]:
+    """
+    Time at which Memory Buoyancy decays to `threshold`, or None if it never
+    does (its base alone is at least the threshold)
+    """
+    if base >= threshold:
+        return None
+    ratio = (threshold - base) / 0.4
+    if ratio >= 1.0:
+        return last_accessed
+    
+    return last_accessed + timedelta(days=-10 * math.log(ratio))
+
+def preservation_value_crossing(resource: Dict, threshold: float, inclusive: bool) -> Optional[datetime]:
+    """
+    Time at which Preservation Value rises above `threshold` (or to it, if
+    `inclusive`), or None if it never does
+    
+    Only its age factor changes over time: 0.3 * days / 365 during the first
+    year, on top of the value at creation.
+    """
+    def crossed(days: int) -> bool:
+        pv = calculate_preservation_value(resource, resource["created_at"] + timedelta(days=days))
+        return pv >= threshold if inclusive else pv > threshold
+    
+    if not crossed(365):
+        return None
+    initial = calculate_preservation_value(resource, resource["created_at"])
+    days = min(365, max(0, math.ceil((threshold - initial) / 0.3 * 365)))
+    # Rounding can put the estimate a day off
+    while days > 0 and crossed(days - 1):
+        days -= 1
+    while not crossed(days):
+        days += 1
+    
+    return resource["created_at"] + timedelta(days=days)
+
+def candidate_sets(resource: Dict) -> frozenset:
+    """Names of the managed-forgetting candidate sets a resource currently belongs to"""
+    mb, pv = resource["memory_buoyancy"], resource["preservation_value"]
+    sets = set()
+    if mb < LOW_BUOYANCY_THRESHOLD:
+        sets.add("low-buoyancy")
+    if mb < ARCHIVE_THRESHOLDS[0] and pv > ARCHIVE_THRESHOLDS[1]:
+        sets.add("archive")
+    if mb < DELETION_THRESHOLDS[0] and pv < DELETION_THRESHOLDS[1]:
+        sets.add("deletion")
+    
+    return frozenset(sets)
+
+def candidate_set_codes(memory_buoyancy: np.ndarray, preservation_value: np.ndarray) -> np.ndarray:
+    """Vectorized candidate_sets, as one bit per set, for comparing memberships"""
+    low_buoyancy = memory_buoyancy < LOW_BUOYANCY_THRESHOLD
+    archive = (memory_buoyancy < ARCHIVE_THRESHOLDS[0]) & (preservation_value > ARCHIVE_THRESHOLDS[1])
+    deletion = (memory_buoyancy < DELETION_THRESHOLDS[0]) & (preservation_value < DELETION_THRESHOLDS[1])
+    return low_buoyancy.astype(np.int8) | (archive.astype(np.int8) << 1) | (deletion.astype(np.int8) << 2)
+
+def candidate_changes(resource_ids: List[str], before: tuple, after: tuple) -> List[tuple]:
+    """
+    (scores, candidate sets before) of the resources whose candidate sets differ
+    between the aligned (memory_buoyancy, preservation_value) arrays `before`
+    and `after`, as forgetting events are recorded from
+    """
+    changes = []
+    for row in np.flatnonzero(candidate_set_codes(*before) != candidate_set_codes(*after)).tolist():
+        previous = {"memory_buoyancy": float(before[0][row]), "preservation_value": float(before[1][row])}
+        scores = {"id": resource_ids[row], "memory_buoyancy": float(after[0][row]), "preservation_value": float(after[1][row])}
+        changes.append((scores, candidate_sets(previous)))
+    return changes
+
+def calculate_preservation_value(resource: Dict, now: Optional[datetime] = None) -> float:
     """
     Calculate Preservation Value based on content type, age, tags, and context
     
     Higher values mean the resource is more important for long-term preservation.
     """
-    now = datetime.now()
+    if now is None:
+        now = datetime.now()
     
     # Calculate age factor (older resources may have higher historical value)
     age_days = (now - resource["created_at"]).days
     age_factor = min(1.0, age_days / 365)  # Increases with age, caps at 1.0 after a year
     
-    # Content type factor (some types may have inherently higher preservation value)
-    content_type_factors = {
-        "document": 0.7,
-        "image": 0.8,
-        "email": 0.5,
-        "note": 0.4,
-        "code": 0.6
-    }
-    content_type_factor = content_type_factors.get(resource["content_type"].lower(), 0.5)
+    # Content type factor
+    content_type_factor = CONTENT_TYPE_FACTORS.get(resource["content_type"].lower(), 0.5)
     
     # Calculate context preservation factor
     preservation_factor = 0.5  # Default value
@@ -116,8 +296,7 @@ def calculate_preservation_value(resource: Dict) -> float:
         preservation_factor = resource["context"]["preservation_importance"]
     
     # Tag-based factors (certain tags might indicate higher preservation value)
-    preservation_tags = ["important", "archive", "historical", "reference"]
-    tag_matches = sum(1 for tag in resource["tags"] if tag.lower() in preservation_tags)
+    tag_matches = sum(1 for tag in resource["tags"] if tag.lower() in PRESERVATION_TAGS)
     tag_factor = min(1.0, tag_matches / 2)  # Cap at 1.0
     
     # Combine factors
@@ -125,186 +304,5436 @@ def calculate_preservation_value(resource: Dict) -> float:
     
     return min(1.0, max(0.0, pv))  # Ensure value is between 0 and 1
 
-# Routes
-@app.get("/")
-def read_root():
-    return {"message": "Welcome to the ForgetIT API", "version": "1.0.0"}
+# Columnar score store used for full-store recomputes
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECONDS_PER_DAY = 86400 * 1_000_000
 
-@app.post("/resources/", response_model=ResourceResponse)
-def create_resource(resource: ResourceCreate):
-    """Create a new resource with initial Memory Buoyancy and Preservation Value"""
-    resource_id = str(uuid.uuid4())
-    now = datetime.now()
+# Content type codes; code 0 is reserved for unknown types (factor 0.5)
+_CONTENT_TYPE_CODES = {content_type: code for code, content_type in enumerate(CONTENT_TYPE_FACTORS, start=1)}
+_CONTENT_TYPE_FACTOR_TABLE = np.array([0.5] + list(CONTENT_TYPE_FACTORS.values()))
+
+def _to_microseconds(timestamp: datetime) -> int:
+    """Convert a naive datetime into integer microseconds since the epoch"""
+    return (timestamp - _EPOCH) // timedelta(microseconds=1)
+
+def _from_microseconds(microseconds: int) -> datetime:
+    """Inverse of _to_microseconds"""
+    return _EPOCH + timedelta(microseconds=int(microseconds))
+
+def scoring_inputs(resource: Dict) -> Dict[str, Any]:
+    """Time-independent scoring inputs of a resource, as stored by the columnar backends"""
+    context = resource["context"] or {}
+    return {
+        "importance": context.get("importance", 0.5),
+        "preservation_importance": context.get("preservation_importance", 0.5),
+        "tag_count": len(resource["tags"]),
+        "preservation_tag_count": sum(1 for tag in resource["tags"] if tag.lower() in PRESERVATION_TAGS),
+        "content_type_code": _CONTENT_TYPE_CODES.get(resource["content_type"].lower(), 0),
+        "memory_buoyancy_base": memory_buoyancy_base(resource)
+    }
+
+class ScoreStore:
+    """
+    Columnar, NumPy-backed copy of the scoring inputs and stored scores of all
+    resources
     
-    resource_dict = resource.dict()
-    resource_dict.update({
-        "id": resource_id,
-        "created_at": now,
-        "last_accessed": now,
-        "access_count": 0
-    })
+    Rows are kept dense (deleting a resource moves the last row into the freed
+    slot), so a full recompute is a handful of vectorized expressions evaluated
+    against one shared `now`. The results match calculate_memory_buoyancy and
+    calculate_preservation_value. The stored scores let rankings over all
+    resources be selected with vectorized expressions as well.
+    """
     
-    # Calculate initial metrics
-    resource_dict["memory_buoyancy"] = calculate_memory_buoyancy(resource_dict)
-    resource_dict["preservation_value"] = calculate_preservation_value(resource_dict)
+    def __init__(self, capacity: int = 1024):
+        self.ids: List[str] = []
+        self.rows: Dict[str, int] = {}
+        self.last_accessed = np.zeros(capacity, dtype=np.int64)  # Microseconds since epoch
+        self.created_at = np.zeros(capacity, dtype=np.int64)  # Microseconds since epoch
+        self.access_count = np.zeros(capacity, dtype=np.int64)
+        self.importance = np.zeros(capacity, dtype=np.float64)
+        self.preservation_importance = np.zeros(capacity, dtype=np.float64)
+        self.tag_count = np.zeros(capacity, dtype=np.int64)
+        self.preservation_tag_count = np.zeros(capacity, dtype=np.int64)
+        self.content_type_code = np.zeros(capacity, dtype=np.int8)
+        self.memory_buoyancy_base = np.zeros(capacity, dtype=np.float64)
+        self.memory_buoyancy = np.zeros(capacity, dtype=np.float64)  # Stored scores, see set_scores
+        self.preservation_value = np.zeros(capacity, dtype=np.float64)
+        self.search_document = np.full(capacity, -1, dtype=np.int64)  # Document number in the search index, -1 if none
     
-    resources_db[resource_id] = resource_dict
+    def __len__(self) -> int:
+        return len(self.ids)
     
-    return resource_dict
+    def _columns(self) -> List[str]:
+        return [
+            "last_accessed", "created_at", "access_count", "importance",
+            "preservation_importance", "tag_count", "preservation_tag_count",
+            "content_type_code", "memory_buoyancy_base", "memory_buoyancy", "preservation_value",
+            "search_document"
+        ]
+    
+    def _grow(self):
+        for name in self._columns():
+            column = getattr(self, name)
+            grown = np.zeros(len(column) * 2, dtype=column.dtype)
+            grown[:len(column)] = column
+            setattr(self, name, grown)
+    
+    def upsert(self, resource: Dict) -> int:
+        """Insert or refresh the row holding the scoring inputs of a resource"""
+        row = self.rows.get(resource["id"])
+        if row is None:
+            if len(self.ids) == len(self.last_accessed):
+                self._grow()
+            row = len(self.ids)
+            self.rows[resource["id"]] = row
+            self.ids.append(resource["id"])
+            self.search_document[row] = -1
+        
+        self.last_accessed[row] = _to_microseconds(resource["last_accessed"])
+        self.created_at[row] = _to_microseconds(resource["created_at"])
+        self.access_count[row] = resource["access_count"]
+        for name, value in scoring_inputs(resource).items():
+            getattr(self, name)[row] = value
+        
+        return row
+    
+    def remove(self, resource_id: str):
+        """Remove a resource, moving the last row into its slot"""
+        row = self.rows.pop(resource_id, None)
+        if row is None:
+            return
+        last = len(self.ids) - 1
+        last_id = self.ids.pop()
+        if row != last:
+            for name in self._columns():
+                column = getattr(self, name)
+                column[row] = column[last]
+            self.ids[row] = last_id
+            self.rows[last_id] = row
+    
+    def set_scores(self, rows, memory_buoyancy, preservation_value):
+        """Record the stored scores of a row, of `rows`, or of every row if `rows` is None"""
+        selected = slice(0, len(self.ids)) if rows is None else rows
+        self.memory_buoyancy[selected] = memory_buoyancy
+        self.preservation_value[selected] = preservation_value
+    
+    def compute(self, now: datetime, rows: Optional[np.ndarray] = None):
+        """
+        Return (memory_buoyancy, preservation_value) arrays aligned with self.ids,
+        or with `rows` if only a subset of the store is scored
+        """
+        selected = slice(0, len(self.ids)) if rows is None else rows
+        now_us = _to_microseconds(now)
+        
+        # Memory Buoyancy
+        time_diff = ((now_us - self.last_accessed[selected]) / 1_000_000) / 86400
+        recency_factor = np.exp(-0.1 * time_diff)
+        frequency_factor = np.minimum(1.0, self.access_count[selected] / 10)
+        tag_factor = np.minimum(1.0, self.tag_count[selected] / 5)
+        mb = (0.4 * recency_factor) + (0.3 * frequency_factor) + (0.2 * self.importance[selected]) + (0.1 * tag_factor)
+        
+        # Preservation Value
+        age_days = (now_us - self.created_at[selected]) // _MICROSECONDS_PER_DAY
+        age_factor = np.minimum(1.0, age_days / 365)
+        content_type_factor = _CONTENT_TYPE_FACTOR_TABLE[self.content_type_code[selected]]
+        preservation_tag_factor = np.minimum(1.0, self.preservation_tag_count[selected] / 2)
+        pv = (0.3 * age_factor) + (0.2 * content_type_factor) + (0.3 * self.preservation_importance[selected]) + (0.2 * preservation_tag_factor)
+        
+        return np.clip(mb, 0.0, 1.0), np.clip(pv, 0.0, 1.0)
+    
+    def memory_buoyancy_at(self, now: datetime, rows: Optional[np.ndarray] = None):
+        """Closed-form Memory Buoyancy aligned with self.ids or `rows` (see memory_buoyancy_at)"""
+        selected = slice(0, len(self.ids)) if rows is None else rows
+        time_diff = ((_to_microseconds(now) - self.last_accessed[selected]) / 1_000_000) / 86400
+        mb = (0.4 * np.exp(-0.1 * time_diff)) + self.memory_buoyancy_base[selected]
+        
+        return np.clip(mb, 0.0, 1.0)
 
-@app.get("/resources/", response_model=List[ResourceResponse])
-def list_resources(
-    min_mb: Optional[float] = Query(None, ge=0.0, le=1.0, description="Minimum Memory Buoyancy"),
-    min_pv: Optional[float] = Query(None, ge=0.0, le=1.0, description="Minimum Preservation Value"),
-    sort_by: Optional[str] = Query("memory_buoyancy", description="Sort by field")
-):
-    """List resources with optional filtering by Memory Buoyancy and Preservation Value"""
-    filtered_resources = list(resources_db.values())
+class ScoreIndex:
+    """
+    Sorted secondary index of (value, resource_id) keys for one resource field
+    
+    Range queries and ordered iteration cost O(log n + k) instead of a full
+    scan and sort.
+    """
     
-    # Apply filters
-    if min_mb is not None:
-        filtered_resources = [r for r in filtered_resources if r["memory_buoyancy"] >= min_mb]
+    def __init__(self, field: str):
+        self.field = field
+        self.keys = SortedList()
+        self.current: Dict[str, tuple] = {}
     
-    if min_pv is not None:
-        filtered_resources = [r for r in filtered_resources if r["preservation_value"] >= min_pv]
+    def update(self, resource: Dict):
+        """Insert or move the key of a resource after its value changed"""
+        key = (resource[self.field], resource["id"])
+        old_key = self.current.get(resource["id"])
+        if old_key == key:
+            return
+        if old_key is not None:
+            self.keys.remove(old_key)
+        self.keys.add(key)
+        self.current[resource["id"]] = key
     
-    # Sort resources
-    if sort_by == "memory_buoyancy":
-        filtered_resources.sort(key=lambda x: x["memory_buoyancy"], reverse=True)
-    elif sort_by == "preservation_value":
-        filtered_resources.sort(key=lambda x: x["preservation_value"], reverse=True)
-    elif sort_by == "last_accessed":
-        filtered_resources.sort(key=lambda x: x["last_accessed"], reverse=True)
+    def remove(self, resource_id: str):
+        old_key = self.current.pop(resource_id, None)
+        if old_key is not None:
+            self.keys.remove(old_key)
     
-    return filtered_resources
+    def rebuild(self, resources):
+        """Rebuild the index in bulk, e.g. after a full recompute"""
+        self.current = {resource["id"]: (resource[self.field], resource["id"]) for resource in resources}
+        self.keys = SortedList(self.current.values())
+    
+    def add_many(self, resources: List[Dict]):
+        """Add keys for resources that are not indexed yet in one bulk update"""
+        keys = [(resource[self.field], resource["id"]) for resource in resources]
+        self.keys.update(keys)
+        self.current.update((key[1], key) for key in keys)
+    
+    def descending(self, minimum: Optional[Any] = None, after: Optional[tuple] = None) -> Iterator[tuple]:
+        """
+        Iterate (value, resource_id) keys from the highest value down to
+        `minimum` (inclusive), starting strictly below the key `after` if given
+        """
+        return self.keys.irange(
+            minimum=None if minimum is None else (minimum,),
+            maximum=after,
+            inclusive=(True, False),
+            reverse=True
+        )
+    
+    def ascending_below(self, maximum: Any) -> Iterator[tuple]:
+        """Iterate (value, resource_id) keys with a value strictly below `maximum`, lowest first"""
+        return self.keys.irange(maximum=(maximum,), inclusive=(True, False))
 
-@app.get("/resources/{resource_id}", response_model=ResourceResponse)
-def get_resource(resource_id: str):
-    """Get a specific resource by ID and update its access metrics"""
-    if resource_id not in resources_db:
-        raise HTTPException(status_code=404, detail="Resource not found")
+SCORE_GRID_CELLS = int(os.environ.get("FORGETIT_SCORE_GRID_CELLS", "32"))
+
+class ScoreGrid:
+    """
+    Bucketed 2-D index of resources by (memory_buoyancy, preservation_value)
     
-    resource = resources_db[resource_id]
+    Both scores lie in [0, 1], which is split into `cells` equal buckets per
+    axis. A range query only visits the cells overlapping the requested
+    rectangle, so candidate queries cost roughly the number of matching
+    resources instead of a full scan. Callers apply the exact predicate to
+    the returned ids, since boundary cells can also hold non-matching resources.
+    """
     
-    # Log the access
-    access_log = {
-        "resource_id": resource_id,
-        "timestamp": datetime.now(),
-        "access_type": "view"
-    }
-    access_logs.append(access_log)
+    def __init__(self, cells: int = SCORE_GRID_CELLS):
+        self.cells = cells
+        self.grid: List[set] = [set() for _ in range(cells * cells)]
+        self.current: Dict[str, int] = {}
     
-    # Update resource metrics
-    resource["last_accessed"] = access_log["timestamp"]
-    resource["access_count"] += 1
-    resource["memory_buoyancy"] = calculate_memory_buoyancy(resource)
+    def _bucket(self, value: float) -> int:
+        return min(self.cells - 1, max(0, int(value * self.cells)))
+    
+    def _cell(self, resource: Dict) -> int:
+        return self._bucket(resource["memory_buoyancy"]) * self.cells + self._bucket(resource["preservation_value"])
+    
+    def update(self, resource: Dict):
+        """Insert or move a resource after its scores changed"""
+        cell = self._cell(resource)
+        old_cell = self.current.get(resource["id"])
+        if old_cell == cell:
+            return
+        if old_cell is not None:
+            self.grid[old_cell].discard(resource["id"])
+        self.grid[cell].add(resource["id"])
+        self.current[resource["id"]] = cell
+    
+    def remove(self, resource_id: str):
+        old_cell = self.current.pop(resource_id, None)
+        if old_cell is not None:
+            self.grid[old_cell].discard(resource_id)
     
-    return resource
+    def rebuild(self, resources):
+        """Rebuild the grid in bulk, e.g. after a full recompute"""
+        self.grid = [set() for _ in range(self.cells * self.cells)]
+        self.current = {}
+        self.add_many(resources)
+    
+    def add_many(self, resources):
+        for resource in resources:
+            cell = self._cell(resource)
+            self.grid[cell].add(resource["id"])
+            self.current[resource["id"]] = cell
+    
+    def query(self, memory_buoyancy: tuple = (0.0, 1.0), preservation_value: tuple = (0.0, 1.0)) -> Iterator[str]:
+        """Yield the ids in all cells overlapping the closed (low, high) ranges of both scores"""
+        mb_cells = range(self._bucket(memory_buoyancy[0]), self._bucket(memory_buoyancy[1]) + 1)
+        pv_cells = range(self._bucket(preservation_value[0]), self._bucket(preservation_value[1]) + 1)
+        for mb_cell in mb_cells:
+            for pv_cell in pv_cells:
+                yield from self.grid[mb_cell * self.cells + pv_cell]
 
-@app.put("/resources/{resource_id}", response_model=ResourceResponse)
-def update_resource(resource_id: str, update_data: ResourceUpdate):
-    """Update a resource and recalculate its metrics"""
-    if resource_id not in resources_db:
-        raise HTTPException(status_code=404, detail="Resource not found")
+# Filters matching less than this share of the resources are listed from their
+# postings instead of walking a sorted score index
+TAG_FILTER_SELECTIVITY = 0.1
+
+class TagIndex:
+    """
+    Inverted index from tags and content types to the ids of their resources
     
-    resource = resources_db[resource_id]
+    Filters intersect the postings of the requested values, smallest first,
+    and facets are computed from the postings of the matching resources, so
+    both cost time proportional to the postings involved rather than to the
+    size of the store. Tags and content types are matched exactly.
+    """
     
-    # Update fields
-    update_dict = update_data.dict(exclude_unset=True)
-    for field, value in update_dict.items():
-        resource[field] = value
+    def __init__(self):
+        self.tags: Dict[str, set] = {}
+        self.content_types: Dict[str, set] = {}
+        self.current: Dict[str, tuple] = {}  # resource id -> (tags, content type)
     
-    # Log the access
-    access_log = {
-        "resource_id": resource_id,
-        "timestamp": datetime.now(),
-        "access_type": "edit"
-    }
-    access_logs.append(access_log)
+    @staticmethod
+    def _discard(postings: Dict[str, set], value: str, resource_id: str):
+        resource_ids = postings[value]
+        resource_ids.discard(resource_id)
+        if not resource_ids:
+            del postings[value]
     
-    # Update resource metrics
-    resource["last_accessed"] = access_log["timestamp"]
-    resource["access_count"] += 1
-    resource["memory_buoyancy"] = calculate_memory_buoyancy(resource)
-    resource["preservation_value"] = calculate_preservation_value(resource)
+    def update(self, resource: Dict):
+        """Insert or move the postings of a resource after its tags or content type changed"""
+        entry = (frozenset(resource["tags"]), resource["content_type"])
+        if self.current.get(resource["id"]) == entry:
+            return
+        self.remove(resource["id"])
+        tags, content_type = entry
+        for tag in tags:
+            self.tags.setdefault(tag, set()).add(resource["id"])
+        self.content_types.setdefault(content_type, set()).add(resource["id"])
+        self.current[resource["id"]] = entry
+    
+    def remove(self, resource_id: str):
+        entry = self.current.pop(resource_id, None)
+        if entry is None:
+            return
+        tags, content_type = entry
+        for tag in tags:
+            self._discard(self.tags, tag, resource_id)
+        self._discard(self.content_types, content_type, resource_id)
+    
+    def add_many(self, resources):
+        for resource in resources:
+            self.update(resource)
+    
+    def matching(self, tags: Optional[List[str]] = None, content_type: Optional[str] = None) -> Optional[set]:
+        """Ids of the resources with all of `tags` and the given content type, or None without filters"""
+        postings = [self.tags.get(tag, set()) for tag in tags or ()]
+        if content_type is not None:
+            postings.append(self.content_types.get(content_type, set()))
+        if not postings:
+            return None
+        postings.sort(key=len)
+        return postings[0].intersection(*postings[1:])
     
-    return resource
+    def groups(self, resource_ids: Optional[set] = None) -> tuple:
+        """(tag -> ids, content type -> ids) of all resources, or of `resource_ids` only"""
+        if resource_ids is None:
+            return self.tags, self.content_types
+        tags: Dict[str, list] = {}
+        content_types: Dict[str, list] = {}
+        for resource_id in resource_ids:
+            resource_tags, content_type = self.current[resource_id]
+            for tag in resource_tags:
+                tags.setdefault(tag, []).append(resource_id)
+            content_types.setdefault(content_type, []).append(resource_id)
+        return tags, content_types
 
-@app.delete("/resources/{resource_id}")
-def delete_resource(resource_id: str):
-    """Delete a resource"""
-    if resource_id not in resources_db:
-        raise HTTPException(status_code=404, detail="Resource not found")
+SUMMARY_BINS = int(os.environ.get("FORGETIT_SUMMARY_BINS", "20"))
+
+class ScoreHistograms:
+    """
+    Fixed-bin histograms and running sums of both scores, over all resources
+    and per tag and content type
     
-    del resources_db[resource_id]
+    No per-resource state is kept: callers pass the previous and the new entry
+    of a changed resource, (tag index entry, Memory Buoyancy, Preservation
+    Value), as read from the tag and score indexes, and only the aggregates it
+    moves between are adjusted. Reading the aggregates costs O(groups * bins)
+    however many resources are stored. An aggregate is [count, Memory Buoyancy
+    sum, Preservation Value sum, Memory Buoyancy bin counts, Preservation Value
+    bin counts], with `bins` equal bins over [0, 1].
+    """
     
-    return {"status": "success", "message": "Resource deleted"}
+    def __init__(self, bins: int = SUMMARY_BINS):
+        self.bins = bins
+        self.total = self._empty()
+        self.tags: Dict[str, list] = {}
+        self.content_types: Dict[str, list] = {}
+    
+    def _empty(self) -> list:
+        return [0, 0.0, 0.0, [0] * self.bins, [0] * self.bins]
+    
+    def _bin(self, value: float) -> int:
+        return min(self.bins - 1, max(0, int(value * self.bins)))
+    
+    def _add(self, groups: tuple, count: int, memory_buoyancy: float, preservation_value: float, mb_bins, pv_bins):
+        """
+        Add a change to the total and to the aggregates of the tags and content
+        type in `groups`; `mb_bins` and `pv_bins` are (bin, count change) pairs
+        """
+        tags, content_type = groups
+        targets = [(None, None), (self.content_types, content_type)]
+        targets.extend((self.tags, tag) for tag in tags)
+        for aggregates, value in targets:
+            aggregate = self.total if aggregates is None else aggregates.get(value)
+            if aggregate is None:
+                aggregate = aggregates[value] = self._empty()
+            aggregate[0] += count
+            aggregate[1] += memory_buoyancy
+            aggregate[2] += preservation_value
+            for position, change in mb_bins:
+                aggregate[3][position] += change
+            for position, change in pv_bins:
+                aggregate[4][position] += change
+            if aggregates is not None and aggregate[0] == 0:
+                del aggregates[value]
+    
+    def move(self, old_entry: Optional[tuple], entry: Optional[tuple]):
+        """Account for a resource that was created (no `old_entry`), changed or deleted (no `entry`)"""
+        if old_entry == entry:
+            return
+        if old_entry is not None and entry is not None and old_entry[0] == entry[0]:
+            # Only the scores changed, e.g. on access: shift the sums and move
+            # between bins within the same aggregates
+            (tags, content_type), memory_buoyancy, preservation_value = entry
+            _, old_memory_buoyancy, old_preservation_value = old_entry
+            mb_bin, old_mb_bin = self._bin(memory_buoyancy), self._bin(old_memory_buoyancy)
+            pv_bin, old_pv_bin = self._bin(preservation_value), self._bin(old_preservation_value)
+            aggregates = [self.total, self.content_types[content_type]]
+            aggregates.extend(self.tags[tag] for tag in tags)
+            for aggregate in aggregates:
+                aggregate[1] += memory_buoyancy - old_memory_buoyancy
+                aggregate[2] += preservation_value - old_preservation_value
+                if mb_bin != old_mb_bin:
+                    aggregate[3][old_mb_bin] -= 1
+                    aggregate[3][mb_bin] += 1
+                if pv_bin != old_pv_bin:
+                    aggregate[4][old_pv_bin] -= 1
+                    aggregate[4][pv_bin] += 1
+            return
+        
+        for sign, moved in ((-1, old_entry), (1, entry)):
+            if moved is not None:
+                groups, memory_buoyancy, preservation_value = moved
+                self._add(
+                    groups, sign, sign * memory_buoyancy, sign * preservation_value,
+                    [(self._bin(memory_buoyancy), sign)], [(self._bin(preservation_value), sign)]
+                )
+    
+    def add_many(self, entries):
+        """
+        Add new resources in bulk: their entries are counted per distinct (tags,
+        content type) with NumPy, and each combination updates its aggregates once
+        """
+        combinations: Dict[tuple, int] = {}
+        codes, memory_buoyancy, preservation_value = [], [], []
+        for groups, mb, pv in entries:
+            codes.append(combinations.setdefault(groups, len(combinations)))
+            memory_buoyancy.append(mb)
+            preservation_value.append(pv)
+        if not codes:
+            return
+        
+        codes = np.array(codes, dtype=np.int64)
+        size = len(combinations)
+        
+        def binned(values: list) -> np.ndarray:
+            positions = np.clip((np.array(values) * self.bins).astype(np.int64), 0, self.bins - 1)
+            return np.bincount(codes * self.bins + positions, minlength=size * self.bins).reshape(size, self.bins)
+        
+        counts = np.bincount(codes, minlength=size).tolist()
+        mb_sums = np.bincount(codes, weights=memory_buoyancy, minlength=size).tolist()
+        pv_sums = np.bincount(codes, weights=preservation_value, minlength=size).tolist()
+        mb_bins, pv_bins = binned(memory_buoyancy), binned(preservation_value)
+        for groups, code in combinations.items():
+            mb_positions, pv_positions = np.flatnonzero(mb_bins[code]), np.flatnonzero(pv_bins[code])
+            self._add(
+                groups, counts[code], mb_sums[code], pv_sums[code],
+                list(zip(mb_positions.tolist(), mb_bins[code][mb_positions].tolist())),
+                list(zip(pv_positions.tolist(), pv_bins[code][pv_positions].tolist()))
+            )
+    
+    def rebuild(self, entries):
+        """Rebuild the aggregates in bulk, e.g. after a full recompute"""
+        self.total, self.tags, self.content_types = self._empty(), {}, {}
+        self.add_many(entries)
+    
+    def summary(self) -> Dict:
+        """Copies of all aggregates, in the format of ResourceRepository.score_summary"""
+        def copy(aggregate: list) -> list:
+            return aggregate[:3] + [list(aggregate[3]), list(aggregate[4])]
+        
+        return {
+            "bins": self.bins,
+            "total": copy(self.total),
+            "tags": {tag: copy(aggregate) for tag, aggregate in self.tags.items()},
+            "content_types": {value: copy(aggregate) for value, aggregate in self.content_types.items()}
+        }
 
-@app.get("/metrics/low-buoyancy", response_model=List[ResourceResponse])
-def get_low_buoyancy_resources(threshold: float = Query(0.3, ge=0.0, le=1.0)):
-    """Get resources with low Memory Buoyancy (candidates for managed forgetting)"""
-    low_mb_resources = [r for r in resources_db.values() if r["memory_buoyancy"] < threshold]
-    low_mb_resources.sort(key=lambda x: x["memory_buoyancy"])
+# Full-text search
+SEARCH_TOKEN_PATTERN = re.compile(r"\w+")
+BM25_K1 = 1.2
+BM25_B = 0.75
+SEARCH_COMPACT_MIN_DOCUMENTS = 1024  # Removed documents always tolerated in the postings
+
+def search_terms(text: str) -> List[str]:
+    """Lowercased words of a text, as they are indexed and queried"""
+    return SEARCH_TOKEN_PATTERN.findall(text.lower())
+
+def search_text(resource: Dict, content: str) -> str:
+    """The text a resource is found by: its title, tags and content"""
+    return "\n".join([resource["title"], " ".join(resource["tags"]), content])
+
+class SearchIndex:
+    """
+    Inverted index of the words of resources, ranked with BM25
+    
+    Every indexed version of a resource is a new document, numbered in
+    insertion order, and the postings of a word are two arrays of document
+    numbers and term frequencies that documents are appended to. Removing a
+    resource only clears the live flag of its document, until `compact`
+    rewrites the postings without the removed documents. A query scores the
+    live postings of its words with vectorized BM25, in time proportional to
+    those postings rather than to the size of the index.
+    """
+    
+    def __init__(self, capacity: int = 1024):
+        self.postings: Dict[str, tuple] = {}  # word -> (document numbers, term frequencies)
+        self.documents: Dict[str, int] = {}  # resource id -> document number
+        self.resource_ids: List[Optional[str]] = []  # document number -> resource id, None once removed
+        self.lengths = np.zeros(capacity, dtype=np.int64)
+        self.live = np.zeros(capacity, dtype=bool)
+        self.total_length = 0
+    
+    def __len__(self) -> int:
+        return len(self.documents)
     
-    return low_mb_resources
+    def garbage(self) -> int:
+        """Number of removed documents still in the postings"""
+        return len(self.resource_ids) - len(self.documents)
+    
+    def add(self, resource_id: str, terms: List[str]) -> int:
+        """Index the words of a resource, replacing its previous document, and return the new document number"""
+        self.remove(resource_id)
+        document = len(self.resource_ids)
+        if document == len(self.lengths):
+            self.lengths = np.concatenate([self.lengths, np.zeros_like(self.lengths)])
+            self.live = np.concatenate([self.live, np.zeros_like(self.live)])
+        self.resource_ids.append(resource_id)
+        self.documents[resource_id] = document
+        self.lengths[document] = len(terms)
+        self.live[document] = True
+        self.total_length += len(terms)
+        for term, frequency in Counter(terms).items():
+            postings = self.postings.get(term)
+            if postings is None:
+                postings = self.postings[term] = (array("I"), array("H"))
+            postings[0].append(document)
+            postings[1].append(min(frequency, 0xFFFF))
+        return document
+    
+    def remove(self, resource_id: str):
+        document = self.documents.pop(resource_id, None)
+        if document is None:
+            return
+        self.resource_ids[document] = None
+        self.live[document] = False
+        self.total_length -= int(self.lengths[document])
+    
+    def compact(self) -> np.ndarray:
+        """
+        Renumber the live documents densely and drop the postings of removed
+        ones, returning the new numbers of the old documents (-1 if removed)
+        """
+        live = self.live[:len(self.resource_ids)]
+        renumbered = np.where(live, np.cumsum(live, dtype=np.int64) - 1, -1)
+        postings = {}
+        for term, (documents, frequencies) in self.postings.items():
+            documents = np.frombuffer(documents, dtype=np.uintc)
+            kept = live[documents]
+            if kept.any():
+                postings[term] = (
+                    array("I", renumbered[documents[kept]].astype(np.uintc).tobytes()),
+                    array("H", np.frombuffer(frequencies, dtype=np.ushort)[kept].tobytes())
+                )
+        self.postings = postings
+        # A new list, so that callers still holding the old one can resolve their document numbers
+        self.resource_ids = [resource_id for resource_id in self.resource_ids if resource_id is not None]
+        self.documents = {resource_id: document for document, resource_id in enumerate(self.resource_ids)}
+        capacity = max(1024, 2 * len(self.resource_ids))
+        lengths = np.zeros(capacity, dtype=np.int64)
+        lengths[:len(self.resource_ids)] = self.lengths[:len(live)][live]
+        self.lengths = lengths
+        self.live = np.zeros(capacity, dtype=bool)
+        self.live[:len(self.resource_ids)] = True
+        return renumbered
+    
+    def _live_postings(self, term: str) -> tuple:
+        """(document numbers, term frequencies) of the live documents containing a word"""
+        postings = self.postings.get(term)
+        if postings is None:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float64)
+        documents = np.frombuffer(postings[0], dtype=np.uintc)
+        live = self.live[documents]
+        return documents[live].astype(np.int64), np.frombuffer(postings[1], dtype=np.ushort)[live].astype(np.float64)
+    
+    def statistics(self, terms: List[str]) -> tuple:
+        """(number of documents, total length, word -> number of documents containing it), the corpus statistics of BM25"""
+        return len(self.documents), self.total_length, {term: len(self._live_postings(term)[0]) for term in terms}
+    
+    def scores(self, terms: List[str], statistics: Optional[tuple] = None) -> tuple:
+        """
+        (document numbers, BM25 scores) of the live documents containing any of
+        the words, scored with `statistics` of a larger corpus if given
+        """
+        documents, total_length, frequencies = statistics or (len(self.documents), self.total_length, None)
+        matched, weights = [], []
+        for term in terms:
+            numbers, term_frequencies = self._live_postings(term)
+            if not len(numbers):
+                continue
+            document_frequency = len(numbers) if frequencies is None else frequencies[term]
+            idf = math.log(1 + (documents - document_frequency + 0.5) / (document_frequency + 0.5))
+            normalization = BM25_K1 * (1 - BM25_B + BM25_B * self.lengths[numbers] / (total_length / documents))
+            matched.append(numbers)
+            weights.append(idf * term_frequencies * (BM25_K1 + 1) / (term_frequencies + normalization))
+        if len(matched) <= 1:
+            return (matched[0], weights[0]) if matched else (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float64))
+        
+        # Sum the scores of documents matching several words
+        numbers = np.concatenate(matched)
+        totals = np.bincount(numbers, weights=np.concatenate(weights))
+        found = np.zeros(len(totals), dtype=bool)
+        found[numbers] = True
+        numbers = np.flatnonzero(found)
+        return numbers, totals[numbers]
 
-@app.get("/metrics/archive-candidates", response_model=List[ResourceResponse])
-def get_archive_candidates():
+# Similarity clustering: MinHash signatures of the tag set and of the content
+# shingles of every resource, bucketed by locality-sensitive hashing
+SIMILARITY_KINDS = ("tags", "content")
+MINHASH_PERMUTATIONS = 32
+LSH_BANDS = 8  # Of 4 values each: pairs with a Jaccard similarity of 0.5 share a bucket with probability 0.4, of 0.8 with 0.97
+SHINGLE_WORDS = 3
+# Fixed seed, so that every process and restart computes the same signatures
+_MINHASH_RANDOM = np.random.default_rng(0x466F7267)
+_MINHASH_MULTIPLIERS = _MINHASH_RANDOM.integers(0, 2**64, size=MINHASH_PERMUTATIONS, dtype=np.uint64) | np.uint64(1)
+_MINHASH_INCREMENTS = _MINHASH_RANDOM.integers(0, 2**64, size=MINHASH_PERMUTATIONS, dtype=np.uint64)
+_LSH_BAND_MULTIPLIERS = _MINHASH_RANDOM.integers(0, 2**64, size=(LSH_BANDS, MINHASH_PERMUTATIONS // LSH_BANDS), dtype=np.uint64)
+
+def minhash_signature(features: set) -> Optional[bytes]:
     """
-    Get resources that are candidates for archiving:
-    - Low Memory Buoyancy (not currently relevant)
-    - High Preservation Value (worth preserving)
+    MinHash signature of a set of strings, None for an empty set
+    
+    Each value is the minimum over the features of one multiply-shift hash of
+    their CRC-32, so two signatures agree in a share of values that estimates
+    the Jaccard similarity of their sets.
+    """
+    if not features:
+        return None
+    hashes = np.fromiter((zlib.crc32(feature.encode()) for feature in features), dtype=np.uint64, count=len(features))
+    values = (hashes[:, None] * _MINHASH_MULTIPLIERS + _MINHASH_INCREMENTS) >> np.uint64(32)
+    return values.min(axis=0).astype(np.uint32).tobytes()
+
+def similarity_signatures(resource: Dict, content: str) -> Dict[str, Optional[bytes]]:
+    """Signatures of the tags and of the shingles (runs of SHINGLE_WORDS words) of the content of a resource"""
+    words = search_terms(content)
+    shingles = {" ".join(words[start:start + SHINGLE_WORDS]) for start in range(max(1, len(words) - SHINGLE_WORDS + 1))}
+    return {"tags": minhash_signature(set(resource["tags"])), "content": minhash_signature(shingles if words else set())}
+
+def lsh_band_keys(signature: bytes) -> List[int]:
+    """Bucket keys of the bands of a signature, distinct between bands"""
+    bands = np.frombuffer(signature, dtype=np.uint32).astype(np.uint64).reshape(LSH_BANDS, -1)
+    return (bands * _LSH_BAND_MULTIPLIERS).sum(axis=1).view(np.int64).tolist()
+
+def minhash_similarities(signature: bytes, others: List[bytes]) -> np.ndarray:
+    """Estimated Jaccard similarity of a signature to each of `others`"""
+    if not others:
+        return np.zeros(0)
+    matrix = np.frombuffer(b"".join(others), dtype=np.uint32).reshape(len(others), MINHASH_PERMUTATIONS)
+    return (matrix == np.frombuffer(signature, dtype=np.uint32)).mean(axis=1)
+
+def lsh_buckets(signatures: Iterable[bytes]) -> List[List[bytes]]:
+    """The buckets holding several of the given signatures"""
+    buckets: Dict[int, List[bytes]] = {}
+    for signature in signatures:
+        for key in lsh_band_keys(signature):
+            buckets.setdefault(key, []).append(signature)
+    return [bucket for bucket in buckets.values() if len(bucket) > 1]
+
+def minhash_clusters(
+    buckets: Iterable[List[bytes]],
+    repeated: Iterable[bytes],
+    size: Callable[[bytes], int],
+    min_similarity: float,
+    min_size: int,
+    limit: int
+) -> List[tuple]:
+    """
+    The `limit` largest clusters of at least `min_size` resources, as (number
+    of resources, signatures), ties broken by the higher signature
+    
+    Signatures are linked when they share a bucket and are at least
+    `min_similarity` similar, and a cluster is a connected group of linked
+    signatures, or a single signature of several resources (`repeated`).
+    Rather than comparing every pair in a bucket, the lowest signature of each
+    bucket links the similar ones and the rest of the bucket is scanned again
+    without them, all buckets at once, so the work grows with the size of the
+    shared buckets rather than with the number of pairs of resources, and the
+    clusters do not depend on the order of the buckets.
     """
-    candidates = [
-        r for r in resources_db.values() 
-        if r["memory_buoyancy"] < 0.3 and r["preservation_value"] > 0.7
+    buckets = list(buckets)
+    signatures = sorted(set(itertools.chain(itertools.chain.from_iterable(buckets), repeated)))
+    if not signatures:
+        return []
+    numbers = {signature: number for number, signature in enumerate(signatures)}
+    matrix = np.frombuffer(b"".join(signatures), dtype=np.uint32).reshape(len(signatures), MINHASH_PERMUTATIONS)
+    # Entries of all buckets, each bucket in signature order
+    entries = np.fromiter((numbers[signature] for bucket in buckets for signature in bucket), dtype=np.int64)
+    owners = np.repeat(np.arange(len(buckets)), [len(bucket) for bucket in buckets])
+    order = np.lexsort((entries, owners))
+    entries, owners = entries[order], owners[order]
+    
+    linked_from, linked_to = [], []
+    while len(entries):
+        first = np.ones(len(entries), dtype=bool)
+        first[1:] = owners[1:] != owners[:-1]
+        leaders = entries[first][np.cumsum(first) - 1]
+        similar = np.concatenate([
+            (matrix[entries[chunk]] == matrix[leaders[chunk]]).mean(axis=1) >= min_similarity
+            for chunk in (slice(start, start + 65536) for start in range(0, len(entries), 65536))
+        ])
+        linked_from.append(leaders[similar])
+        linked_to.append(entries[similar])
+        entries, owners = entries[~similar], owners[~similar]
+    
+    # Connected components: propagate the lowest number along the links
+    labels = np.arange(len(signatures))
+    linked_from = np.concatenate(linked_from) if linked_from else np.zeros(0, dtype=np.int64)
+    linked_to = np.concatenate(linked_to) if linked_to else np.zeros(0, dtype=np.int64)
+    while True:
+        lowest = np.minimum(labels[linked_from], labels[linked_to])
+        if np.array_equal(lowest, labels[linked_from]) and np.array_equal(lowest, labels[linked_to]):
+            break
+        np.minimum.at(labels, linked_from, lowest)
+        np.minimum.at(labels, linked_to, lowest)
+        labels = labels[labels]
+    
+    totals = np.bincount(labels, weights=[size(signature) for signature in signatures], minlength=len(signatures))
+    highest = np.zeros(len(signatures), dtype=np.int64)
+    np.maximum.at(highest, labels, np.arange(len(signatures)))
+    roots = np.flatnonzero(totals >= min_size)
+    roots = roots[np.lexsort((highest[roots], totals[roots]))[::-1][:limit]]
+    grouped = np.argsort(labels, kind="stable")
+    starts = np.searchsorted(labels[grouped], roots)
+    ends = np.searchsorted(labels[grouped], roots, side="right")
+    return [
+        (int(totals[root]), [signatures[number] for number in grouped[start:end].tolist()])
+        for root, start, end in zip(roots.tolist(), starts.tolist(), ends.tolist())
     ]
-    candidates.sort(key=lambda x: x["preservation_value"], reverse=True)
+
+# Groups of one are stored as their member, which saves a set per resource in
+# buckets and signatures that no other resource shares
+def _add_member(mapping: Dict, key: Any, member: Any) -> int:
+    """Add a member to the group `key` of a mapping, returning the new group size"""
+    members = mapping.get(key)
+    if members is None:
+        mapping[key] = member
+        return 1
+    if not isinstance(members, set):
+        members = mapping[key] = {members}
+    members.add(member)
+    return len(members)
+
+def _remove_member(mapping: Dict, key: Any, member: Any) -> int:
+    """Remove a member added with _add_member, returning the remaining group size"""
+    members = mapping[key]
+    if not isinstance(members, set):
+        del mapping[key]
+        return 0
+    members.discard(member)
+    if len(members) == 1:
+        mapping[key] = members.pop()
+        return 1
+    return len(members)
+
+def _members(members: Any) -> Iterable:
+    if members is None:
+        return ()
+    return members if isinstance(members, set) else (members,)
+
+class SimilarityIndex:
+    """
+    MinHash signatures of one kind of feature set of the resources, with their
+    locality-sensitive hashing buckets
+    
+    Each signature is split into LSH_BANDS bands, and each band hashes to a
+    bucket, so resources with similar feature sets likely share a bucket.
+    Resources with identical signatures (e.g. the same tags) share one entry,
+    and buckets hold signatures, so adding or removing a resource updates at
+    most LSH_BANDS buckets. Related resources are found by comparing a
+    signature with those of its buckets only, and clusters by scanning the
+    buckets shared by several signatures, which are tracked as they change.
+    """
+    
+    def __init__(self):
+        self.signatures: Dict[str, bytes] = {}  # resource id -> signature
+        self.members: Dict[bytes, Any] = {}  # signature -> resource id, or a set of several
+        self.buckets: Dict[int, Any] = {}  # band key -> signature, or a set of several
+        self.shared: set = set()  # Keys of the buckets holding several signatures
+        self.repeated: set = set()  # Signatures of several resources
+    
+    def __len__(self) -> int:
+        return len(self.signatures)
+    
+    def add(self, resource_id: str, signature: Optional[bytes]):
+        """Set the signature of a resource, None if it has no features of this kind"""
+        self.remove(resource_id)
+        if signature is None:
+            return
+        self.signatures[resource_id] = signature
+        count = _add_member(self.members, signature, resource_id)
+        if count == 2:
+            self.repeated.add(signature)
+        elif count == 1:
+            for key in lsh_band_keys(signature):
+                if _add_member(self.buckets, key, signature) == 2:
+                    self.shared.add(key)
     
-    return candidates
+    def remove(self, resource_id: str):
+        signature = self.signatures.pop(resource_id, None)
+        if signature is None:
+            return
+        count = _remove_member(self.members, signature, resource_id)
+        if count == 1:
+            self.repeated.discard(signature)
+        elif count == 0:
+            for key in lsh_band_keys(signature):
+                if _remove_member(self.buckets, key, signature) == 1:
+                    self.shared.discard(key)
+    
+    def resource_ids(self, signature: bytes) -> Iterable[str]:
+        return _members(self.members.get(signature))
+    
+    def size(self, signature: bytes) -> int:
+        members = self.members.get(signature)
+        return 0 if members is None else len(members) if isinstance(members, set) else 1
+    
+    def similar(self, signature: bytes, min_similarity: float) -> List[tuple]:
+        """(similarity, signature) of the signatures sharing a bucket with `signature` and at least `min_similarity` similar"""
+        candidates = set()
+        for key in lsh_band_keys(signature):
+            candidates.update(_members(self.buckets.get(key)))
+        candidates = list(candidates)
+        similarities = minhash_similarities(signature, candidates).tolist()
+        return [(similarity, candidate) for similarity, candidate in zip(similarities, candidates) if similarity >= min_similarity]
+    
+    def shared_buckets(self) -> List[List[bytes]]:
+        return [list(self.buckets[key]) for key in self.shared]
 
-@app.get("/metrics/deletion-candidates", response_model=List[ResourceResponse])
-def get_deletion_candidates():
+# Compact access log
+ACCESS_LOG_CAPACITY = int(os.environ.get("FORGETIT_ACCESS_LOG_CAPACITY", "1000000"))
+
+class AccessLogStore:
     """
-    Get resources that are candidates for deletion:
-    - Low Memory Buoyancy (not currently relevant)
-    - Low Preservation Value (not worth preserving)
+    Bounded, array-backed append log of access events
+    
+    Each event takes a few bytes: epoch timestamp (microseconds), interned
+    resource index, interned access type code and a link to the previous event
+    of the same resource. The links form a per-resource chain starting at
+    `heads`, so one resource's history is fetched without scanning the log.
+    Once `capacity` events are stored the oldest events are overwritten, so
+    memory stays flat under constant load.
     """
-    candidates = [
-        r for r in resources_db.values() 
-        if r["memory_buoyancy"] < 0.2 and r["preservation_value"] < 0.2
-    ]
-    candidates.sort(key=lambda x: (x["memory_buoyancy"] + x["preservation_value"]))
     
-    return candidates
+    MAX_TYPE_CODES = np.iinfo(np.uint8).max + 1
+    
+    def __init__(self, capacity: int = ACCESS_LOG_CAPACITY, initial_size: int = 1024):
+        self.capacity = capacity
+        self.total = 0  # Number of events ever appended; positions are absolute
+        size = min(initial_size, capacity)
+        self.timestamps = np.zeros(size, dtype=np.int64)
+        self.resources = np.zeros(size, dtype=np.int32)
+        self.access_types = np.zeros(size, dtype=np.uint8)
+        self.previous = np.full(size, -1, dtype=np.int64)
+        
+        # Interned resource ids; indexes of deleted resources are reused
+        self.resource_ids: List[Optional[str]] = []
+        self.resource_indexes: Dict[str, int] = {}
+        self.free_indexes: List[int] = []
+        self.heads: Dict[int, int] = {}
+        
+        # Access type enum, extended on first use of a new type. Codes count
+        # the retained events using them and are reused once none is left.
+        self.type_names: List[Optional[str]] = ["view", "edit", "share"]
+        self.type_codes: Dict[str, int] = {name: code for code, name in enumerate(self.type_names)}
+        self.type_counts: List[int] = [0] * len(self.type_names)
+        self.free_type_codes: List[int] = []
+    
+    def __len__(self) -> int:
+        return min(self.total, self.capacity)
+    
+    @property
+    def start(self) -> int:
+        """Absolute position of the oldest retained event"""
+        return max(0, self.total - self.capacity)
+    
+    def _intern_resource(self, resource_id: str) -> int:
+        index = self.resource_indexes.get(resource_id)
+        if index is None:
+            if self.free_indexes:
+                index = self.free_indexes.pop()
+                self.resource_ids[index] = resource_id
+            else:
+                index = len(self.resource_ids)
+                self.resource_ids.append(resource_id)
+            self.resource_indexes[resource_id] = index
+        return index
+    
+    def _type_code(self, access_type: str) -> int:
+        code = self.type_codes.get(access_type)
+        if code is None:
+            if self.free_type_codes:
+                code = self.free_type_codes.pop()
+                self.type_names[code] = access_type
+            elif len(self.type_names) >= self.MAX_TYPE_CODES:
+                raise ValueError(f"The access log already holds {len(self.type_names)} distinct access types")
+            else:
+                code = len(self.type_names)
+                self.type_names.append(access_type)
+                self.type_counts.append(0)
+            self.type_codes[access_type] = code
+        return code
+    
+    def _release_type(self, code: int):
+        """Drop the reference of an overwritten event to its access type"""
+        self.type_counts[code] -= 1
+        if self.type_counts[code] == 0:
+            del self.type_codes[self.type_names[code]]
+            self.type_names[code] = None
+            self.free_type_codes.append(code)
+    
+    def check_types(self, access_types: List[str]):
+        """
+        Raise ValueError, changing nothing, if appending events of
+        `access_types` in this order would run out of access type codes
+        """
+        if all(access_type in self.type_codes for access_type in access_types):
+            return
+        
+        # Replay the interning on a copy of the type enum, releasing the types
+        # of the events each append overwrites first
+        trial = AccessLogStore.__new__(AccessLogStore)
+        trial.type_names = list(self.type_names)
+        trial.type_codes = dict(self.type_codes)
+        trial.type_counts = list(self.type_counts)
+        trial.free_type_codes = list(self.free_type_codes)
+        codes = []
+        for offset, access_type in enumerate(access_types):
+            evicted = self.total + offset - self.capacity
+            if evicted >= self.total:
+                trial._release_type(codes[evicted - self.total])
+            elif evicted >= 0:
+                trial._release_type(int(self.access_types[evicted % len(self.access_types)]))
+            code = trial._type_code(access_type)
+            trial.type_counts[code] += 1
+            codes.append(code)
+    
+    def _grow(self):
+        size = min(len(self.timestamps) * 2, self.capacity)
+        for name in ("timestamps", "resources", "access_types", "previous"):
+            column = getattr(self, name)
+            grown = np.full(size, -1, dtype=column.dtype) if name == "previous" else np.zeros(size, dtype=column.dtype)
+            grown[:len(column)] = column
+            setattr(self, name, grown)
+    
+    def append(self, resource_id: str, timestamp: datetime, access_type: str):
+        """Append one access event, overwriting the oldest one when full"""
+        if self.total == len(self.timestamps) and len(self.timestamps) < self.capacity:
+            self._grow()
+        
+        slot = self.total % len(self.timestamps)
+        if self.total >= len(self.timestamps):
+            # The overwritten event may be the last one using its type
+            self._release_type(int(self.access_types[slot]))
+        code = self._type_code(access_type)
+        self.type_counts[code] += 1
+        index = self._intern_resource(resource_id)
+        self.timestamps[slot] = _to_microseconds(timestamp)
+        self.resources[slot] = index
+        self.access_types[slot] = code
+        self.previous[slot] = self.heads.get(index, -1)
+        self.heads[index] = self.total
+        self.total += 1
+    
+    def history(self, resource_id: str, limit: Optional[int] = None) -> List[Dict]:
+        """Return the retained events of one resource, newest first"""
+        index = self.resource_indexes.get(resource_id)
+        events = []
+        if index is None:
+            return events
+        
+        start = self.start
+        position = self.heads.get(index, -1)
+        while position >= start and (limit is None or len(events) < limit):
+            slot = position % len(self.timestamps)
+            events.append({
+                "resource_id": resource_id,
+                "timestamp": _from_microseconds(self.timestamps[slot]),
+                "access_type": self.type_names[self.access_types[slot]]
+            })
+            position = int(self.previous[slot])
+        
+        return events
+    
+    def remove_resource(self, resource_id: str):
+        """Drop the history of a deleted resource and release its index"""
+        index = self.resource_indexes.pop(resource_id, None)
+        if index is None:
+            return
+        
+        # Unlink the retained events so a reused index starts a fresh chain
+        start = self.start
+        position = self.heads.pop(index, -1)
+        while position >= start:
+            slot = position % len(self.timestamps)
+            self.resources[slot] = -1
+            position = int(self.previous[slot])
+            self.previous[slot] = -1
+        
+        self.resource_ids[index] = None
+        self.free_indexes.append(index)
 
-@app.post("/access-log")
-def log_resource_access(log_entry: AccessLog):
-    """Log a resource access event and update metrics"""
-    if log_entry.resource_id not in resources_db:
-        raise HTTPException(status_code=404, detail="Resource not found")
+# Storage backends
+# Content storage
+CONTENT_CODECS = {"none": 0, "zlib": 1, "zstd": 2}
+CONTENT_COMPRESSION = os.environ.get("FORGETIT_CONTENT_COMPRESSION", "zstd" if zstandard is not None else "zlib").lower()
+CONTENT_COMPRESSION_MIN_SIZE = 256  # Bytes; shorter contents are stored as they are
+
+if CONTENT_COMPRESSION not in CONTENT_CODECS:
+    raise ValueError(f"Unknown FORGETIT_CONTENT_COMPRESSION: {CONTENT_COMPRESSION}")
+if CONTENT_COMPRESSION == "zstd" and zstandard is None:
+    raise RuntimeError("FORGETIT_CONTENT_COMPRESSION=zstd requires the zstandard package")
+
+def content_digest(data: bytes) -> bytes:
+    return hashlib.sha256(data).digest()
+
+def compress_content(data: bytes) -> tuple:
+    """
+    Return (codec, payload) for the UTF-8 bytes of a content, compressed with
+    CONTENT_COMPRESSION unless that does not make them smaller
+    """
+    codec = CONTENT_CODECS[CONTENT_COMPRESSION]
+    if codec and len(data) >= CONTENT_COMPRESSION_MIN_SIZE:
+        payload = zstandard.compress(data) if codec == CONTENT_CODECS["zstd"] else zlib.compress(data)
+        if len(payload) < len(data):
+            return codec, payload
+    return CONTENT_CODECS["none"], data
+
+def encode_content(content: str) -> tuple:
+    """Return (digest, codec, payload) of a content"""
+    data = content.encode()
+    return (content_digest(data),) + compress_content(data)
+
+def decompress_content(codec: int, payload: bytes) -> bytes:
+    if codec == CONTENT_CODECS["zlib"]:
+        return zlib.decompress(payload)
+    if codec == CONTENT_CODECS["zstd"]:
+        if zstandard is None:
+            raise RuntimeError("Content was compressed with zstd, which requires the zstandard package")
+        return zstandard.decompress(payload)
+    return payload
+
+def decode_content(codec: int, payload: bytes) -> str:
+    return decompress_content(codec, payload).decode()
+
+class BlobStore:
+    """
+    Contents deduplicated by their SHA-256 digest and stored compressed
     
-    # Add to access logs
-    access_logs.append(log_entry.dict())
+    Each blob counts the resources that refer to it and is dropped together
+    with the last one. Blobs are only decompressed when a content is read.
+    """
     
-    # Update resource
-    resource = resources_db[log_entry.resource_id]
-    resource["last_accessed"] = log_entry.timestamp
-    resource["access_count"] += 1
-    resource["memory_buoyancy"] = calculate_memory_buoyancy(resource)
+    def __init__(self):
+        self.blobs: Dict[bytes, list] = {}  # digest -> [references, codec, payload]
+        self.lock = threading.Lock()
     
-    return {"status": "success", "message": "Access logged", "resource_id": log_entry.resource_id}
+    def put(self, content: str) -> bytes:
+        """Add a reference to a content, storing it if it is new, and return its digest"""
+        data = content.encode()
+        digest = content_digest(data)
+        with self.lock:
+            blob = self.blobs.get(digest)
+            if blob is not None:
+                blob[0] += 1
+                return digest
+        
+        # Compress outside the lock; another thread may store the same content meanwhile
+        codec, payload = compress_content(data)
+        with self.lock:
+            blob = self.blobs.setdefault(digest, [0, codec, payload])
+            blob[0] += 1
+        return digest
+    
+    def add(self, digest: bytes, codec: int, payload: bytes) -> bytes:
+        """Add a reference to an already encoded content, e.g. one taken out earlier"""
+        with self.lock:
+            blob = self.blobs.setdefault(digest, [0, codec, payload])
+            blob[0] += 1
+        return digest
+    
+    def release(self, digest: bytes):
+        """Drop a reference to a blob, and the blob with its last reference"""
+        self.take(digest)
+    
+    def take(self, digest: bytes) -> tuple:
+        """Drop a reference to a blob like `release`, returning its (codec, payload)"""
+        with self.lock:
+            blob = self.blobs[digest]
+            blob[0] -= 1
+            if blob[0] == 0:
+                del self.blobs[digest]
+            return blob[1], blob[2]
+    
+    def usage(self) -> Dict[str, int]:
+        """Number of blobs and references, and the bytes the blobs take up"""
+        with self.lock:
+            return {
+                "blobs": len(self.blobs),
+                "references": sum(blob[0] for blob in self.blobs.values()),
+                "stored_bytes": sum(len(blob[2]) for blob in self.blobs.values())
+            }
 
-@app.post("/update-metrics")
-def update_all_metrics():
-    """Update Memory Buoyancy and Preservation Value for all resources"""
-    for resource_id, resource in resources_db.items():
-        resource["memory_buoyancy"] = calculate_memory_buoyancy(resource)
-        resource["preservation_value"] = calculate_preservation_value(resource)
+# Cold tier: with FORGETIT_COLD_TIER_DIR set, the memory backend moves resources
+# whose Memory Buoyancy fell below FORGETIT_COLD_TIER_THRESHOLD out of memory
+COLD_TIER_DIR = os.environ.get("FORGETIT_COLD_TIER_DIR")
+COLD_TIER_THRESHOLD = float(os.environ.get("FORGETIT_COLD_TIER_THRESHOLD", str(ARCHIVE_THRESHOLDS[0])))
+COLD_TIER_INTERVAL = float(os.environ.get("FORGETIT_COLD_TIER_INTERVAL", "60"))
+COLD_TIER_COMPACT_MIN_BYTES = 64 * 1024 * 1024  # Garbage tolerated before the file is rewritten
+PROMOTION_LATENCY_SAMPLES = 1024
+
+class ColdTier:
+    """
+    Demoted resources in an append-only scratch file, read through mmap
+    
+    An entry holds a resource's record, pickled and compressed, followed by
+    its content blob exactly as the BlobStore kept it, so moving a resource
+    between tiers never recompresses its content. Only the location of each
+    entry stays in memory; the operating system caches the pages that are
+    read and evicts them under memory pressure. Entries carry their own copy
+    of their content, so contents shared by cold resources are stored once
+    per resource. Entries left behind by promoted or deleted resources are
+    reclaimed by `compact`.
+    """
+    
+    HEADER = struct.Struct("<BIB32s")  # Record codec, record length, content codec, content digest
+    
+    def __init__(self, directory: str):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.file = tempfile.TemporaryFile(dir=directory, prefix="forgetit-cold-")
+        self.map: Optional[mmap.mmap] = None
+        self.size = 0
+        self.live_bytes = 0
+        self.locations: Dict[str, tuple] = {}  # resource id -> (offset, length)
+        self.demotions = 0
+        self.promotions = 0
+        self.promotion_latencies = deque(maxlen=PROMOTION_LATENCY_SAMPLES)  # Seconds
+        self.lock = threading.Lock()
+    
+    def __len__(self) -> int:
+        return len(self.locations)
+    
+    def __contains__(self, resource_id: str) -> bool:
+        return resource_id in self.locations
+    
+    def _append(self, resource_id: str, entry: bytes):
+        self.file.write(entry)
+        self.locations[resource_id] = (self.size, len(entry))
+        self.size += len(entry)
+        self.live_bytes += len(entry)
+    
+    def _read(self, offset: int, length: int) -> bytes:
+        if self.map is None or len(self.map) < offset + length:
+            # Map the file again to cover the entries appended since
+            self.file.flush()
+            if self.map is not None:
+                self.map.close()
+            self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self.map[offset:offset + length]
+    
+    def _entry(self, resource_id: str, record_only: bool = False) -> Optional[bytes]:
+        location = self.locations.get(resource_id)
+        if location is None:
+            return None
+        offset, length = location
+        if record_only:
+            length = self.HEADER.size + self.HEADER.unpack(self._read(offset, self.HEADER.size))[1]
+        return self._read(offset, length)
+    
+    @classmethod
+    def _decode_record(cls, entry: bytes) -> Dict:
+        record_codec, record_length, _, _ = cls.HEADER.unpack_from(entry)
+        return pickle.loads(decompress_content(record_codec, entry[cls.HEADER.size:cls.HEADER.size + record_length]))
+    
+    @classmethod
+    def decode(cls, entry: bytes) -> tuple:
+        """Return (record, digest, codec, payload) of an entry"""
+        _, record_length, codec, digest = cls.HEADER.unpack_from(entry)
+        return cls._decode_record(entry), digest, codec, entry[cls.HEADER.size + record_length:]
+    
+    def put(self, resource_id: str, record: Dict, digest: bytes, codec: int, payload: bytes):
+        """Demote a resource given its record and encoded content"""
+        record_codec, record_payload = compress_content(pickle.dumps(record, protocol=pickle.HIGHEST_PROTOCOL))
+        entry = self.HEADER.pack(record_codec, len(record_payload), codec, digest) + record_payload + payload
+        with self.lock:
+            self._append(resource_id, entry)
+            self.demotions += 1
+    
+    def record(self, resource_id: str) -> Optional[Dict]:
+        """Record of a cold resource, reading only the part of its entry before the content"""
+        with self.lock:
+            entry = self._entry(resource_id, record_only=True)
+        return None if entry is None else self._decode_record(entry)
+    
+    def content(self, resource_id: str) -> Optional[tuple]:
+        """(codec, payload) of the content of a cold resource"""
+        with self.lock:
+            entry = self._entry(resource_id)
+        if entry is None:
+            return None
+        _, record_length, codec, _ = self.HEADER.unpack_from(entry)
+        return codec, entry[self.HEADER.size + record_length:]
+    
+    def pop(self, resource_id: str) -> Optional[tuple]:
+        """Remove a resource for promotion, returning (record, digest, codec, payload)"""
+        with self.lock:
+            entry = self._entry(resource_id)
+            if entry is None:
+                return None
+            self.live_bytes -= self.locations.pop(resource_id)[1]
+        return self.decode(entry)
+    
+    def remove(self, resource_id: str) -> bool:
+        with self.lock:
+            location = self.locations.pop(resource_id, None)
+            if location is None:
+                return False
+            self.live_bytes -= location[1]
+            return True
+    
+    def record_promotion(self, seconds: float):
+        with self.lock:
+            self.promotions += 1
+            self.promotion_latencies.append(seconds)
+    
+    def compact(self, min_garbage: int = COLD_TIER_COMPACT_MIN_BYTES) -> bool:
+        """
+        Rewrite the file without the entries of promoted and deleted resources
+        once they make up most of it, returning whether it was rewritten
+        """
+        with self.lock:
+            garbage = self.size - self.live_bytes
+            if garbage < min_garbage or garbage < self.live_bytes:
+                return False
+            
+            compacted = tempfile.TemporaryFile(dir=self.directory, prefix="forgetit-cold-")
+            locations = {}
+            size = 0
+            for resource_id, (offset, length) in self.locations.items():
+                compacted.write(self._read(offset, length))
+                locations[resource_id] = (size, length)
+                size += length
+            if self.map is not None:
+                self.map.close()
+                self.map = None
+            self.file.close()
+            self.file, self.locations, self.size, self.live_bytes = compacted, locations, size, size
+            return True
+    
+    def entries(self) -> Dict[str, bytes]:
+        """All entries by resource id, for snapshots"""
+        with self.lock:
+            return {resource_id: self._read(*location) for resource_id, location in self.locations.items()}
+    
+    def load(self, entries: Dict[str, bytes]):
+        """Add entries returned by `entries`, e.g. from a snapshot"""
+        with self.lock:
+            for resource_id, entry in entries.items():
+                self._append(resource_id, entry)
+    
+    def usage(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                "resources": len(self.locations),
+                "bytes": self.live_bytes,
+                "file_bytes": self.size,
+                "demotions": self.demotions,
+                "promotions": self.promotions,
+                "promotion_latencies": list(self.promotion_latencies)
+            }
+    
+    def close(self):
+        with self.lock:
+            if self.map is not None:
+                self.map.close()
+                self.map = None
+            self.file.close()
+
+SORT_FIELDS = ("memory_buoyancy", "preservation_value", "last_accessed")
+REPOSITORY_PAGE_SIZE = 500
+
+def cursor_key(resource: Dict, sort_by: str) -> tuple:
+    """Keyset position of a resource in the order requested by `sort_by`"""
+    if sort_by in SORT_FIELDS:
+        return (resource[sort_by], resource["id"])
+    return (resource["id"],)
+
+def ranked(resources, key, limit: Optional[int] = None) -> List[Dict]:
+    """Sort resources by `key` (ties by id), keeping only the first `limit` with a heap"""
+    def sort_key(resource):
+        return (key(resource), resource["id"])
+    if limit is None:
+        return sorted(resources, key=sort_key)
+    return heapq.nsmallest(limit, resources, key=sort_key)
+
+# Rankings of GET /resources/top, with the sort field of those that are listing orders
+TOP_RANKINGS = {"mb": "memory_buoyancy", "pv": "preservation_value", "pv-mb": None, "last_accessed": "last_accessed"}
+
+def rank_value(resource: Dict, rank_by: str) -> Any:
+    """The value of a resource in one of TOP_RANKINGS, highest first"""
+    if rank_by == "pv-mb":
+        return resource["preservation_value"] - resource["memory_buoyancy"]
+    return resource[TOP_RANKINGS[rank_by]]
+
+def best_k(values: np.ndarray, resource_ids: Callable[[np.ndarray], List[str]], k: int) -> List[tuple]:
+    """
+    The k best (value, resource_id) pairs of a vector of values, highest first,
+    selected with a partial sort; `resource_ids` maps positions in `values` to
+    ids, which break ties (the higher id first) as in the sorted indexes
+    """
+    def ranked_ids(positions: np.ndarray) -> List[tuple]:
+        return sorted(zip(values[positions].tolist(), resource_ids(positions)), reverse=True)
+    
+    if len(values) <= k:
+        return ranked_ids(np.arange(len(values)))
+    kth = np.partition(values, len(values) - k)[len(values) - k]
+    # Of the resources tied with the k-th best value, the higher ids come first
+    best = ranked_ids(np.flatnonzero(values > kth))
+    best.extend((kth.item(), resource_id) for resource_id in heapq.nlargest(
+        k - len(best), resource_ids(np.flatnonzero(values == kth))
+    ))
+    return best
+
+class StoreVersion:
+    """
+    Counter that increases with every change of a repository's resources
+    
+    It starts from the clock rather than zero, so a restarted server never
+    hands out a version (and thus an ETag) that meant different data before.
+    """
+    
+    def __init__(self):
+        self.value = time.time_ns()
+        self.lock = threading.Lock()
+    
+    def bump(self):
+        with self.lock:
+            self.value += 1
+
+class ResourceRepository(ABC):
+    """
+    Storage interface used by every route
+    
+    Mutating methods take care of keeping scores and any indexes consistent.
+    They return the changed resource, or None if it does not exist.
+    
+    Content is stored apart from the other fields, deduplicated and compressed.
+    Only `contents` returns it, decompressing it on the way; every other method
+    returns resources without `content`.
+    """
+    
+    @abstractmethod
+    def count(self) -> int:
+        """Number of stored resources"""
+    
+    @abstractmethod
+    def version(self) -> int:
+        """
+        Number that increases after every change of stored resources or scores,
+        so responses computed from the same version are identical
+        """
+    
+    @abstractmethod
+    def get(self, resource_id: str) -> Optional[Dict]:
+        """Return a resource without registering an access"""
+    
+    @abstractmethod
+    def contents(self, resource_ids: List[str]) -> Dict[str, str]:
+        """Content of those of the given resources that exist, by id"""
+    
+    @abstractmethod
+    def create(self, resource: Dict):
+        """Store a new resource whose metrics are already calculated"""
+    
+    @abstractmethod
+    def create_many(self, resources: List[Dict], now: datetime):
+        """Score a batch of new resources together and store them in one step"""
+    
+    @abstractmethod
+    def touch(self, resource_id: str, timestamp: datetime, count: int = 1, now: Optional[datetime] = None) -> Optional[Dict]:
+        """Register `count` accesses ending at `timestamp` and recompute Memory Buoyancy"""
+    
+    @abstractmethod
+    def update(self, resource_id: str, changes: Dict, now: datetime) -> Optional[Dict]:
+        """Apply field changes as an edit access and recompute both metrics"""
+    
+    @abstractmethod
+    def delete(self, resource_id: str) -> bool:
+        """Delete a resource and its access history"""
+    
+    @abstractmethod
+    def log_access(self, resource_id: str, timestamp: datetime, access_type: str):
+        """
+        Append one access event to the retained history, raising ValueError if
+        the backend cannot store its access type
+        """
+    
+    def log_accesses(self, events: List[tuple]):
+        """Append many (resource_id, timestamp, access_type) events"""
+        for resource_id, timestamp, access_type in events:
+            self.log_access(resource_id, timestamp, access_type)
+    
+    def check_accesses(self, events: List[tuple]):
+        """
+        Raise ValueError if `log_accesses` could not store these events, so
+        callers can reject them before changing anything
+        """
+    
+    @abstractmethod
+    def access_history(self, resource_id: str, limit: Optional[int] = None) -> List[Dict]:
+        """Return the retained access events of a resource, newest first"""
+    
+    @abstractmethod
+    def iter_resources(
+        self,
+        min_mb: Optional[float],
+        min_pv: Optional[float],
+        sort_by: str,
+        after: Optional[tuple] = None,
+        now: Optional[datetime] = None,
+        tags: Optional[List[str]] = None,
+        content_type: Optional[str] = None
+    ) -> Iterator[Dict]:
+        """
+        Yield resources matching the filters in `sort_by` order (descending),
+        starting strictly after the keyset position `after`
+        
+        `tags` restricts the resources to those with all of the given tags and
+        `content_type` to those of that type. In lazy mode Memory Buoyancy is
+        evaluated at `now`.
+        """
+    
+    @abstractmethod
+    def top(
+        self,
+        rank_by: str,
+        k: int,
+        min_mb: Optional[float] = None,
+        min_pv: Optional[float] = None,
+        tags: Optional[List[str]] = None,
+        content_type: Optional[str] = None,
+        now: Optional[datetime] = None
+    ) -> List[Dict]:
+        """
+        The `k` resources matching the filters of iter_resources with the highest
+        rank_value in `rank_by`, ties broken by the higher id as in listings
+        """
+    
+    @abstractmethod
+    def search(
+        self,
+        query: str,
+        k: int,
+        mb_weight: float = 0.0,
+        now: Optional[datetime] = None,
+        statistics: Optional[tuple] = None
+    ) -> List[tuple]:
+        """
+        The `k` best (score, resource) matches of a full-text query over titles,
+        tags and contents: BM25 multiplied by (1 - mb_weight + mb_weight *
+        Memory Buoyancy), ties broken by the higher id
+        
+        `statistics` (see search_statistics) replace the backend's own corpus
+        statistics, so the shards of a deployment score their matches alike.
+        """
+    
+    @abstractmethod
+    def search_statistics(self, query: str) -> tuple:
+        """
+        (number of resources, total number of words, word -> number of resources
+        containing it) for the words of a query, the corpus statistics of BM25
+        """
+    
+    @abstractmethod
+    def similarity_signature(self, resource_id: str, kind: str) -> Optional[bytes]:
+        """
+        MinHash signature of the tags ("tags") or content shingles ("content") of
+        a resource, b"" if it has none, None if the resource does not exist
+        """
+    
+    @abstractmethod
+    def similar(
+        self,
+        kind: str,
+        signature: bytes,
+        k: int,
+        min_similarity: float,
+        exclude: Optional[str] = None,
+        now: Optional[datetime] = None
+    ) -> List[tuple]:
+        """
+        The `k` most similar (similarity, resource) of the resources other than
+        `exclude` whose signatures of `kind` share an LSH bucket with `signature`
+        and are at least `min_similarity` similar, ties broken by the higher id
+        """
+    
+    def related(self, resource_id: str, kind: str, k: int, min_similarity: float, now: Optional[datetime] = None) -> Optional[List[tuple]]:
+        """The resources `similar` to a resource, None if it does not exist"""
+        signature = self.similarity_signature(resource_id, kind)
+        if not signature:
+            return None if signature is None else []
+        return self.similar(kind, signature, k, min_similarity, resource_id, now)
+    
+    @abstractmethod
+    def similarity_counts(self, kind: str) -> Dict[bytes, int]:
+        """Number of resources per distinct signature of `kind`"""
+    
+    @abstractmethod
+    def similarity_members(self, kind: str, clusters: List[List[bytes]], k: int, now: Optional[datetime] = None) -> List[List[Dict]]:
+        """For each cluster of signatures, its `k` resources with the highest Memory Buoyancy, ties broken by the higher id"""
+    
+    def similarity_clusters(self, kind: str, min_similarity: float, min_size: int, limit: int) -> List[tuple]:
+        """The (number of resources, signatures) of the clusters of minhash_clusters over the signatures of `kind`"""
+        counts = self.similarity_counts(kind)
+        repeated = [signature for signature, count in counts.items() if count > 1]
+        return minhash_clusters(lsh_buckets(counts), repeated, counts.__getitem__, min_similarity, min_size, limit)
+    
+    def clusters(
+        self,
+        kind: str,
+        min_similarity: float,
+        min_size: int,
+        limit: int,
+        members: int,
+        now: Optional[datetime] = None
+    ) -> List[tuple]:
+        """
+        The `limit` largest clusters of at least `min_size` resources with
+        similar signatures of `kind`, as (number of resources, its `members`
+        resources with the highest Memory Buoyancy)
+        """
+        found = self.similarity_clusters(kind, min_similarity, min_size, limit)
+        resources = self.similarity_members(kind, [signatures for _, signatures in found], members, now)
+        return [(size, cluster) for (size, _), cluster in zip(found, resources)]
+    
+    @abstractmethod
+    def facets(self, tags: Optional[List[str]] = None, content_type: Optional[str] = None, now: Optional[datetime] = None) -> Dict:
+        """
+        Number of resources matching the filters of iter_resources ("total") and,
+        per tag ("tags") and per content type ("content_types") among them,
+        [count, sum of Memory Buoyancy, sum of Preservation Value]
+        """
+    
+    @abstractmethod
+    def score_summary(self, now: Optional[datetime] = None) -> Dict:
+        """
+        Distributions of both scores over all resources ("total") and per tag
+        ("tags") and content type ("content_types"), each as [count, sum of
+        Memory Buoyancy, sum of Preservation Value, Memory Buoyancy bin counts,
+        Preservation Value bin counts] with "bins" equal bins over [0, 1]
+        """
+    
+    @abstractmethod
+    def low_buoyancy(self, threshold: float, limit: Optional[int] = None, now: Optional[datetime] = None) -> List[Dict]:
+        """Resources with Memory Buoyancy below `threshold`, lowest first"""
+    
+    @abstractmethod
+    def archive_candidates(
+        self,
+        max_mb: float = ARCHIVE_THRESHOLDS[0],
+        min_pv: float = ARCHIVE_THRESHOLDS[1],
+        limit: Optional[int] = None,
+        now: Optional[datetime] = None
+    ) -> List[Dict]:
+        """Resources with Memory Buoyancy below `max_mb` and Preservation Value above `min_pv`, most valuable first"""
+    
+    @abstractmethod
+    def deletion_candidates(
+        self,
+        max_mb: float = DELETION_THRESHOLDS[0],
+        max_pv: float = DELETION_THRESHOLDS[1],
+        limit: Optional[int] = None,
+        now: Optional[datetime] = None
+    ) -> List[Dict]:
+        """Resources with both scores below the thresholds, lowest combined score first"""
+    
+    @abstractmethod
+    def rescore(self, resource_ids: List[str], now: datetime) -> List[Dict]:
+        """Recompute both metrics of some resources at `now`, returning those that exist"""
+    
+    @abstractmethod
+    def recompute_all(self, now: datetime) -> tuple:
+        """
+        Recompute both metrics of every resource, returning the number of
+        resources and the candidate_changes of those whose candidate sets changed
+        """
+    
+    def tier_usage(self) -> Optional[Dict]:
+        """
+        Resources and bytes held in memory ("hot") and in the cold tier ("cold"),
+        or None if the backend does not tier resources
+        """
+        return None
+    
+    def close(self):
+        """Release resources held by the backend on shutdown"""
+
+RESOURCE_LOCK_STRIPES = 64
+
+class StripedLock:
+    """
+    Fixed pool of locks, each shared by the resources whose ids hash to it
+    
+    Changes to one resource are serialized without keeping a lock per resource.
+    Holding every stripe (acquired in a fixed order) excludes all writers, which
+    gives sweeps a consistent view of the store. Stripes are reentrant, so a
+    wrapper holding them can call methods that take them again.
+    """
+    
+    def __init__(self, stripes: int = RESOURCE_LOCK_STRIPES):
+        self.locks = [threading.RLock() for _ in range(stripes)]
+    
+    def __call__(self, resource_id: str) -> threading.RLock:
+        return self.locks[hash(resource_id) % len(self.locks)]
+    
+    @contextmanager
+    def _holding(self, locks: List[threading.RLock]):
+        for lock in locks:
+            lock.acquire()
+        try:
+            yield
+        finally:
+            for lock in reversed(locks):
+                lock.release()
+    
+    def all(self):
+        return self._holding(self.locks)
+    
+    def many(self, resource_ids: Iterable[str]):
+        """Hold the stripes of several resources, acquired in the same order as `all`"""
+        stripes = sorted({hash(resource_id) % len(self.locks) for resource_id in resource_ids})
+        return self._holding([self.locks[stripe] for stripe in stripes])
+
+class InMemoryRepository(ResourceRepository):
+    """
+    Resources kept in a process-local dict, with the columnar score store,
+    sorted score indexes and compact access log maintained alongside
+    
+    Routes run concurrently in FastAPI's threadpool. Read-modify-write of a
+    resource happens under its stripe of `locks`, the full-text and similarity
+    indexes are guarded by `search_lock`, the shared score structures by
+    `index_lock` and the access log by `access_log_lock` (always acquired in
+    that order).
+    Stored records are private: callers get copies, so a record is never
+    observed half-updated.
+    
+    With a cold tier, `resources` only holds the hot resources. Cold ones keep
+    their scores in the score store and indexes, so queries still find them;
+    their records are read from the cold tier, and the first access or edit
+    promotes them back into memory.
+    """
+    
+    def __init__(self, cold_tier: Optional[ColdTier] = None):
+        self.resources: Dict[str, Dict] = {}
+        self.cold_tier = cold_tier
+        self.content_digests: Dict[str, bytes] = {}
+        self.blobs = BlobStore()
+        self.score_store = ScoreStore()
+        self.score_indexes = {field: ScoreIndex(field) for field in SORT_FIELDS}
+        self.score_grid = ScoreGrid()
+        self.tag_index = TagIndex()
+        self.score_histograms = ScoreHistograms()
+        self.search_index = SearchIndex()
+        self.similarity_indexes = {kind: SimilarityIndex() for kind in SIMILARITY_KINDS}
+        self.access_log = AccessLogStore()
+        self.locks = StripedLock()
+        self.search_lock = threading.Lock()
+        self.index_lock = threading.Lock()
+        self.access_log_lock = threading.RLock()
+        self.store_version = StoreVersion()
+    
+    def _index(self, resource: Dict):
+        """Propagate a created or changed resource to the score store and indexes"""
+        with self.index_lock:
+            previous = self._histogram_entry(resource["id"])
+            row = self.score_store.upsert(resource)
+            self.score_store.set_scores(row, resource["memory_buoyancy"], resource["preservation_value"])
+            for index in self.score_indexes.values():
+                index.update(resource)
+            self.tag_index.update(resource)
+            if not LAZY_MEMORY_BUOYANCY:
+                self.score_grid.update(resource)
+                self.score_histograms.move(previous, self._histogram_entry(resource["id"]))
+        self.store_version.bump()
+    
+    def _index_text(self, resource: Dict, content: str):
+        """Index the words and similarity signatures of a created or edited resource (stripe lock held)"""
+        terms = search_terms(search_text(resource, content))
+        signatures = similarity_signatures(resource, content)
+        with self.search_lock:
+            self._add_search_documents([(resource["id"], terms)])
+            self._add_signatures([(resource["id"], signatures)])
+    
+    def _add_signatures(self, signatures: List[tuple]):
+        """Index the (resource_id, similarity_signatures) of resources (search_lock held)"""
+        for kind, index in self.similarity_indexes.items():
+            for resource_id, resource_signatures in signatures:
+                index.add(resource_id, resource_signatures[kind])
+    
+    def _add_search_documents(self, documents: List[tuple]):
+        """
+        Index (resource_id, words) of resources in the score store, linking
+        their rows to the new documents (search_lock held)
+        """
+        numbers = [self.search_index.add(resource_id, terms) for resource_id, terms in documents]
+        with self.index_lock:
+            store = self.score_store
+            store.search_document[[store.rows[resource_id] for resource_id, _ in documents]] = numbers
+        self._compact_search_index()
+    
+    def _compact_search_index(self):
+        """Rewrite the postings once removed documents outnumber the live ones (search_lock held)"""
+        if self.search_index.garbage() <= max(len(self.search_index), SEARCH_COMPACT_MIN_DOCUMENTS):
+            return
+        renumbered = self.search_index.compact()
+        with self.index_lock:
+            documents = self.score_store.search_document[:len(self.score_store)]
+            linked = documents >= 0
+            documents[linked] = renumbered[documents[linked]]
+    
+    def _histogram_entry(self, resource_id: str) -> Optional[tuple]:
+        """The entry of a resource in the score histograms as read from the indexes, if indexed (index_lock held)"""
+        groups = self.tag_index.current.get(resource_id)
+        if groups is None:
+            return None
+        return (
+            groups,
+            self.score_indexes["memory_buoyancy"].current[resource_id][0],
+            self.score_indexes["preservation_value"].current[resource_id][0]
+        )
+    
+    def _copy(self, resource_id: str, now: Optional[datetime] = None) -> Optional[Dict]:
+        """
+        A copy of a stored record; in lazy mode its Memory Buoyancy is
+        evaluated at `now` (default: the current time), as stored values drift
+        """
+        with self.locks(resource_id):
+            resource = self.resources.get(resource_id)
+            resource = dict(resource) if resource is not None else self._cold_record(resource_id)
+        if resource is not None and LAZY_MEMORY_BUOYANCY:
+            resource["memory_buoyancy"] = memory_buoyancy_at(
+                memory_buoyancy_base(resource), resource["last_accessed"], now or datetime.now()
+            )
+        return resource
+    
+    def _with_scores(self, resource: Dict) -> Dict:
+        """Fill in the current scores of a record from the cold tier, which are kept in the indexes only"""
+        resource_id = resource["id"]
+        resource["preservation_value"] = self.score_indexes["preservation_value"].current[resource_id][0]
+        resource["memory_buoyancy"] = self.score_indexes["memory_buoyancy"].current[resource_id][0]
+        return resource
+    
+    def _cold_record(self, resource_id: str) -> Optional[Dict]:
+        """Read a cold resource without promoting it (stripe lock held)"""
+        if self.cold_tier is None:
+            return None
+        resource = self.cold_tier.record(resource_id)
+        return None if resource is None else self._with_scores(resource)
+    
+    def _demote(self, resource_id: str):
+        """Move a hot resource and its content to the cold tier (stripe lock held)"""
+        resource = self.resources.pop(resource_id)
+        digest = self.content_digests.pop(resource_id)
+        codec, payload = self.blobs.take(digest)
+        self.cold_tier.put(resource_id, resource, digest, codec, payload)
+    
+    def _hot(self, resource_id: str) -> Optional[Dict]:
+        """The stored record of a resource, promoting it from the cold tier if needed (stripe lock held)"""
+        resource = self.resources.get(resource_id)
+        if resource is not None or self.cold_tier is None:
+            return resource
+        
+        started = time.perf_counter()
+        demoted = self.cold_tier.pop(resource_id)
+        if demoted is None:
+            return None
+        resource, digest, codec, payload = demoted
+        self.resources[resource_id] = self._with_scores(resource)
+        self.content_digests[resource_id] = self.blobs.add(digest, codec, payload)
+        self.cold_tier.record_promotion(time.perf_counter() - started)
+        return resource
+    
+    def snapshot_resources(self) -> List[Dict]:
+        """Consistent point-in-time copies of all resources, for sweeps"""
+        with self.locks.all():
+            resources = [dict(resource) for resource in self.resources.values()]
+            if self.cold_tier is not None:
+                resources.extend(self._cold_record(resource_id) for resource_id in list(self.cold_tier.locations))
+            return resources
+    
+    def count(self) -> int:
+        return len(self.resources) + (0 if self.cold_tier is None else len(self.cold_tier))
+    
+    def version(self) -> int:
+        return self.store_version.value
+    
+    def get(self, resource_id: str) -> Optional[Dict]:
+        return self._copy(resource_id)
+    
+    def contents(self, resource_ids: List[str]) -> Dict[str, str]:
+        contents = {}
+        for resource_id in resource_ids:
+            with self.locks(resource_id):
+                digest = self.content_digests.get(resource_id)
+                if digest is not None:
+                    _, codec, payload = self.blobs.blobs[digest]
+                elif self.cold_tier is not None and resource_id in self.cold_tier:
+                    codec, payload = self.cold_tier.content(resource_id)
+                else:
+                    continue
+            # Decompress outside the lock; a payload never changes
+            contents[resource_id] = decode_content(codec, payload)
+        return contents
+    
+    def _set_content(self, resource_id: str, digest: bytes):
+        """Point a resource at its content blob, releasing the previous one"""
+        previous = self.content_digests.get(resource_id)
+        self.content_digests[resource_id] = digest
+        if previous is not None:
+            self.blobs.release(previous)
+    
+    def create(self, resource: Dict):
+        resource = dict(resource)
+        content = resource.pop("content")
+        digest = self.blobs.put(content)
+        with self.locks(resource["id"]):
+            self.resources[resource["id"]] = resource
+            self._set_content(resource["id"], digest)
+            self._index(resource)
+            self._index_text(resource, content)
+    
+    def create_many(self, resources: List[Dict], now: datetime):
+        digests = [self.blobs.put(resource["content"]) for resource in resources]
+        terms = [search_terms(search_text(resource, resource["content"])) for resource in resources]
+        signatures = [similarity_signatures(resource, resource["content"]) for resource in resources]
+        with self.locks.all():
+            with self.index_lock:
+                rows = np.fromiter((self.score_store.upsert(resource) for resource in resources), dtype=np.int64, count=len(resources))
+                memory_buoyancy, preservation_value = self.score_store.compute(now, rows)
+                self.score_store.set_scores(rows, memory_buoyancy, preservation_value)
+                for resource, mb, pv in zip(resources, memory_buoyancy.tolist(), preservation_value.tolist()):
+                    resource["memory_buoyancy"] = mb
+                    resource["preservation_value"] = pv
+                
+                records = [dict(resource) for resource in resources]
+                for record, digest in zip(records, digests):
+                    del record["content"]
+                    self._set_content(record["id"], digest)
+                self.resources.update((record["id"], record) for record in records)
+                for index in self.score_indexes.values():
+                    index.add_many(records)
+                self.tag_index.add_many(records)
+                if not LAZY_MEMORY_BUOYANCY:
+                    self.score_grid.add_many(records)
+                    self.score_histograms.add_many(
+                        (self.tag_index.current[record["id"]], record["memory_buoyancy"], record["preservation_value"]) for record in records
+                    )
+            with self.search_lock:
+                self._add_search_documents([(resource["id"], resource_terms) for resource, resource_terms in zip(resources, terms)])
+                self._add_signatures([(resource["id"], resource_signatures) for resource, resource_signatures in zip(resources, signatures)])
+        self.store_version.bump()
+    
+    def touch(self, resource_id: str, timestamp: datetime, count: int = 1, now: Optional[datetime] = None) -> Optional[Dict]:
+        with self.locks(resource_id):
+            resource = self._hot(resource_id)
+            if resource is None:
+                return None
+            
+            resource["last_accessed"] = timestamp
+            resource["access_count"] += count
+            resource["memory_buoyancy"] = calculate_memory_buoyancy(resource, now)
+            self._index(resource)
+            
+            return dict(resource)
+    
+    def update(self, resource_id: str, changes: Dict, now: datetime) -> Optional[Dict]:
+        with self.locks(resource_id):
+            resource = self._hot(resource_id)
+            if resource is None:
+                return None
+            
+            for field, value in changes.items():
+                if field == "content":
+                    if value is not None:
+                        self._set_content(resource_id, self.blobs.put(value))
+                else:
+                    resource[field] = value
+            resource["last_accessed"] = now
+            resource["access_count"] += 1
+            resource["memory_buoyancy"] = calculate_memory_buoyancy(resource, now)
+            resource["preservation_value"] = calculate_preservation_value(resource, now)
+            self._index(resource)
+            if changes.keys() & {"title", "tags", "content"}:
+                content = changes.get("content")
+                if content is None:
+                    _, codec, payload = self.blobs.blobs[self.content_digests[resource_id]]
+                    content = decode_content(codec, payload)
+                self._index_text(resource, content)
+            
+            return dict(resource)
+    
+    def delete(self, resource_id: str) -> bool:
+        with self.locks(resource_id):
+            if self.resources.pop(resource_id, None) is not None:
+                self.blobs.release(self.content_digests.pop(resource_id))
+            elif self.cold_tier is None or not self.cold_tier.remove(resource_id):
+                return False
+            
+            with self.search_lock:
+                self.search_index.remove(resource_id)
+                self._compact_search_index()
+                for index in self.similarity_indexes.values():
+                    index.remove(resource_id)
+            with self.index_lock:
+                if not LAZY_MEMORY_BUOYANCY:
+                    self.score_histograms.move(self._histogram_entry(resource_id), None)
+                self.score_store.remove(resource_id)
+                for index in self.score_indexes.values():
+                    index.remove(resource_id)
+                self.score_grid.remove(resource_id)
+                self.tag_index.remove(resource_id)
+            with self.access_log_lock:
+                self.access_log.remove_resource(resource_id)
+        self.store_version.bump()
+        
+        return True
+    
+    def log_access(self, resource_id: str, timestamp: datetime, access_type: str):
+        with self.access_log_lock:
+            self.access_log.check_types([access_type])
+            self.access_log.append(resource_id, timestamp, access_type)
+    
+    def log_accesses(self, events: List[tuple]):
+        with self.access_log_lock:
+            # All or nothing: validate the whole batch before appending
+            self.access_log.check_types([event[2] for event in events])
+            for resource_id, timestamp, access_type in events:
+                self.access_log.append(resource_id, timestamp, access_type)
+    
+    def check_accesses(self, events: List[tuple]):
+        with self.access_log_lock:
+            self.access_log.check_types([event[2] for event in events])
+    
+    def access_history(self, resource_id: str, limit: Optional[int] = None) -> List[Dict]:
+        with self.access_log_lock:
+            return self.access_log.history(resource_id, limit)
+    
+    def _uses_score_index(self, sort_by: str) -> bool:
+        """
+        Whether a listing in `sort_by` order can walk a sorted index. In lazy mode
+        the stored Memory Buoyancy drifts over time, so its index is not used there.
+        """
+        return sort_by in self.score_indexes and not (LAZY_MEMORY_BUOYANCY and sort_by == "memory_buoyancy")
+    
+    def iter_resources(
+        self,
+        min_mb: Optional[float],
+        min_pv: Optional[float],
+        sort_by: str,
+        after: Optional[tuple] = None,
+        now: Optional[datetime] = None,
+        tags: Optional[List[str]] = None,
+        content_type: Optional[str] = None
+    ) -> Iterator[Dict]:
+        # One `now` for the whole listing, so lazy scores are comparable
+        now = now or datetime.now()
+        with self.index_lock:
+            matching = self.tag_index.matching(tags, content_type)
+        
+        selective = matching is not None and len(matching) < TAG_FILTER_SELECTIVITY * len(self.score_store)
+        if self._uses_score_index(sort_by) and not selective:
+            # Walk the index page by page, so concurrent writes between pages
+            # cannot invalidate the iterator
+            index = self.score_indexes[sort_by]
+            minimum = {"memory_buoyancy": min_mb, "preservation_value": min_pv}.get(sort_by)
+            while True:
+                with self.index_lock:
+                    page = list(itertools.islice(index.descending(minimum, after), REPOSITORY_PAGE_SIZE))
+                for _, resource_id in page:
+                    if matching is not None and resource_id not in matching:
+                        continue
+                    resource = self._copy(resource_id, now)
+                    if resource is None:
+                        continue
+                    if min_mb is not None and resource["memory_buoyancy"] < min_mb:
+                        continue
+                    if min_pv is not None and resource["preservation_value"] < min_pv:
+                        continue
+                    yield resource
+                if len(page) < REPOSITORY_PAGE_SIZE:
+                    return
+                after = page[-1]
+        
+        # Without a usable index (lazy Memory Buoyancy order, selective tag
+        # filters) every matching record is copied and sorted up front
+        if matching is None and not LAZY_MEMORY_BUOYANCY:
+            filtered_resources = self.snapshot_resources()
+        else:
+            if matching is None:
+                with self.index_lock:
+                    matching = list(self.score_store.ids)
+            copies = (self._copy(resource_id, now) for resource_id in matching)
+            filtered_resources = [resource for resource in copies if resource is not None]
+        
+        # Apply filters
+        if min_mb is not None:
+            filtered_resources = [r for r in filtered_resources if r["memory_buoyancy"] >= min_mb]
+        
+        if min_pv is not None:
+            filtered_resources = [r for r in filtered_resources if r["preservation_value"] >= min_pv]
+        
+        # Sort resources (ties are broken by id so that cursors stay stable)
+        filtered_resources.sort(key=lambda x: cursor_key(x, sort_by), reverse=True)
+        for resource in filtered_resources:
+            if after is None or cursor_key(resource, sort_by) < after:
+                yield resource
+    
+    def top(
+        self,
+        rank_by: str,
+        k: int,
+        min_mb: Optional[float] = None,
+        min_pv: Optional[float] = None,
+        tags: Optional[List[str]] = None,
+        content_type: Optional[str] = None,
+        now: Optional[datetime] = None
+    ) -> List[Dict]:
+        sort_by = TOP_RANKINGS[rank_by]
+        now = now or datetime.now()
+        with self.index_lock:
+            matching = self.tag_index.matching(tags, content_type)
+        
+        selective = matching is not None and len(matching) < TAG_FILTER_SELECTIVITY * len(self.score_store)
+        if sort_by is not None and self._uses_score_index(sort_by) and min_mb is None and min_pv is None and not selective:
+            # Walk the sorted index of the ranking until k resources matched
+            with self.index_lock:
+                keys = self.score_indexes[sort_by].descending()
+                if matching is not None:
+                    keys = (key for key in keys if key[1] in matching)
+                best = list(itertools.islice(keys, k))
+        else:
+            best = self._top_by_columns(rank_by, k, matching, min_mb, min_pv, now)
+        
+        resources = (self._copy(resource_id, now) for _, resource_id in best)
+        return [resource for resource in resources if resource is not None]
+    
+    def _top_by_columns(
+        self,
+        rank_by: str,
+        k: int,
+        matching: Optional[set],
+        min_mb: Optional[float],
+        min_pv: Optional[float],
+        now: datetime
+    ) -> List[tuple]:
+        """
+        The (value, resource_id) of the best k resources in a ranking, evaluated
+        over the score store columns and selected with a partial sort
+        """
+        with self.index_lock:
+            store = self.score_store
+            if matching is None:
+                rows = np.arange(len(store))
+            else:
+                rows = np.fromiter((store.rows[resource_id] for resource_id in matching if resource_id in store.rows), dtype=np.int64)
+            if LAZY_MEMORY_BUOYANCY:
+                memory_buoyancy = store.memory_buoyancy_at(now, rows)
+            else:
+                memory_buoyancy = store.memory_buoyancy[rows]
+            preservation_value = store.preservation_value[rows]
+            
+            selected = np.ones(len(rows), dtype=bool)
+            if min_mb is not None:
+                selected &= memory_buoyancy >= min_mb
+            if min_pv is not None:
+                selected &= preservation_value >= min_pv
+            values = {
+                "mb": memory_buoyancy,
+                "pv": preservation_value,
+                "pv-mb": preservation_value - memory_buoyancy,
+                "last_accessed": store.last_accessed[rows]
+            }[rank_by]
+            
+            candidates = rows[selected]
+            return best_k(values[selected], lambda positions: [store.ids[row] for row in candidates[positions].tolist()], k)
+    
+    def search(
+        self,
+        query: str,
+        k: int,
+        mb_weight: float = 0.0,
+        now: Optional[datetime] = None,
+        statistics: Optional[tuple] = None
+    ) -> List[tuple]:
+        now = now or datetime.now()
+        terms = list(dict.fromkeys(search_terms(query)))
+        with self.search_lock:
+            documents, scores = self.search_index.scores(terms, statistics)
+            resource_ids = self.search_index.resource_ids
+            
+            def ids(positions: np.ndarray) -> List[str]:
+                return [resource_ids[document] for document in documents[positions].tolist()]
+            
+            if mb_weight:
+                scores = scores * (1 - mb_weight + mb_weight * self._search_memory_buoyancy(documents, now))
+            best = best_k(scores, ids, k)
+        return self._copies(best, now)
+    
+    def _copies(self, ranked: List[tuple], now: datetime) -> List[tuple]:
+        """(value, resource) copies of the resources of ranked (value, resource_id) pairs that still exist"""
+        copies = []
+        for value, resource_id in ranked:
+            resource = self._copy(resource_id, now)
+            if resource is not None:
+                copies.append((value, resource))
+        return copies
+    
+    def search_statistics(self, query: str) -> tuple:
+        with self.search_lock:
+            return self.search_index.statistics(list(dict.fromkeys(search_terms(query))))
+    
+    def _search_memory_buoyancy(self, documents: np.ndarray, now: datetime) -> np.ndarray:
+        """
+        Memory Buoyancy of the resources of live search documents (search_lock held)
+        
+        A few documents are looked up by resource id; many are mapped through
+        the document numbers of all score store rows at once.
+        """
+        with self.index_lock:
+            store = self.score_store
+            if len(documents) * 16 < len(store):
+                resource_ids = self.search_index.resource_ids
+                rows = np.fromiter((store.rows[resource_ids[document]] for document in documents.tolist()), dtype=np.int64, count=len(documents))
+            else:
+                linked = store.search_document[:len(store)]
+                rows = np.full(len(self.search_index.resource_ids), -1, dtype=np.int64)
+                rows[linked[linked >= 0]] = np.flatnonzero(linked >= 0)
+                rows = rows[documents]
+            if LAZY_MEMORY_BUOYANCY:
+                return store.memory_buoyancy_at(now, rows)
+            return store.memory_buoyancy[rows]
+    
+    def similarity_signature(self, resource_id: str, kind: str) -> Optional[bytes]:
+        with self.search_lock:
+            signature = self.similarity_indexes[kind].signatures.get(resource_id)
+        if signature is not None:
+            return signature
+        with self.index_lock:
+            return b"" if resource_id in self.score_store.rows else None
+    
+    def similar(
+        self,
+        kind: str,
+        signature: bytes,
+        k: int,
+        min_similarity: float,
+        exclude: Optional[str] = None,
+        now: Optional[datetime] = None
+    ) -> List[tuple]:
+        with self.search_lock:
+            index = self.similarity_indexes[kind]
+            best = heapq.nlargest(k, (
+                (similarity, resource_id)
+                for similarity, similar_signature in index.similar(signature, min_similarity)
+                for resource_id in index.resource_ids(similar_signature)
+                if resource_id != exclude
+            ))
+        return self._copies(best, now or datetime.now())
+    
+    def similarity_counts(self, kind: str) -> Dict[bytes, int]:
+        with self.search_lock:
+            index = self.similarity_indexes[kind]
+            return {signature: index.size(signature) for signature in index.members}
+    
+    def similarity_members(self, kind: str, clusters: List[List[bytes]], k: int, now: Optional[datetime] = None) -> List[List[Dict]]:
+        now = now or datetime.now()
+        with self.search_lock:
+            index = self.similarity_indexes[kind]
+            members = [[resource_id for signature in signatures for resource_id in index.resource_ids(signature)] for signatures in clusters]
+        
+        best = []
+        with self.index_lock:
+            store = self.score_store
+            for resource_ids in members:
+                # Skip resources deleted since
+                resource_ids = [resource_id for resource_id in resource_ids if resource_id in store.rows]
+                rows = np.fromiter((store.rows[resource_id] for resource_id in resource_ids), dtype=np.int64, count=len(resource_ids))
+                values = store.memory_buoyancy_at(now, rows) if LAZY_MEMORY_BUOYANCY else store.memory_buoyancy[rows]
+                best.append(best_k(values, lambda positions: [resource_ids[position] for position in positions.tolist()], k))
+        return [[resource for _, resource in self._copies(cluster, now)] for cluster in best]
+    
+    def similarity_clusters(self, kind: str, min_similarity: float, min_size: int, limit: int) -> List[tuple]:
+        # The buckets shared by several signatures are kept up to date, so only they are scanned
+        with self.search_lock:
+            index = self.similarity_indexes[kind]
+            return minhash_clusters(index.shared_buckets(), list(index.repeated), index.size, min_similarity, min_size, limit)
+    
+    def facets(self, tags: Optional[List[str]] = None, content_type: Optional[str] = None, now: Optional[datetime] = None) -> Dict:
+        now = now or datetime.now()
+        with self.index_lock:
+            matching = self.tag_index.matching(tags, content_type)
+            tag_groups, content_type_groups = self.tag_index.groups(matching)
+            memory_buoyancy = self.score_indexes["memory_buoyancy"].current
+            preservation_value = self.score_indexes["preservation_value"].current
+            
+            def totals(resource_ids) -> list:
+                if LAZY_MEMORY_BUOYANCY:
+                    rows = np.fromiter((self.score_store.rows[resource_id] for resource_id in resource_ids), dtype=np.int64, count=len(resource_ids))
+                    mb = float(self.score_store.memory_buoyancy_at(now, rows).sum())
+                else:
+                    mb = sum(memory_buoyancy[resource_id][0] for resource_id in resource_ids)
+                return [len(resource_ids), mb, sum(preservation_value[resource_id][0] for resource_id in resource_ids)]
+            
+            return {
+                "total": len(self.score_store) if matching is None else len(matching),
+                "tags": {tag: totals(resource_ids) for tag, resource_ids in tag_groups.items()},
+                "content_types": {value: totals(resource_ids) for value, resource_ids in content_type_groups.items()}
+            }
+    
+    def score_summary(self, now: Optional[datetime] = None) -> Dict:
+        with self.index_lock:
+            if not LAZY_MEMORY_BUOYANCY:
+                return self.score_histograms.summary()
+            # The stored Memory Buoyancy drifts in lazy mode, so the histograms
+            # are not maintained and are built from the scores at `now` instead
+            histograms = ScoreHistograms(self.score_histograms.bins)
+            memory_buoyancy = self.score_store.memory_buoyancy_at(now or datetime.now())
+            preservation_value = self.score_indexes["preservation_value"].current
+            histograms.add_many(
+                (self.tag_index.current[resource_id], mb, preservation_value[resource_id][0])
+                for resource_id, mb in zip(self.score_store.ids, memory_buoyancy.tolist())
+            )
+            return histograms.summary()
+    
+    def _candidates(self, memory_buoyancy: tuple, preservation_value: tuple, now: Optional[datetime]) -> Iterator[Dict]:
+        """
+        Resources whose scores may lie in the given closed ranges: the cells of
+        the score grid, or in lazy mode, where the stored Memory Buoyancy drifts
+        and the grid is not maintained, the score store rows in range at `now`
+        """
+        now = now or datetime.now()
+        with self.index_lock:
+            if LAZY_MEMORY_BUOYANCY:
+                store = self.score_store
+                mb = store.memory_buoyancy_at(now)
+                pv = store.preservation_value[:len(store)]
+                selected = (
+                    (mb >= memory_buoyancy[0]) & (mb <= memory_buoyancy[1])
+                    & (pv >= preservation_value[0]) & (pv <= preservation_value[1])
+                )
+                resource_ids = [store.ids[row] for row in np.flatnonzero(selected).tolist()]
+            else:
+                resource_ids = list(self.score_grid.query(memory_buoyancy, preservation_value))
+        resources = (self._copy(resource_id, now) for resource_id in resource_ids)
+        return (resource for resource in resources if resource is not None)
+    
+    def low_buoyancy(self, threshold: float, limit: Optional[int] = None, now: Optional[datetime] = None) -> List[Dict]:
+        if self._uses_score_index("memory_buoyancy"):
+            # Already in the requested order, so a limit stops the walk early
+            with self.index_lock:
+                keys = list(itertools.islice(self.score_indexes["memory_buoyancy"].ascending_below(threshold), limit))
+            resources = (self._copy(resource_id) for _, resource_id in keys)
+            return [resource for resource in resources if resource is not None]
+        
+        low_mb_resources = (
+            r for r in self._candidates((0.0, threshold), (0.0, 1.0), now)
+            if r["memory_buoyancy"] < threshold
+        )
+        return ranked(low_mb_resources, lambda x: x["memory_buoyancy"], limit)
+    
+    def archive_candidates(
+        self,
+        max_mb: float = ARCHIVE_THRESHOLDS[0],
+        min_pv: float = ARCHIVE_THRESHOLDS[1],
+        limit: Optional[int] = None,
+        now: Optional[datetime] = None
+    ) -> List[Dict]:
+        candidates = (
+            r for r in self._candidates((0.0, max_mb), (min_pv, 1.0), now)
+            if r["memory_buoyancy"] < max_mb and r["preservation_value"] > min_pv
+        )
+        return ranked(candidates, lambda x: -x["preservation_value"], limit)
+    
+    def deletion_candidates(
+        self,
+        max_mb: float = DELETION_THRESHOLDS[0],
+        max_pv: float = DELETION_THRESHOLDS[1],
+        limit: Optional[int] = None,
+        now: Optional[datetime] = None
+    ) -> List[Dict]:
+        candidates = (
+            r for r in self._candidates((0.0, max_mb), (0.0, max_pv), now)
+            if r["memory_buoyancy"] < max_mb and r["preservation_value"] < max_pv
+        )
+        return ranked(candidates, lambda x: x["memory_buoyancy"] + x["preservation_value"], limit)
+    
+    def rescore(self, resource_ids: List[str], now: datetime) -> List[Dict]:
+        rescored = []
+        for resource_id in resource_ids:
+            with self.locks(resource_id):
+                # Cold resources are rescored in place; only their indexed scores change
+                resource = self.resources.get(resource_id) or self._cold_record(resource_id)
+                if resource is None:
+                    continue
+                resource["memory_buoyancy"] = calculate_memory_buoyancy(resource, now)
+                resource["preservation_value"] = calculate_preservation_value(resource, now)
+                self._index(resource)
+                rescored.append(dict(resource))
+        
+        return rescored
+    
+    def recompute_all(self, now: datetime) -> tuple:
+        # Recompute every score in one vectorized pass against a shared `now`,
+        # excluding all writers so the score store and records stay aligned
+        with self.locks.all(), self.index_lock:
+            memory_buoyancy, preservation_value = self.score_store.compute(now)
+            stored = slice(0, len(self.score_store))
+            changes = candidate_changes(
+                self.score_store.ids,
+                (self.score_store.memory_buoyancy[stored], self.score_store.preservation_value[stored]),
+                (memory_buoyancy, preservation_value)
+            )
+            self.score_store.set_scores(None, memory_buoyancy, preservation_value)
+            last_accessed = self.score_indexes["last_accessed"].current
+            scored = []
+            for resource_id, mb, pv in zip(self.score_store.ids, memory_buoyancy.tolist(), preservation_value.tolist()):
+                resource = self.resources.get(resource_id)
+                if resource is None:
+                    # Cold: only the indexed fields are needed
+                    resource = {"id": resource_id, "last_accessed": last_accessed[resource_id][0]}
+                resource["memory_buoyancy"] = mb
+                resource["preservation_value"] = pv
+                scored.append(resource)
+            for index in self.score_indexes.values():
+                index.rebuild(scored)
+            if not LAZY_MEMORY_BUOYANCY:
+                self.score_grid.rebuild(scored)
+                self.score_histograms.rebuild(
+                    (self.tag_index.current[resource["id"]], resource["memory_buoyancy"], resource["preservation_value"]) for resource in scored
+                )
+            self.store_version.bump()
+            
+            return len(scored), changes
+    
+    def demote_cold(self, now: Optional[datetime] = None) -> int:
+        """
+        Move the hot resources whose Memory Buoyancy is below COLD_TIER_THRESHOLD
+        to the cold tier, returning how many were moved
+        """
+        if self.cold_tier is None:
+            return 0
+        now = now or datetime.now()
+        with self.index_lock:
+            if LAZY_MEMORY_BUOYANCY:
+                memory_buoyancy = self.score_store.memory_buoyancy_at(now)
+                resource_ids = [
+                    resource_id for resource_id, mb in zip(self.score_store.ids, memory_buoyancy.tolist())
+                    if mb < COLD_TIER_THRESHOLD
+                ]
+            else:
+                resource_ids = [resource_id for _, resource_id in self.score_indexes["memory_buoyancy"].ascending_below(COLD_TIER_THRESHOLD)]
+        
+        demoted = 0
+        for offset in range(0, len(resource_ids), REPOSITORY_PAGE_SIZE):
+            demoted += self._demote_many(resource_ids[offset:offset + REPOSITORY_PAGE_SIZE], now)
+        self.cold_tier.compact()
+        
+        return demoted
+    
+    def _demote_many(self, resource_ids: List[str], now: datetime) -> int:
+        demoted = 0
+        for resource_id in resource_ids:
+            with self.locks(resource_id):
+                # Skip resources that are cold already or were accessed meanwhile
+                resource = self.resources.get(resource_id)
+                if resource is None:
+                    continue
+                if LAZY_MEMORY_BUOYANCY:
+                    mb = memory_buoyancy_at(memory_buoyancy_base(resource), resource["last_accessed"], now)
+                else:
+                    mb = resource["memory_buoyancy"]
+                if mb < COLD_TIER_THRESHOLD:
+                    self._demote(resource_id)
+                    demoted += 1
+        return demoted
+    
+    def tier_usage(self) -> Optional[Dict]:
+        cold = self.cold_tier.usage() if self.cold_tier is not None else {
+            "resources": 0, "bytes": 0, "file_bytes": 0, "demotions": 0, "promotions": 0, "promotion_latencies": []
+        }
+        return {
+            "cold_tier": self.cold_tier is not None,
+            "hot": {"resources": len(self.resources), "content_bytes": self.blobs.usage()["stored_bytes"]},
+            "cold": cold
+        }
+    
+    def close(self):
+        if self.cold_tier is not None:
+            self.cold_tier.close()
+
+class SQLiteRepository(ResourceRepository):
+    """
+    Resources and access events stored in a SQLite database in WAL mode
+    
+    Scores and their inputs are stored as indexed columns, so listings and
+    candidate queries run as indexed SQL and a full recompute is a single
+    UPDATE. Contents live in a content-addressed blob table, which keeps the
+    scanned rows small and stores identical contents once. Tags are also kept
+    one row per (tag, resource) in `resource_tags` for filters, facets and
+    score summaries, and the words of titles, tags and contents in the
+    contentless FTS5 table `resource_search` for full-text search. Similarity
+    signatures are kept in `resource_signatures`, with one row per LSH bucket
+    of each in `resource_bands`. All statements are fixed SQL with bound
+    parameters, so each connection prepares them once and serves them from
+    its statement cache. Connections are opened per thread. The store version
+    is a row bumped by every write transaction, so processes sharing the
+    database (e.g. several uvicorn workers) see each other's changes.
+    """
+    
+    RESOURCE_COLUMNS = (
+        "id", "title", "content_type", "tags", "context",
+        "created_at", "last_accessed", "access_count",
+        "memory_buoyancy", "preservation_value",
+        "memory_buoyancy_base", "importance", "preservation_importance",
+        "tag_count", "preservation_tag_count", "content_type_factor"
+    )
+    
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS resources (
+            id TEXT PRIMARY KEY,
+            title TEXT NOT NULL,
+            content_type TEXT NOT NULL,
+            tags TEXT NOT NULL,
+            context TEXT,
+            created_at INTEGER NOT NULL,
+            last_accessed INTEGER NOT NULL,
+            access_count INTEGER NOT NULL,
+            memory_buoyancy REAL NOT NULL,
+            preservation_value REAL NOT NULL,
+            memory_buoyancy_base REAL NOT NULL,
+            importance REAL NOT NULL,
+            preservation_importance REAL NOT NULL,
+            tag_count INTEGER NOT NULL,
+            preservation_tag_count INTEGER NOT NULL,
+            content_type_factor REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS resources_memory_buoyancy ON resources (memory_buoyancy, id);
+        CREATE INDEX IF NOT EXISTS resources_preservation_value ON resources (preservation_value, id);
+        CREATE INDEX IF NOT EXISTS resources_last_accessed ON resources (last_accessed, id);
+        CREATE INDEX IF NOT EXISTS resources_content_type ON resources (content_type, id);
+        CREATE TABLE IF NOT EXISTS resource_tags (
+            tag TEXT NOT NULL,
+            id TEXT NOT NULL,
+            PRIMARY KEY (tag, id)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS resource_tags_id ON resource_tags (id);
+        CREATE TABLE IF NOT EXISTS content_blobs (
+            digest BLOB PRIMARY KEY,
+            codec INTEGER NOT NULL,
+            payload BLOB NOT NULL,
+            refcount INTEGER NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS resource_blobs (
+            id TEXT PRIMARY KEY,
+            digest BLOB NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS access_log (
+            seq INTEGER PRIMARY KEY,
+            resource_id TEXT NOT NULL,
+            timestamp INTEGER NOT NULL,
+            access_type TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS access_log_resource ON access_log (resource_id, seq);
+        CREATE VIRTUAL TABLE IF NOT EXISTS resource_search USING fts5(
+            text,
+            content = '',
+            tokenize = "unicode61 remove_diacritics 0 tokenchars '_'"
+        );
+        CREATE VIRTUAL TABLE IF NOT EXISTS resource_search_vocab USING fts5vocab(resource_search, row);
+        CREATE TABLE IF NOT EXISTS resource_signatures (
+            id TEXT NOT NULL,
+            kind TEXT NOT NULL,
+            signature BLOB NOT NULL,
+            PRIMARY KEY (id, kind)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS resource_signatures_signature ON resource_signatures (kind, signature);
+        CREATE TABLE IF NOT EXISTS resource_bands (
+            kind TEXT NOT NULL,
+            band_key INTEGER NOT NULL,
+            id TEXT NOT NULL,
+            PRIMARY KEY (kind, band_key, id)
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS store_version (
+            id INTEGER PRIMARY KEY CHECK (id = 0),
+            value INTEGER NOT NULL
+        );
+    """
+    
+    # Bumped whenever the schema changes; stored as PRAGMA user_version
+    SCHEMA_VERSION = 1
+    
+    # Timestamps are stored as integer microseconds since the epoch
+    MEMORY_BUOYANCY_SQL = """
+        min(1.0, max(0.0,
+            (0.4 * forgetit_exp(-0.1 * (((:now - last_accessed) / 1000000.0) / 86400)))
+            + (0.3 * min(1.0, access_count / 10.0))
+            + (0.2 * importance)
+            + (0.1 * min(1.0, tag_count / 5.0))
+        ))
+    """
+    PRESERVATION_VALUE_SQL = """
+        min(1.0, max(0.0,
+            (0.3 * min(1.0, ((:now - created_at) / 86400000000) / 365.0))
+            + (0.2 * content_type_factor)
+            + (0.3 * preservation_importance)
+            + (0.2 * min(1.0, preservation_tag_count / 2.0))
+        ))
+    """
+    LAZY_MEMORY_BUOYANCY_SQL = """
+        min(1.0, max(0.0,
+            (0.4 * forgetit_exp(-0.1 * (((:now - last_accessed) / 1000000.0) / 86400)))
+            + memory_buoyancy_base
+        ))
+    """
+    
+    # Prune the access log every this many inserted events
+    ACCESS_LOG_PRUNE_INTERVAL = 1024
+    
+    def __init__(self, path: str, access_log_capacity: int = ACCESS_LOG_CAPACITY):
+        self.path = path
+        self.access_log_capacity = access_log_capacity
+        self.local = threading.local()
+        self._create_schema()
+        
+        columns = ", ".join(self.RESOURCE_COLUMNS)
+        placeholders = ", ".join(f":{column}" for column in self.RESOURCE_COLUMNS)
+        assignments = ", ".join(f"{column} = excluded.{column}" for column in self.RESOURCE_COLUMNS[1:])
+        self.save_sql = (
+            f"INSERT INTO resources ({columns}) VALUES ({placeholders}) "
+            f"ON CONFLICT (id) DO UPDATE SET {assignments}"
+        )
+        
+        # In lazy mode Memory Buoyancy is evaluated in SQL at read time
+        self.memory_buoyancy_sql = self.LAZY_MEMORY_BUOYANCY_SQL if LAZY_MEMORY_BUOYANCY else "memory_buoyancy"
+        columns = (
+            "SELECT id, title, content_type, tags, context, created_at, last_accessed, "
+            f"access_count, preservation_value, {self.memory_buoyancy_sql} AS memory_buoyancy"
+        )
+        self.select_sql = columns + " FROM resources"
+        # Rows of the search table share the rowid of their resource
+        self.search_sql = (
+            f"{columns}, -bm25(resource_search) * (1 - :mb_weight + :mb_weight * {self.memory_buoyancy_sql}) AS score "
+            "FROM resource_search JOIN resources ON resources.rowid = resource_search.rowid "
+            "WHERE resource_search MATCH :query ORDER BY score DESC, id DESC LIMIT :k"
+        )
+    
+    def _create_schema(self):
+        """Create the tables of a new database, refusing databases of another schema version"""
+        connection = self.connection
+        # Read both in one statement, so they come from the same snapshot
+        version, created = connection.execute(
+            "SELECT user_version, EXISTS (SELECT 1 FROM sqlite_master WHERE name = 'resources') FROM pragma_user_version"
+        ).fetchone()
+        if version == 0:
+            if created:
+                raise RuntimeError(f"{self.path} has no schema version; it was written by another version")
+            # One transaction, so concurrent processes never see an unstamped schema
+            # The store version starts from the clock, as StoreVersion does
+            connection.executescript(
+                f"BEGIN IMMEDIATE; {self.SCHEMA} "
+                f"INSERT OR IGNORE INTO store_version (id, value) VALUES (0, {time.time_ns()}); "
+                f"PRAGMA user_version = {self.SCHEMA_VERSION}; COMMIT;"
+            )
+        elif version != self.SCHEMA_VERSION:
+            raise RuntimeError(
+                f"{self.path} has schema version {version}, not {self.SCHEMA_VERSION}; "
+                "it was written by another version"
+            )
+    
+    @property
+    def connection(self) -> sqlite3.Connection:
+        connection = getattr(self.local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            connection.row_factory = sqlite3.Row
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.create_function("forgetit_exp", 1, math.exp, deterministic=True)
+            self.local.connection = connection
+        return connection
+    
+    @contextmanager
+    def transaction(self):
+        """Run statements in one write transaction, bumping the store version"""
+        connection = self.connection
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield connection
+            connection.execute("UPDATE store_version SET value = value + 1")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+    
+    def _row_values(self, resource: Dict) -> Dict:
+        inputs = scoring_inputs(resource)
+        return {
+            "id": resource["id"],
+            "title": resource["title"],
+            "content_type": resource["content_type"],
+            "tags": json.dumps(resource["tags"]),
+            "context": None if resource["context"] is None else json.dumps(resource["context"]),
+            "created_at": _to_microseconds(resource["created_at"]),
+            "last_accessed": _to_microseconds(resource["last_accessed"]),
+            "access_count": resource["access_count"],
+            "memory_buoyancy": resource["memory_buoyancy"],
+            "preservation_value": resource["preservation_value"],
+            "memory_buoyancy_base": inputs["memory_buoyancy_base"],
+            "importance": inputs["importance"],
+            "preservation_importance": inputs["preservation_importance"],
+            "tag_count": inputs["tag_count"],
+            "preservation_tag_count": inputs["preservation_tag_count"],
+            "content_type_factor": float(_CONTENT_TYPE_FACTOR_TABLE[inputs["content_type_code"]])
+        }
+    
+    def _to_resource(self, row: sqlite3.Row) -> Dict:
+        return {
+            "id": row["id"],
+            "title": row["title"],
+            "content_type": row["content_type"],
+            "tags": json.loads(row["tags"]),
+            "context": None if row["context"] is None else json.loads(row["context"]),
+            "created_at": _from_microseconds(row["created_at"]),
+            "last_accessed": _from_microseconds(row["last_accessed"]),
+            "access_count": row["access_count"],
+            "memory_buoyancy": row["memory_buoyancy"],
+            "preservation_value": row["preservation_value"]
+        }
+    
+    def _query(self, sql: str, parameters: Dict, now: Optional[datetime] = None) -> List[Dict]:
+        parameters["now"] = _to_microseconds(now or datetime.now())
+        rows = self.connection.execute(sql, parameters).fetchall()
+        return [self._to_resource(row) for row in rows]
+    
+    def _get(self, connection: sqlite3.Connection, resource_id: str) -> Optional[Dict]:
+        row = connection.execute(
+            self.select_sql + " WHERE id = :id",
+            {"id": resource_id, "now": _to_microseconds(datetime.now())}
+        ).fetchone()
+        return None if row is None else self._to_resource(row)
+    
+    def _reference_contents(self, connection: sqlite3.Connection, references: List[tuple]):
+        """
+        Point resources at their content blobs, given (resource_id, encoded)
+        pairs with contents encoded by encode_content, releasing any previous ones
+        """
+        for resource_id, _ in references:
+            self._release_content(connection, resource_id)
+        connection.executemany(
+            "INSERT INTO content_blobs (digest, codec, payload, refcount) VALUES (?, ?, ?, 1) "
+            "ON CONFLICT (digest) DO UPDATE SET refcount = refcount + 1",
+            (encoded for _, encoded in references)
+        )
+        connection.executemany(
+            "INSERT INTO resource_blobs (id, digest) VALUES (?, ?)",
+            ((resource_id, encoded[0]) for resource_id, encoded in references)
+        )
+    
+    def _search_text(self, connection: sqlite3.Connection, resource_id: str) -> Optional[str]:
+        """The text a stored resource is indexed by for search, None if it does not exist"""
+        row = connection.execute(
+            "SELECT title, tags, codec, payload FROM resources JOIN resource_blobs USING (id) JOIN content_blobs USING (digest) "
+            "WHERE id = ?",
+            (resource_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return search_text({"title": row["title"], "tags": json.loads(row["tags"])}, decode_content(row["codec"], row["payload"]))
+    
+    def _index_texts(self, connection: sqlite3.Connection, texts: List[tuple]):
+        """Add (resource_id, text) pairs of stored resources to the search table"""
+        connection.executemany(
+            "INSERT INTO resource_search (rowid, text) SELECT rowid, ? FROM resources WHERE id = ?",
+            ((text, resource_id) for resource_id, text in texts)
+        )
+    
+    def _unindex_text(self, connection: sqlite3.Connection, resource_id: str, text: str):
+        """Remove a stored resource from the search table; a contentless table needs the text it indexed"""
+        connection.execute(
+            "INSERT INTO resource_search (resource_search, rowid, text) SELECT 'delete', rowid, ? FROM resources WHERE id = ?",
+            (text, resource_id)
+        )
+    
+    def _stored_content(self, connection: sqlite3.Connection, resource_id: str) -> str:
+        row = connection.execute(
+            "SELECT codec, payload FROM resource_blobs JOIN content_blobs USING (digest) WHERE id = ?",
+            (resource_id,)
+        ).fetchone()
+        return decode_content(row["codec"], row["payload"])
+    
+    def _index_signatures(self, connection: sqlite3.Connection, signatures: List[tuple]):
+        """Store the (resource_id, similarity_signatures) of resources along with their LSH buckets"""
+        rows = [
+            (resource_id, kind, signature)
+            for resource_id, resource_signatures in signatures
+            for kind, signature in resource_signatures.items()
+            if signature is not None
+        ]
+        connection.executemany("INSERT INTO resource_signatures (id, kind, signature) VALUES (?, ?, ?)", rows)
+        connection.executemany(
+            "INSERT OR IGNORE INTO resource_bands (kind, band_key, id) VALUES (?, ?, ?)",
+            ((kind, key, resource_id) for resource_id, kind, signature in rows for key in lsh_band_keys(signature))
+        )
+    
+    def _unindex_signatures(self, connection: sqlite3.Connection, resource_id: str):
+        rows = connection.execute("SELECT kind, signature FROM resource_signatures WHERE id = ?", (resource_id,)).fetchall()
+        connection.executemany(
+            "DELETE FROM resource_bands WHERE kind = ? AND band_key = ? AND id = ?",
+            ((row["kind"], key, resource_id) for row in rows for key in lsh_band_keys(row["signature"]))
+        )
+        connection.execute("DELETE FROM resource_signatures WHERE id = ?", (resource_id,))
+    
+    def _save_tags(self, connection: sqlite3.Connection, resources: List[Dict]):
+        """Replace the `resource_tags` rows of resources"""
+        connection.executemany("DELETE FROM resource_tags WHERE id = ?", ((resource["id"],) for resource in resources))
+        connection.executemany(
+            "INSERT INTO resource_tags (tag, id) VALUES (?, ?)",
+            ((tag, resource["id"]) for resource in resources for tag in set(resource["tags"]))
+        )
+    
+    def _filter_conditions(
+        self,
+        tags: Optional[List[str]],
+        content_type: Optional[str],
+        parameters: Dict,
+        min_mb: Optional[float] = None,
+        min_pv: Optional[float] = None
+    ) -> List[str]:
+        """SQL conditions on `resources` for the filters of iter_resources, binding their parameters"""
+        conditions = []
+        if min_mb is not None:
+            conditions.append(f"{self.memory_buoyancy_sql} >= :min_mb")
+            parameters["min_mb"] = min_mb
+        if min_pv is not None:
+            conditions.append("preservation_value >= :min_pv")
+            parameters["min_pv"] = min_pv
+        for position, tag in enumerate(tags or ()):
+            conditions.append(f"id IN (SELECT id FROM resource_tags WHERE tag = :tag{position})")
+            parameters[f"tag{position}"] = tag
+        if content_type is not None:
+            conditions.append("content_type = :content_type")
+            parameters["content_type"] = content_type
+        return conditions
+    
+    def _release_content(self, connection: sqlite3.Connection, resource_id: str):
+        row = connection.execute("SELECT digest FROM resource_blobs WHERE id = ?", (resource_id,)).fetchone()
+        if row is None:
+            return
+        connection.execute("DELETE FROM resource_blobs WHERE id = ?", (resource_id,))
+        connection.execute("UPDATE content_blobs SET refcount = refcount - 1 WHERE digest = ?", (row["digest"],))
+        connection.execute("DELETE FROM content_blobs WHERE digest = ? AND refcount <= 0", (row["digest"],))
+    
+    def count(self) -> int:
+        return self.connection.execute("SELECT COUNT(*) FROM resources").fetchone()[0]
+    
+    def version(self) -> int:
+        return self.connection.execute("SELECT value FROM store_version").fetchone()[0]
+    
+    def get(self, resource_id: str) -> Optional[Dict]:
+        return self._get(self.connection, resource_id)
+    
+    def contents(self, resource_ids: List[str]) -> Dict[str, str]:
+        contents = {}
+        for start in range(0, len(resource_ids), REPOSITORY_PAGE_SIZE):
+            chunk = resource_ids[start:start + REPOSITORY_PAGE_SIZE]
+            rows = self.connection.execute(
+                "SELECT id, codec, payload FROM resource_blobs JOIN content_blobs USING (digest) "
+                f"WHERE id IN ({', '.join('?' * len(chunk))})",
+                chunk
+            )
+            contents.update((row["id"], decode_content(row["codec"], row["payload"])) for row in rows)
+        return contents
+    
+    def create(self, resource: Dict):
+        encoded = encode_content(resource["content"])
+        signatures = similarity_signatures(resource, resource["content"])
+        with self.transaction() as connection:
+            connection.execute(self.save_sql, self._row_values(resource))
+            self._save_tags(connection, [resource])
+            self._reference_contents(connection, [(resource["id"], encoded)])
+            self._index_texts(connection, [(resource["id"], search_text(resource, resource["content"]))])
+            self._index_signatures(connection, [(resource["id"], signatures)])
+    
+    def create_many(self, resources: List[Dict], now: datetime):
+        # Score the batch with a temporary columnar store
+        score_store = ScoreStore(capacity=max(1, len(resources)))
+        for resource in resources:
+            score_store.upsert(resource)
+        memory_buoyancy, preservation_value = score_store.compute(now)
+        for resource, mb, pv in zip(resources, memory_buoyancy.tolist(), preservation_value.tolist()):
+            resource["memory_buoyancy"] = mb
+            resource["preservation_value"] = pv
+        
+        references = [(resource["id"], encode_content(resource["content"])) for resource in resources]
+        signatures = [(resource["id"], similarity_signatures(resource, resource["content"])) for resource in resources]
+        with self.transaction() as connection:
+            connection.executemany(self.save_sql, (self._row_values(resource) for resource in resources))
+            self._save_tags(connection, resources)
+            self._reference_contents(connection, references)
+            self._index_texts(connection, [(resource["id"], search_text(resource, resource["content"])) for resource in resources])
+            self._index_signatures(connection, signatures)
+    
+    def touch(self, resource_id: str, timestamp: datetime, count: int = 1, now: Optional[datetime] = None) -> Optional[Dict]:
+        with self.transaction() as connection:
+            resource = self._get(connection, resource_id)
+            if resource is None:
+                return None
+            resource["last_accessed"] = timestamp
+            resource["access_count"] += count
+            resource["memory_buoyancy"] = calculate_memory_buoyancy(resource, now)
+            connection.execute(self.save_sql, self._row_values(resource))
+        
+        return resource
+    
+    def update(self, resource_id: str, changes: Dict, now: datetime) -> Optional[Dict]:
+        changes = dict(changes)
+        content = changes.pop("content", None)
+        encoded = None if content is None else encode_content(content)
+        with self.transaction() as connection:
+            resource = self._get(connection, resource_id)
+            if resource is None:
+                return None
+            reindexed = bool(changes.keys() & {"title", "tags"}) or content is not None
+            if reindexed:
+                self._unindex_text(connection, resource_id, self._search_text(connection, resource_id))
+            for field, value in changes.items():
+                resource[field] = value
+            resource["last_accessed"] = now
+            resource["access_count"] += 1
+            resource["memory_buoyancy"] = calculate_memory_buoyancy(resource, now)
+            resource["preservation_value"] = calculate_preservation_value(resource, now)
+            connection.execute(self.save_sql, self._row_values(resource))
+            if "tags" in changes:
+                self._save_tags(connection, [resource])
+            if encoded is not None:
+                self._reference_contents(connection, [(resource_id, encoded)])
+            if reindexed:
+                text = search_text(resource, content) if content is not None else self._search_text(connection, resource_id)
+                self._index_texts(connection, [(resource_id, text)])
+            if "tags" in changes or content is not None:
+                self._unindex_signatures(connection, resource_id)
+                signatures = similarity_signatures(resource, content if content is not None else self._stored_content(connection, resource_id))
+                self._index_signatures(connection, [(resource_id, signatures)])
+        
+        return resource
+    
+    def delete(self, resource_id: str) -> bool:
+        with self.transaction() as connection:
+            text = self._search_text(connection, resource_id)
+            if text is not None:
+                self._unindex_text(connection, resource_id, text)
+            self._unindex_signatures(connection, resource_id)
+            deleted = connection.execute("DELETE FROM resources WHERE id = ?", (resource_id,)).rowcount
+            connection.execute("DELETE FROM resource_tags WHERE id = ?", (resource_id,))
+            self._release_content(connection, resource_id)
+            connection.execute("DELETE FROM access_log WHERE resource_id = ?", (resource_id,))
+        
+        return deleted > 0
+    
+    def log_access(self, resource_id: str, timestamp: datetime, access_type: str):
+        self.log_accesses([(resource_id, timestamp, access_type)])
+    
+    def log_accesses(self, events: List[tuple]):
+        with self.transaction() as connection:
+            last_seq = None
+            for resource_id, timestamp, access_type in events:
+                last_seq = connection.execute(
+                    "INSERT INTO access_log (resource_id, timestamp, access_type) VALUES (?, ?, ?)",
+                    (resource_id, _to_microseconds(timestamp), access_type)
+                ).lastrowid
+            
+            # Keep only the most recent events
+            if last_seq is not None and last_seq % self.ACCESS_LOG_PRUNE_INTERVAL < len(events):
+                connection.execute("DELETE FROM access_log WHERE seq <= ?", (last_seq - self.access_log_capacity,))
+    
+    def access_history(self, resource_id: str, limit: Optional[int] = None) -> List[Dict]:
+        rows = self.connection.execute(
+            "SELECT timestamp, access_type FROM access_log WHERE resource_id = ? ORDER BY seq DESC LIMIT ?",
+            (resource_id, -1 if limit is None else limit)
+        ).fetchall()
+        return [
+            {"resource_id": resource_id, "timestamp": _from_microseconds(row["timestamp"]), "access_type": row["access_type"]}
+            for row in rows
+        ]
+    
+    def iter_resources(
+        self,
+        min_mb: Optional[float],
+        min_pv: Optional[float],
+        sort_by: str,
+        after: Optional[tuple] = None,
+        now: Optional[datetime] = None,
+        tags: Optional[List[str]] = None,
+        content_type: Optional[str] = None
+    ) -> Iterator[Dict]:
+        if now is None:
+            now = datetime.now()
+        sort_sql = {
+            "memory_buoyancy": self.memory_buoyancy_sql,
+            "preservation_value": "preservation_value",
+            "last_accessed": "last_accessed"
+        }.get(sort_by)
+        
+        parameters = {"limit": REPOSITORY_PAGE_SIZE}
+        conditions = self._filter_conditions(tags, content_type, parameters, min_mb, min_pv)
+        if sort_sql is not None:
+            keyset_condition = f"({sort_sql}, id) < (:after_value, :after_id)"
+            order = f"{sort_sql} DESC, id DESC"
+        else:
+            keyset_condition = "id < :after_id"
+            order = "id DESC"
+        
+        # Fetch page by page through the keyset so memory stays constant
+        while True:
+            page_conditions = conditions if after is None else conditions + [keyset_condition]
+            if after is not None:
+                parameters["after_id"] = after[-1]
+                if sort_sql is not None:
+                    parameters["after_value"] = _to_microseconds(after[0]) if sort_by == "last_accessed" else after[0]
+            where = f" WHERE {' AND '.join(page_conditions)}" if page_conditions else ""
+            page = self._query(f"{self.select_sql}{where} ORDER BY {order} LIMIT :limit", parameters, now)
+            yield from page
+            if len(page) < REPOSITORY_PAGE_SIZE:
+                return
+            after = cursor_key(page[-1], sort_by)
+    
+    def top(
+        self,
+        rank_by: str,
+        k: int,
+        min_mb: Optional[float] = None,
+        min_pv: Optional[float] = None,
+        tags: Optional[List[str]] = None,
+        content_type: Optional[str] = None,
+        now: Optional[datetime] = None
+    ) -> List[Dict]:
+        # Indexed rankings walk their index; the others keep only the best k rows
+        # in SQLite's sorter, which bounds ORDER BY ... LIMIT like a heap
+        rank_sql = {
+            "mb": self.memory_buoyancy_sql,
+            "pv": "preservation_value",
+            "pv-mb": f"preservation_value - {self.memory_buoyancy_sql}",
+            "last_accessed": "last_accessed"
+        }[rank_by]
+        parameters = {"k": k}
+        conditions = self._filter_conditions(tags, content_type, parameters, min_mb, min_pv)
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        return self._query(f"{self.select_sql}{where} ORDER BY {rank_sql} DESC, id DESC LIMIT :k", parameters, now)
+    
+    def search(
+        self,
+        query: str,
+        k: int,
+        mb_weight: float = 0.0,
+        now: Optional[datetime] = None,
+        statistics: Optional[tuple] = None
+    ) -> List[tuple]:
+        # Scored with FTS5's own BM25 (the negated bm25() rank); `statistics` are not used
+        terms = list(dict.fromkeys(search_terms(query)))
+        if not terms:
+            return []
+        parameters = {
+            "query": " OR ".join(f'"{term}"' for term in terms),
+            "mb_weight": mb_weight,
+            "k": k,
+            "now": _to_microseconds(now or datetime.now())
+        }
+        rows = self.connection.execute(self.search_sql, parameters).fetchall()
+        return [(row["score"], self._to_resource(row)) for row in rows]
+    
+    def search_statistics(self, query: str) -> tuple:
+        # Read from FTS5's vocabulary; the total length sums over every word
+        connection = self.connection
+        documents = connection.execute("SELECT count(*) FROM resources").fetchone()[0]
+        total_length = connection.execute("SELECT coalesce(sum(cnt), 0) FROM resource_search_vocab").fetchone()[0]
+        frequencies = {}
+        for term in dict.fromkeys(search_terms(query)):
+            row = connection.execute("SELECT doc FROM resource_search_vocab WHERE term = ?", (term,)).fetchone()
+            frequencies[term] = 0 if row is None else row["doc"]
+        return documents, total_length, frequencies
+    
+    def similarity_signature(self, resource_id: str, kind: str) -> Optional[bytes]:
+        row = self.connection.execute(
+            "SELECT signature FROM resources LEFT JOIN resource_signatures ON resource_signatures.id = resources.id AND kind = ? "
+            "WHERE resources.id = ?",
+            (kind, resource_id)
+        ).fetchone()
+        if row is None:
+            return None
+        return row["signature"] or b""
+    
+    def similar(
+        self,
+        kind: str,
+        signature: bytes,
+        k: int,
+        min_similarity: float,
+        exclude: Optional[str] = None,
+        now: Optional[datetime] = None
+    ) -> List[tuple]:
+        rows = self.connection.execute(
+            "SELECT id, signature FROM resource_signatures WHERE kind = ? AND id IN "
+            f"(SELECT id FROM resource_bands WHERE kind = ? AND band_key IN ({', '.join('?' * LSH_BANDS)}))",
+            (kind, kind, *lsh_band_keys(signature))
+        ).fetchall()
+        rows = [row for row in rows if row["id"] != exclude]
+        similarities = minhash_similarities(signature, [row["signature"] for row in rows]).tolist()
+        best = heapq.nlargest(k, (
+            (similarity, row["id"]) for similarity, row in zip(similarities, rows) if similarity >= min_similarity
+        ))
+        resources = {
+            resource["id"]: resource
+            for resource in self._query(
+                f"{self.select_sql} WHERE id IN (SELECT value FROM json_each(:ids))",
+                {"ids": json.dumps([resource_id for _, resource_id in best])},
+                now
+            )
+        }
+        return [(similarity, resources[resource_id]) for similarity, resource_id in best if resource_id in resources]
+    
+    def similarity_counts(self, kind: str) -> Dict[bytes, int]:
+        rows = self.connection.execute("SELECT signature, COUNT(*) FROM resource_signatures WHERE kind = ? GROUP BY signature", (kind,))
+        return {signature: count for signature, count in rows}
+    
+    def similarity_members(self, kind: str, clusters: List[List[bytes]], k: int, now: Optional[datetime] = None) -> List[List[Dict]]:
+        members = []
+        for signatures in clusters:
+            resource_ids = [
+                row[0]
+                for signature in signatures
+                for row in self.connection.execute("SELECT id FROM resource_signatures WHERE kind = ? AND signature = ?", (kind, signature))
+            ]
+            members.append(self._query(
+                f"{self.select_sql} WHERE id IN (SELECT value FROM json_each(:ids)) ORDER BY memory_buoyancy DESC, id DESC LIMIT :k",
+                {"ids": json.dumps(resource_ids), "k": k},
+                now
+            ))
+        return members
+    
+    def facets(self, tags: Optional[List[str]] = None, content_type: Optional[str] = None, now: Optional[datetime] = None) -> Dict:
+        parameters = {"now": _to_microseconds(now or datetime.now())}
+        conditions = self._filter_conditions(tags, content_type, parameters)
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        totals = f"COUNT(*), SUM({self.memory_buoyancy_sql}), SUM(preservation_value)"
+        connection = self.connection
+        
+        return {
+            "total": connection.execute(f"SELECT COUNT(*) FROM resources{where}", parameters).fetchone()[0],
+            "tags": {
+                row[0]: list(row[1:]) for row in connection.execute(
+                    f"SELECT tag, {totals} FROM resource_tags JOIN resources USING (id){where} GROUP BY tag", parameters
+                )
+            },
+            "content_types": {
+                row[0]: list(row[1:]) for row in connection.execute(
+                    f"SELECT content_type, {totals} FROM resources{where} GROUP BY content_type", parameters
+                )
+            }
+        }
+    
+    def score_summary(self, now: Optional[datetime] = None) -> Dict:
+        # One aggregate query per grouping counts resources per (value, MB bin,
+        # PV bin); the rows are folded into histograms here
+        bins = SUMMARY_BINS
+        parameters = {"now": _to_microseconds(now or datetime.now()), "bins": bins, "last_bin": bins - 1}
+        scores = f"{self.memory_buoyancy_sql} AS mb, preservation_value AS pv"
+        totals = (
+            "MIN(:last_bin, MAX(0, CAST(mb * :bins AS INTEGER))), MIN(:last_bin, MAX(0, CAST(pv * :bins AS INTEGER))), "
+            "COUNT(*), SUM(mb), SUM(pv)"
+        )
+        queries = {
+            "content_types": f"SELECT content_type, {totals} FROM (SELECT content_type, {scores} FROM resources) GROUP BY 1, 2, 3",
+            "tags": f"SELECT tag, {totals} FROM (SELECT tag, {scores} FROM resource_tags JOIN resources USING (id)) GROUP BY 1, 2, 3"
+        }
+        
+        summary = {"bins": bins, "total": [0, 0.0, 0.0, [0] * bins, [0] * bins], "tags": {}, "content_types": {}}
+        for group, sql in queries.items():
+            for value, mb_bin, pv_bin, count, mb, pv in self.connection.execute(sql, parameters):
+                aggregate = summary[group].setdefault(value, [0, 0.0, 0.0, [0] * bins, [0] * bins])
+                # Every resource has exactly one content type, so those rows also make up the total
+                for target in (aggregate, summary["total"]) if group == "content_types" else (aggregate,):
+                    target[0] += count
+                    target[1] += mb
+                    target[2] += pv
+                    target[3][mb_bin] += count
+                    target[4][pv_bin] += count
+        return summary
+    
+    def low_buoyancy(self, threshold: float, limit: Optional[int] = None, now: Optional[datetime] = None) -> List[Dict]:
+        mb = self.memory_buoyancy_sql
+        return self._query(
+            f"{self.select_sql} WHERE {mb} < :threshold ORDER BY {mb}, id LIMIT :limit",
+            {"threshold": threshold, "limit": -1 if limit is None else limit},
+            now
+        )
+    
+    def archive_candidates(
+        self,
+        max_mb: float = ARCHIVE_THRESHOLDS[0],
+        min_pv: float = ARCHIVE_THRESHOLDS[1],
+        limit: Optional[int] = None,
+        now: Optional[datetime] = None
+    ) -> List[Dict]:
+        return self._query(
+            f"{self.select_sql} WHERE {self.memory_buoyancy_sql} < :max_mb AND preservation_value > :min_pv "
+            "ORDER BY preservation_value DESC, id LIMIT :limit",
+            {"max_mb": max_mb, "min_pv": min_pv, "limit": -1 if limit is None else limit},
+            now
+        )
+    
+    def deletion_candidates(
+        self,
+        max_mb: float = DELETION_THRESHOLDS[0],
+        max_pv: float = DELETION_THRESHOLDS[1],
+        limit: Optional[int] = None,
+        now: Optional[datetime] = None
+    ) -> List[Dict]:
+        mb = self.memory_buoyancy_sql
+        return self._query(
+            f"{self.select_sql} WHERE {mb} < :max_mb AND preservation_value < :max_pv "
+            f"ORDER BY {mb} + preservation_value, id LIMIT :limit",
+            {"max_mb": max_mb, "max_pv": max_pv, "limit": -1 if limit is None else limit},
+            now
+        )
+    
+    def rescore(self, resource_ids: List[str], now: datetime) -> List[Dict]:
+        with self.transaction() as connection:
+            connection.executemany(
+                f"UPDATE resources SET memory_buoyancy = {self.MEMORY_BUOYANCY_SQL}, "
+                f"preservation_value = {self.PRESERVATION_VALUE_SQL} WHERE id = :id",
+                ({"id": resource_id, "now": _to_microseconds(now)} for resource_id in resource_ids)
+            )
+            resources = [self._get(connection, resource_id) for resource_id in resource_ids]
+        
+        return [resource for resource in resources if resource is not None]
+    
+    @staticmethod
+    def _candidate_code_sql(mb: str, pv: str) -> str:
+        """SQL counterpart of candidate_set_codes"""
+        return (
+            f"({mb} < {LOW_BUOYANCY_THRESHOLD}) "
+            f"+ 2 * ({mb} < {ARCHIVE_THRESHOLDS[0]} AND {pv} > {ARCHIVE_THRESHOLDS[1]}) "
+            f"+ 4 * ({mb} < {DELETION_THRESHOLDS[0]} AND {pv} < {DELETION_THRESHOLDS[1]})"
+        )
+    
+    def recompute_all(self, now: datetime) -> tuple:
+        parameters = {"now": _to_microseconds(now)}
+        with self.transaction() as connection:
+            # Only the rows whose candidate sets change are read back
+            rows = connection.execute(
+                "SELECT id, memory_buoyancy, preservation_value, new_mb, new_pv FROM ("
+                f"SELECT id, memory_buoyancy, preservation_value, {self.MEMORY_BUOYANCY_SQL} AS new_mb, "
+                f"{self.PRESERVATION_VALUE_SQL} AS new_pv FROM resources"
+                f") WHERE {self._candidate_code_sql('memory_buoyancy', 'preservation_value')} "
+                f"!= {self._candidate_code_sql('new_mb', 'new_pv')}",
+                parameters
+            ).fetchall()
+            count = connection.execute(
+                f"UPDATE resources SET memory_buoyancy = {self.MEMORY_BUOYANCY_SQL}, "
+                f"preservation_value = {self.PRESERVATION_VALUE_SQL}",
+                parameters
+            ).rowcount
+        
+        columns = np.array([row[1:] for row in rows], dtype=np.float64).reshape(-1, 4).T
+        return count, candidate_changes([row[0] for row in rows], (columns[0], columns[1]), (columns[2], columns[3]))
+
+class OperationLog:
+    """
+    Append-only log of repository operations
+    
+    The log is split into segment files named after the first sequence number
+    they contain. Records are framed as (length, crc32, pickled payload), so a
+    torn record at the tail is detected and cut off during recovery. Appends
+    are buffered and fsynced by a background thread every `fsync_interval`
+    seconds (group commit), or on every append if the interval is 0. `lock`
+    is only held while a record is numbered and written, which orders the
+    records of concurrent writers.
+    """
+    
+    HEADER = struct.Struct("<II")
+    SEGMENT_PATTERN = re.compile(r"^oplog-(\d{20})\.log$")
+    
+    def __init__(self, directory: str, fsync_interval: float):
+        self.directory = directory
+        self.fsync_interval = fsync_interval
+        self.lock = threading.Lock()
+        self.file = None
+        self.path = None
+        self.dirty = False
+        self.lsn = 0  # Sequence number of the last record
+        self.stopped = threading.Event()
+        self.flusher = None
+    
+    def segments(self) -> List[tuple]:
+        """Return (first_lsn, path) of all segments in sequence order"""
+        segments = []
+        for name in os.listdir(self.directory):
+            match = self.SEGMENT_PATTERN.match(name)
+            if match:
+                segments.append((int(match.group(1)), os.path.join(self.directory, name)))
+        return sorted(segments)
+    
+    def replay(self, after_lsn: int) -> Iterator[tuple]:
+        """Yield (lsn, operation, arguments) for every record after `after_lsn`"""
+        self.lsn = after_lsn
+        for first_lsn, path in self.segments():
+            with open(path, "r+b") as segment:
+                offset = 0
+                while True:
+                    header = segment.read(self.HEADER.size)
+                    if not header:
+                        break
+                    payload = b""
+                    if len(header) == self.HEADER.size:
+                        length, checksum = self.HEADER.unpack(header)
+                        payload = segment.read(length)
+                    if len(header) < self.HEADER.size or len(payload) < length or zlib.crc32(payload) != checksum:
+                        # Torn write from a crash: drop the incomplete tail
+                        segment.truncate(offset)
+                        break
+                    offset = segment.tell()
+                    lsn, operation, arguments = pickle.loads(payload)
+                    if lsn > after_lsn:
+                        self.lsn = lsn
+                        yield lsn, operation, arguments
+    
+    def open(self):
+        """Start a new segment after the last replayed record and start the flusher"""
+        self._open_segment()
+        if self.fsync_interval > 0:
+            self.flusher = threading.Thread(target=self._flush_periodically, name="oplog-flusher", daemon=True)
+            self.flusher.start()
+    
+    def _open_segment(self):
+        self.path = os.path.join(self.directory, f"oplog-{self.lsn + 1:020d}.log")
+        self.file = open(self.path, "ab")
+    
+    def _flush_periodically(self):
+        while not self.stopped.wait(self.fsync_interval):
+            self.sync()
+    
+    def append(self, operation: str, arguments: tuple) -> int:
+        with self.lock:
+            self.lsn += 1
+            payload = pickle.dumps((self.lsn, operation, arguments), protocol=pickle.HIGHEST_PROTOCOL)
+            self.file.write(self.HEADER.pack(len(payload), zlib.crc32(payload)) + payload)
+            self.dirty = True
+            if self.fsync_interval <= 0:
+                self._sync()
+            return self.lsn
+    
+    def _sync(self):
+        if self.dirty:
+            self.file.flush()
+            os.fsync(self.file.fileno())
+            self.dirty = False
+    
+    def sync(self):
+        with self.lock:
+            self._sync()
+    
+    def rotate(self) -> int:
+        """Close the current segment and continue in a new one, returning the last lsn written"""
+        with self.lock:
+            self._sync()
+            self.file.close()
+            self._open_segment()
+            return self.lsn
+    
+    def discard_through(self, lsn: int):
+        """Delete segments whose records are all covered by a snapshot at `lsn`"""
+        segments = self.segments()
+        for (_, path), (next_first_lsn, _) in zip(segments, segments[1:]):
+            if next_first_lsn <= lsn + 1:
+                os.remove(path)
+    
+    def close(self):
+        self.stopped.set()
+        if self.flusher is not None:
+            self.flusher.join()
+        with self.lock:
+            self._sync()
+            self.file.close()
+            if os.path.getsize(self.path) == 0:
+                os.remove(self.path)
+
+class DurableInMemoryRepository(InMemoryRepository):
+    """
+    In-memory repository that survives restarts
+    
+    Every change is applied in memory and then appended to an operation log.
+    Periodic snapshots write the whole in-memory state (records, content
+    blobs, score store columns, sorted index keys, tag and word postings,
+    similarity buckets, score histograms, access log arrays and cold tier
+    entries) as one pickle of plain data, after which the log segments they
+    cover are deleted. On startup the latest snapshot is loaded and the log
+    tail after it is replayed, so recovery time is bounded by the snapshot
+    size plus the operations logged during one snapshot interval.
+    
+    Each writer applies its change and appends its record while holding the
+    stripes of the resources it changes (and the access log lock for access
+    events), so records of the same resource are logged in the order they
+    were applied while writers of different resources proceed in parallel.
+    A snapshot holds every stripe and the access log lock while it serializes
+    the state. Moving resources between tiers changes no data and is not
+    logged; the cold tier file itself is scratch space rebuilt from the
+    snapshot.
+    """
+    
+    SNAPSHOT_PATTERN = re.compile(r"^snapshot-(\d{20})\.bin$")
+    # Bumped whenever the layout of the snapshot state changes
+    SNAPSHOT_FORMAT = 1
+    
+    def __init__(
+        self,
+        directory: str,
+        fsync_interval: float = WAL_FSYNC_INTERVAL,
+        snapshot_interval: float = SNAPSHOT_INTERVAL,
+        cold_tier: Optional[ColdTier] = None
+    ):
+        super().__init__(cold_tier)
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.log = OperationLog(directory, fsync_interval)
+        self.snapshot_lsn = self.recover()
+        self.log.open()
+        
+        self.stopped = threading.Event()
+        self.snapshotter = None
+        if snapshot_interval > 0:
+            self.snapshotter = threading.Thread(
+                target=self._snapshot_periodically, args=(snapshot_interval,), name="snapshotter", daemon=True
+            )
+            self.snapshotter.start()
+    
+    def _snapshots(self) -> List[tuple]:
+        """Return (lsn, path) of all snapshots, oldest first"""
+        snapshots = []
+        for name in os.listdir(self.directory):
+            match = self.SNAPSHOT_PATTERN.match(name)
+            if match:
+                snapshots.append((int(match.group(1)), os.path.join(self.directory, name)))
+        return sorted(snapshots)
+    
+    def recover(self) -> int:
+        """Load the latest snapshot and replay the log after it, returning the snapshot lsn"""
+        snapshot_lsn = 0
+        snapshots = self._snapshots()
+        if snapshots:
+            snapshot_lsn, path = snapshots[-1]
+            with open(path, "rb") as snapshot:
+                state = pickle.load(snapshot)
+            if state.get("format") != self.SNAPSHOT_FORMAT:
+                raise RuntimeError(
+                    f"{path} has snapshot format {state.get('format')}, not {self.SNAPSHOT_FORMAT}; "
+                    "it was written by another version"
+                )
+            self.resources = state["resources"]
+            self.content_digests = state["content_digests"]
+            self.blobs.blobs = state["blobs"]
+            vars(self.score_store).update(state["score_store"])
+            for field, index_state in state["score_indexes"].items():
+                vars(self.score_indexes[field]).update(index_state)
+            # The score grid and histograms depend on the configuration, which
+            # may have changed since the snapshot was written
+            grid_state = state.get("score_grid")
+            if grid_state is not None and grid_state["cells"] == self.score_grid.cells:
+                vars(self.score_grid).update(grid_state)
+            elif not LAZY_MEMORY_BUOYANCY:
+                preservation_value = self.score_indexes["preservation_value"].current
+                self.score_grid.rebuild(
+                    {"id": resource_id, "memory_buoyancy": key[0], "preservation_value": preservation_value[resource_id][0]}
+                    for resource_id, key in self.score_indexes["memory_buoyancy"].current.items()
+                )
+            vars(self.access_log).update(state["access_log"])
+            
+            cold = state["cold"]
+            if self.cold_tier is not None:
+                self.cold_tier.load(cold)
+            else:
+                # The cold tier was switched off since: bring its resources back into memory
+                for resource_id, entry in cold.items():
+                    resource, digest, codec, payload = ColdTier.decode(entry)
+                    self.resources[resource_id] = self._with_scores(resource)
+                    self.content_digests[resource_id] = self.blobs.add(digest, codec, payload)
+            
+            vars(self.tag_index).update(state["tag_index"])
+            histograms_state = state.get("score_histograms")
+            if histograms_state is not None and histograms_state["bins"] == self.score_histograms.bins:
+                vars(self.score_histograms).update(histograms_state)
+            elif not LAZY_MEMORY_BUOYANCY:
+                self.score_histograms.rebuild(self._histogram_entry(resource_id) for resource_id in self.tag_index.current)
+            
+            vars(self.search_index).update(state["search_index"])
+            for kind, index in self.similarity_indexes.items():
+                vars(index).update(state["similarity_indexes"][kind])
+        
+        for _, operation, arguments in self.log.replay(snapshot_lsn):
+            getattr(InMemoryRepository, operation)(self, *arguments)
+        
+        return snapshot_lsn
+    
+    def snapshot(self) -> int:
+        """Write a snapshot of the current state and drop the log segments it covers"""
+        with self.locks.all(), self.access_log_lock:
+            lsn = self.log.rotate()
+            state = {
+                "format": self.SNAPSHOT_FORMAT,
+                "resources": self.resources,
+                "content_digests": self.content_digests,
+                "blobs": self.blobs.blobs,
+                "score_store": vars(self.score_store),
+                "score_indexes": {field: vars(index) for field, index in self.score_indexes.items()},
+                "score_grid": None if LAZY_MEMORY_BUOYANCY else vars(self.score_grid),
+                "tag_index": vars(self.tag_index),
+                "score_histograms": None if LAZY_MEMORY_BUOYANCY else vars(self.score_histograms),
+                "search_index": vars(self.search_index),
+                "similarity_indexes": {kind: vars(index) for kind, index in self.similarity_indexes.items()},
+                "access_log": vars(self.access_log),
+                "cold": {} if self.cold_tier is None else self.cold_tier.entries()
+            }
+            payload = pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL)
+        
+        path = os.path.join(self.directory, f"snapshot-{lsn:020d}.bin")
+        with open(path + ".tmp", "wb") as snapshot:
+            snapshot.write(payload)
+            snapshot.flush()
+            os.fsync(snapshot.fileno())
+        os.replace(path + ".tmp", path)
+        
+        for old_lsn, old_path in self._snapshots():
+            if old_lsn < lsn:
+                os.remove(old_path)
+        self.log.discard_through(lsn)
+        self.snapshot_lsn = lsn
+        
+        return lsn
+    
+    def _snapshot_periodically(self, interval: float):
+        while not self.stopped.wait(interval):
+            if self.log.lsn > self.snapshot_lsn:
+                self.snapshot()
+    
+    def close(self, snapshot: bool = True):
+        """Stop the background threads, optionally snapshotting so the next start is fast"""
+        self.stopped.set()
+        if self.snapshotter is not None:
+            self.snapshotter.join()
+        if snapshot and self.log.lsn > self.snapshot_lsn:
+            self.snapshot()
+        self.log.close()
+        super().close()
+    
+    def create(self, resource: Dict):
+        with self.locks(resource["id"]):
+            super().create(resource)
+            self.log.append("create", (resource,))
+    
+    def create_many(self, resources: List[Dict], now: datetime):
+        with self.locks.all():
+            super().create_many(resources, now)
+            self.log.append("create_many", (resources, now))
+    
+    def touch(self, resource_id: str, timestamp: datetime, count: int = 1, now: Optional[datetime] = None) -> Optional[Dict]:
+        now = now or datetime.now()
+        with self.locks(resource_id):
+            resource = super().touch(resource_id, timestamp, count, now)
+            if resource is not None:
+                self.log.append("touch", (resource_id, timestamp, count, now))
+        return resource
+    
+    def update(self, resource_id: str, changes: Dict, now: datetime) -> Optional[Dict]:
+        with self.locks(resource_id):
+            resource = super().update(resource_id, changes, now)
+            if resource is not None:
+                self.log.append("update", (resource_id, changes, now))
+        return resource
+    
+    def delete(self, resource_id: str) -> bool:
+        with self.locks(resource_id):
+            deleted = super().delete(resource_id)
+            if deleted:
+                self.log.append("delete", (resource_id,))
+        return deleted
+    
+    def log_access(self, resource_id: str, timestamp: datetime, access_type: str):
+        # The access log is one ring shared by all resources, so its records
+        # are ordered by its lock
+        with self.locks(resource_id), self.access_log_lock:
+            super().log_access(resource_id, timestamp, access_type)
+            self.log.append("log_access", (resource_id, timestamp, access_type))
+    
+    def log_accesses(self, events: List[tuple]):
+        with self.locks.many(event[0] for event in events), self.access_log_lock:
+            super().log_accesses(events)
+            self.log.append("log_accesses", (events,))
+    
+    def rescore(self, resource_ids: List[str], now: datetime) -> List[Dict]:
+        with self.locks.many(resource_ids):
+            rescored = super().rescore(resource_ids, now)
+            if rescored:
+                self.log.append("rescore", ([resource["id"] for resource in rescored], now))
+        return rescored
+    
+    def recompute_all(self, now: datetime) -> tuple:
+        with self.locks.all():
+            result = super().recompute_all(now)
+            self.log.append("recompute_all", (now,))
+        return result
+
+# Sharded deployment
+def shard_index(resource_id: str, shards: int) -> int:
+    """Shard owning a resource; stable across processes, unlike hash()"""
+    return zlib.crc32(resource_id.encode()) % shards
+
+class ShardServer:
+    """
+    Serves one shard's repository to the API workers over a local socket
+    
+    Requests are (method, arguments) tuples naming a repository method, one of
+    the paging helpers below, or an event log method on the shard hosting the
+    event log. Each connection is served by its own thread. Changed resources
+    are rescheduled with the shard's own crossing scheduler, since each shard
+    tracks the threshold crossings of the resources it owns.
+    """
+    
+    REPOSITORY_METHODS = {
+        "count", "version", "get", "contents", "create", "touch", "update", "delete", "log_access", "log_accesses",
+        "check_accesses", "access_history", "low_buoyancy", "archive_candidates", "deletion_candidates",
+        "top", "search", "search_statistics", "similarity_signature", "similar", "similarity_counts", "similarity_members",
+        "facets", "score_summary", "rescore", "recompute_all", "tier_usage"
+    }
+    EVENT_METHODS = {"record", "record_many", "since", "wait_since"}
+    
+    def __init__(self, repository: ResourceRepository, address: str, authkey: bytes, scheduler, events=None):
+        self.repository = repository
+        self.address = address
+        self.authkey = authkey
+        self.scheduler = scheduler
+        self.events = events
+    
+    def serve_forever(self):
+        if os.path.exists(self.address):
+            os.remove(self.address)
+        with Listener(self.address, family="AF_UNIX", authkey=self.authkey) as listener:
+            while True:
+                connection = listener.accept()
+                threading.Thread(target=self._serve, args=(connection,), daemon=True).start()
+    
+    def _serve(self, connection):
+        with connection:
+            while True:
+                try:
+                    method, arguments = connection.recv()
+                except (EOFError, OSError):
+                    return
+                try:
+                    response = (True, self.handle(method, arguments))
+                except Exception as e:
+                    response = (False, e)
+                connection.send(response)
+    
+    def handle(self, method: str, arguments: tuple) -> Any:
+        if method == "iter_page":
+            # (min_mb, min_pv, sort_by, after, now, tags, content_type, limit): one page of iter_resources
+            *iter_arguments, limit = arguments
+            return list(itertools.islice(self.repository.iter_resources(*iter_arguments), limit))
+        if method == "create_many":
+            # Scores are assigned in place, so send them back
+            resources, now = arguments
+            self.repository.create_many(resources, now)
+            self.scheduler.schedule_many(resources)
+            return [(resource["memory_buoyancy"], resource["preservation_value"]) for resource in resources]
+        if method in self.EVENT_METHODS and self.events is not None:
+            return getattr(self.events, method)(*arguments)
+        if method not in self.REPOSITORY_METHODS:
+            raise ValueError(f"Unknown shard method: {method}")
+        
+        result = getattr(self.repository, method)(*arguments)
+        if method == "create":
+            self.scheduler.schedule(arguments[0])
+        elif method in ("touch", "update") and result is not None:
+            self.scheduler.schedule(result)
+        elif method == "rescore":
+            self.scheduler.schedule_many(result)
+        elif method == "delete" and result:
+            self.scheduler.unschedule(arguments[0])
+        return result
+
+class ShardClient:
+    """Connection to one shard server; each thread gets its own connection"""
+    
+    def __init__(self, address: str, authkey: bytes):
+        self.address = address
+        self.authkey = authkey
+        self.local = threading.local()
+        self.connections = []
+        self.lock = threading.Lock()
+    
+    @property
+    def connection(self):
+        connection = getattr(self.local, "connection", None)
+        if connection is None:
+            connection = Client(self.address, family="AF_UNIX", authkey=self.authkey)
+            self.local.connection = connection
+            with self.lock:
+                self.connections.append(connection)
+        return connection
+    
+    def call(self, method: str, *arguments) -> Any:
+        connection = self.connection
+        try:
+            connection.send((method, arguments))
+            ok, result = connection.recv()
+        except (EOFError, OSError):
+            # Reconnect on the next call, e.g. after a shard restart
+            self.local.connection = None
+            raise
+        if not ok:
+            raise result
+        return result
+    
+    def close(self):
+        with self.lock:
+            for connection in self.connections:
+                connection.close()
+            self.connections = []
+
+class ShardedRepository(ResourceRepository):
+    """
+    Resources partitioned across shard processes by a hash of their id
+    
+    Every API worker holds one of these, so any worker can serve any request.
+    Single-resource calls go to the owning shard. Fan-out queries run on all
+    shards in parallel and merge their results: listings with a k-way merge of
+    the per-shard orders, candidate queries by ranking the per-shard top results.
+    """
+    
+    def __init__(self, addresses: List[str], authkey: bytes):
+        if not addresses:
+            raise ValueError("FORGETIT_SHARD_SOCKETS lists no shards")
+        self.clients = [ShardClient(address, authkey) for address in addresses]
+        self.executor = ThreadPoolExecutor(max_workers=len(self.clients), thread_name_prefix="shard-fan-out")
+    
+    def shard(self, resource_id: str) -> ShardClient:
+        return self.clients[shard_index(resource_id, len(self.clients))]
+    
+    def _fan_out(self, calls: Dict[ShardClient, tuple]) -> List[Any]:
+        """Run {client: (method, *arguments)} calls in parallel, returning their results"""
+        futures = [self.executor.submit(client.call, *call) for client, call in calls.items()]
+        return [future.result() for future in futures]
+    
+    def _on_all(self, method: str, *arguments) -> List[Any]:
+        return self._fan_out({client: (method, *arguments) for client in self.clients})
+    
+    def _grouped(self, items: List[Any], resource_id_of) -> Dict[ShardClient, List[Any]]:
+        groups: Dict[ShardClient, List[Any]] = {}
+        for item in items:
+            groups.setdefault(self.shard(resource_id_of(item)), []).append(item)
+        return groups
+    
+    def count(self) -> int:
+        return sum(self._on_all("count"))
+    
+    def version(self) -> int:
+        # Every shard's version only grows, so their sum does too
+        return sum(self._on_all("version"))
+    
+    def get(self, resource_id: str) -> Optional[Dict]:
+        return self.shard(resource_id).call("get", resource_id)
+    
+    def contents(self, resource_ids: List[str]) -> Dict[str, str]:
+        groups = self._grouped(resource_ids, lambda resource_id: resource_id)
+        contents = {}
+        for shard_contents in self._fan_out({client: ("contents", group) for client, group in groups.items()}):
+            contents.update(shard_contents)
+        return contents
+    
+    def create(self, resource: Dict):
+        self.shard(resource["id"]).call("create", resource)
+    
+    def create_many(self, resources: List[Dict], now: datetime):
+        groups = self._grouped(resources, lambda resource: resource["id"])
+        results = self._fan_out({client: ("create_many", group, now) for client, group in groups.items()})
+        for group, scores in zip(groups.values(), results):
+            for resource, (mb, pv) in zip(group, scores):
+                resource["memory_buoyancy"] = mb
+                resource["preservation_value"] = pv
+    
+    def touch(self, resource_id: str, timestamp: datetime, count: int = 1, now: Optional[datetime] = None) -> Optional[Dict]:
+        return self.shard(resource_id).call("touch", resource_id, timestamp, count, now)
+    
+    def update(self, resource_id: str, changes: Dict, now: datetime) -> Optional[Dict]:
+        return self.shard(resource_id).call("update", resource_id, changes, now)
+    
+    def delete(self, resource_id: str) -> bool:
+        return self.shard(resource_id).call("delete", resource_id)
+    
+    def log_access(self, resource_id: str, timestamp: datetime, access_type: str):
+        self.shard(resource_id).call("log_access", resource_id, timestamp, access_type)
+    
+    def log_accesses(self, events: List[tuple]):
+        groups = self._grouped(events, lambda event: event[0])
+        self._fan_out({client: ("log_accesses", group) for client, group in groups.items()})
+    
+    def check_accesses(self, events: List[tuple]):
+        groups = self._grouped(events, lambda event: event[0])
+        self._fan_out({client: ("check_accesses", group) for client, group in groups.items()})
+    
+    def access_history(self, resource_id: str, limit: Optional[int] = None) -> List[Dict]:
+        return self.shard(resource_id).call("access_history", resource_id, limit)
+    
+    def iter_resources(
+        self,
+        min_mb: Optional[float],
+        min_pv: Optional[float],
+        sort_by: str,
+        after: Optional[tuple] = None,
+        now: Optional[datetime] = None,
+        tags: Optional[List[str]] = None,
+        content_type: Optional[str] = None
+    ) -> Iterator[Dict]:
+        if LAZY_MEMORY_BUOYANCY and now is None:
+            # Evaluate Memory Buoyancy at the same time on every shard
+            now = datetime.now()
+        
+        def pages(client: ShardClient) -> Iterator[Dict]:
+            position = after
+            while True:
+                page = client.call("iter_page", min_mb, min_pv, sort_by, position, now, tags, content_type, REPOSITORY_PAGE_SIZE)
+                yield from page
+                if len(page) < REPOSITORY_PAGE_SIZE:
+                    return
+                position = cursor_key(page[-1], sort_by)
+        
+        return heapq.merge(*(pages(client) for client in self.clients), key=lambda r: cursor_key(r, sort_by), reverse=True)
+    
+    def top(
+        self,
+        rank_by: str,
+        k: int,
+        min_mb: Optional[float] = None,
+        min_pv: Optional[float] = None,
+        tags: Optional[List[str]] = None,
+        content_type: Optional[str] = None,
+        now: Optional[datetime] = None
+    ) -> List[Dict]:
+        # The overall best k are among the best k of each shard
+        results = self._on_all("top", rank_by, k, min_mb, min_pv, tags, content_type, now or datetime.now())
+        return heapq.nlargest(k, itertools.chain.from_iterable(results), key=lambda r: (rank_value(r, rank_by), r["id"]))
+    
+    def search(
+        self,
+        query: str,
+        k: int,
+        mb_weight: float = 0.0,
+        now: Optional[datetime] = None,
+        statistics: Optional[tuple] = None
+    ) -> List[tuple]:
+        # Every shard scores with the statistics of the whole corpus, so the
+        # overall best k are among the best k of each shard
+        statistics = statistics or self.search_statistics(query)
+        results = self._on_all("search", query, k, mb_weight, now or datetime.now(), statistics)
+        return heapq.nlargest(k, itertools.chain.from_iterable(results), key=lambda match: (match[0], match[1]["id"]))
+    
+    def search_statistics(self, query: str) -> tuple:
+        documents, total_length, frequencies = 0, 0, {}
+        for shard_documents, shard_length, shard_frequencies in self._on_all("search_statistics", query):
+            documents += shard_documents
+            total_length += shard_length
+            for term, frequency in shard_frequencies.items():
+                frequencies[term] = frequencies.get(term, 0) + frequency
+        return documents, total_length, frequencies
+    
+    def similarity_signature(self, resource_id: str, kind: str) -> Optional[bytes]:
+        return self.shard(resource_id).call("similarity_signature", resource_id, kind)
+    
+    def similar(
+        self,
+        kind: str,
+        signature: bytes,
+        k: int,
+        min_similarity: float,
+        exclude: Optional[str] = None,
+        now: Optional[datetime] = None
+    ) -> List[tuple]:
+        results = self._on_all("similar", kind, signature, k, min_similarity, exclude, now or datetime.now())
+        return heapq.nlargest(k, itertools.chain.from_iterable(results), key=lambda match: (match[0], match[1]["id"]))
+    
+    def similarity_counts(self, kind: str) -> Dict[bytes, int]:
+        # Clusters span shards, so they are found among the signatures of all
+        # shards: one entry per distinct signature crosses the sockets
+        counts: Dict[bytes, int] = {}
+        for shard_counts in self._on_all("similarity_counts", kind):
+            for signature, count in shard_counts.items():
+                counts[signature] = counts.get(signature, 0) + count
+        return counts
+    
+    def similarity_members(self, kind: str, clusters: List[List[bytes]], k: int, now: Optional[datetime] = None) -> List[List[Dict]]:
+        results = self._on_all("similarity_members", kind, clusters, k, now or datetime.now())
+        return [
+            heapq.nlargest(k, itertools.chain.from_iterable(members), key=lambda r: (r["memory_buoyancy"], r["id"]))
+            for members in zip(*results)
+        ]
+    
+    def facets(self, tags: Optional[List[str]] = None, content_type: Optional[str] = None, now: Optional[datetime] = None) -> Dict:
+        # Counts and sums add up across shards
+        merged = {"total": 0, "tags": {}, "content_types": {}}
+        for shard_facets in self._on_all("facets", tags, content_type, now or datetime.now()):
+            merged["total"] += shard_facets["total"]
+            for group in ("tags", "content_types"):
+                for value, totals in shard_facets[group].items():
+                    merged_totals = merged[group].setdefault(value, [0, 0.0, 0.0])
+                    for position, total in enumerate(totals):
+                        merged_totals[position] += total
+        return merged
+    
+    def score_summary(self, now: Optional[datetime] = None) -> Dict:
+        # Counts, sums and bin counts add up across shards, which share SUMMARY_BINS
+        merged = None
+        for summary in self._on_all("score_summary", now or datetime.now()):
+            if merged is None:
+                merged = summary
+                continue
+            bins = summary["bins"]
+            aggregates = [(merged["total"], summary["total"])]
+            for group in ("tags", "content_types"):
+                aggregates.extend(
+                    (merged[group].setdefault(value, [0, 0.0, 0.0, [0] * bins, [0] * bins]), aggregate)
+                    for value, aggregate in summary[group].items()
+                )
+            for merged_aggregate, aggregate in aggregates:
+                for position in range(3):
+                    merged_aggregate[position] += aggregate[position]
+                for position in (3, 4):
+                    merged_aggregate[position] = [a + b for a, b in zip(merged_aggregate[position], aggregate[position])]
+        return merged
+    
+    def low_buoyancy(self, threshold: float, limit: Optional[int] = None, now: Optional[datetime] = None) -> List[Dict]:
+        results = self._on_all("low_buoyancy", threshold, limit, now)
+        return ranked(itertools.chain.from_iterable(results), lambda x: x["memory_buoyancy"], limit)
+    
+    def archive_candidates(
+        self,
+        max_mb: float = ARCHIVE_THRESHOLDS[0],
+        min_pv: float = ARCHIVE_THRESHOLDS[1],
+        limit: Optional[int] = None,
+        now: Optional[datetime] = None
+    ) -> List[Dict]:
+        results = self._on_all("archive_candidates", max_mb, min_pv, limit, now)
+        return ranked(itertools.chain.from_iterable(results), lambda x: -x["preservation_value"], limit)
+    
+    def deletion_candidates(
+        self,
+        max_mb: float = DELETION_THRESHOLDS[0],
+        max_pv: float = DELETION_THRESHOLDS[1],
+        limit: Optional[int] = None,
+        now: Optional[datetime] = None
+    ) -> List[Dict]:
+        results = self._on_all("deletion_candidates", max_mb, max_pv, limit, now)
+        return ranked(itertools.chain.from_iterable(results), lambda x: x["memory_buoyancy"] + x["preservation_value"], limit)
+    
+    def rescore(self, resource_ids: List[str], now: datetime) -> List[Dict]:
+        groups = self._grouped(resource_ids, lambda resource_id: resource_id)
+        results = self._fan_out({client: ("rescore", group, now) for client, group in groups.items()})
+        return list(itertools.chain.from_iterable(results))
+    
+    def recompute_all(self, now: datetime) -> tuple:
+        counts, changes = zip(*self._on_all("recompute_all", now))
+        return sum(counts), list(itertools.chain.from_iterable(changes))
+    
+    def tier_usage(self) -> Optional[Dict]:
+        usage = None
+        for shard_usage in self._on_all("tier_usage"):
+            if usage is None:
+                usage = shard_usage
+                continue
+            for tier in ("hot", "cold"):
+                for key, value in shard_usage[tier].items():
+                    usage[tier][key] += value
+        return usage
+    
+    def close(self):
+        self.executor.shutdown(wait=False)
+        for client in self.clients:
+            client.close()
+
+def create_repository() -> ResourceRepository:
+    """Create the repository selected by FORGETIT_STORAGE"""
+    if STORAGE_BACKEND == "memory":
+        cold_tier = ColdTier(COLD_TIER_DIR) if COLD_TIER_DIR else None
+        if WAL_DIR:
+            return DurableInMemoryRepository(WAL_DIR, cold_tier=cold_tier)
+        return InMemoryRepository(cold_tier)
+    if STORAGE_BACKEND == "sqlite":
+        return SQLiteRepository(SQLITE_PATH)
+    if STORAGE_BACKEND == "sharded":
+        return ShardedRepository(SHARD_SOCKETS, SHARD_AUTHKEY)
+    raise ValueError(f"Unknown storage backend: {STORAGE_BACKEND}")
+
+class TieringSweeper:
+    """Background thread demoting low-buoyancy resources to the cold tier every `interval` seconds"""
+    
+    def __init__(self, repository: InMemoryRepository, interval: float = COLD_TIER_INTERVAL):
+        self.repository = repository
+        self.interval = interval
+        self.stopped = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+    
+    def _run(self):
+        while not self.stopped.wait(self.interval):
+            try:
+                demoted = self.repository.demote_cold()
+            except Exception:
+                logger.exception("Failed to demote resources to the cold tier")
+                continue
+            if demoted:
+                logger.info("Demoted %d resources to the cold tier", demoted)
+    
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name="tiering-sweeper", daemon=True)
+        self.thread.start()
+    
+    def stop(self):
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+
+repository = create_repository()
+tiering_sweeper = TieringSweeper(repository) if getattr(repository, "cold_tier", None) is not None else None
+
+# Managed-forgetting events and scheduling
+FORGETTING_EVENT_HISTORY = int(os.environ.get("FORGETIT_EVENT_HISTORY", "10000"))
+CROSSING_BATCH_SIZE = 1000
+CROSSING_MAX_SLEEP = 60.0  # Seconds; bounds the effect of wall clock jumps
+CROSSING_RETRY = timedelta(milliseconds=10)
+
+logger = logging.getLogger("forgetit")
+
+class ForgettingEvents:
+    """
+    Numbered log of resources entering and leaving the candidate sets
+    
+    The most recent events are kept for polling, and every event is also
+    passed to the registered listeners as it is recorded. Listeners are called
+    with the log locked, in event id order, so they must not block.
+    """
+    
+    def __init__(self, history: int = FORGETTING_EVENT_HISTORY):
+        self.events = deque(maxlen=history)
+        self.last_event_id = 0
+        self.listeners: List[Any] = []
+        self.lock = threading.Lock()
+        self.recorded = threading.Condition(self.lock)
+    
+    def record(self, resource: Dict, before: frozenset, now: datetime, after: Optional[frozenset] = None) -> List[Dict]:
+        """
+        Record an event for every candidate set the resource entered or left
+        since `before`; `after` defaults to the sets it belongs to now
+        """
+        if after is None:
+            after = candidate_sets(resource)
+        changes = sorted([(name, "enter") for name in after - before] + [(name, "leave") for name in before - after])
+        if not changes:
+            return []
+        
+        events = []
+        with self.lock:
+            for name, change in changes:
+                self.last_event_id += 1
+                event = {
+                    "event_id": self.last_event_id,
+                    "resource_id": resource["id"],
+                    "set": name,
+                    "change": change,
+                    "memory_buoyancy": resource["memory_buoyancy"],
+                    "preservation_value": resource["preservation_value"],
+                    "timestamp": now.isoformat()
+                }
+                self.events.append(event)
+                events.append(event)
+            self.recorded.notify_all()
+            # Still under the lock, so that listeners see events in id order
+            for listener in self.listeners:
+                listener(events)
+        
+        return events
+    
+    def record_many(self, changes: List[tuple], now: datetime) -> List[Dict]:
+        """Record the events of many (resource, before) changes"""
+        events = []
+        for resource, before in changes:
+            events.extend(self.record(resource, before, now))
+        return events
+    
+    def _since(self, after_event_id: int, limit: Optional[int]) -> List[Dict]:
+        if not self.events:
+            return []
+        start = max(0, after_event_id - self.events[0]["event_id"] + 1)
+        stop = None if limit is None else start + limit
+        return list(itertools.islice(self.events, start, stop))
+    
+    def since(self, after_event_id: int = 0, limit: Optional[int] = None) -> List[Dict]:
+        """Retained events with an id above `after_event_id`, oldest first"""
+        with self.lock:
+            return self._since(after_event_id, limit)
+    
+    def wait_since(self, after_event_id: int, timeout: float, limit: Optional[int] = None) -> List[Dict]:
+        """Like since, but wait up to `timeout` seconds for such an event to be recorded"""
+        with self.recorded:
+            self.recorded.wait_for(lambda: self.last_event_id > after_event_id, timeout)
+            return self._since(after_event_id, limit)
+
+class RemoteForgettingEvents(ForgettingEvents):
+    """
+    Event log of an API worker in a sharded deployment
+    
+    Events are recorded by the event log hosted on shard 0, so their ids are
+    global. A relay thread long-polls that log and mirrors it locally, which
+    feeds this worker's listeners (its event streams) and its history.
+    """
+    
+    def __init__(self, hub: ShardClient, relay: bool = True, history: int = FORGETTING_EVENT_HISTORY):
+        super().__init__(history)
+        self.hub = hub
+        if relay:
+            threading.Thread(target=self._relay, name="event-relay", daemon=True).start()
+    
+    @staticmethod
+    def _scores(resource: Dict) -> Dict:
+        # Events only need these fields, so the rest of the record is not sent
+        return {key: resource[key] for key in ("id", "memory_buoyancy", "preservation_value")}
+    
+    def record(self, resource: Dict, before: frozenset, now: datetime, after: Optional[frozenset] = None) -> List[Dict]:
+        if (candidate_sets(resource) if after is None else after) == before:
+            return []
+        return self.hub.call("record", self._scores(resource), before, now, after)
+    
+    def record_many(self, changes: List[tuple], now: datetime) -> List[Dict]:
+        changes = [(self._scores(resource), before) for resource, before in changes if candidate_sets(resource) != before]
+        return self.hub.call("record_many", changes, now) if changes else []
+    
+    def _relay(self):
+        after_event_id = 0
+        while True:
+            try:
+                events = self.hub.call("wait_since", after_event_id, SSE_HEARTBEAT_INTERVAL, 1000)
+            except Exception:
+                logger.exception("Failed to relay events from the event log on shard 0")
+                time.sleep(1.0)
+                continue
+            if not events:
+                continue
+            after_event_id = events[-1]["event_id"]
+            with self.recorded:
+                self.events.extend(events)
+                self.last_event_id = after_event_id
+                self.recorded.notify_all()
+            for listener in self.listeners:
+                listener(events)
+
+class NullScheduler:
+    """Scheduler of the API workers in a sharded deployment, where each shard schedules its own resources"""
+    
+    def schedule(self, resource: Dict, not_before: Optional[datetime] = None):
+        pass
+    
+    def schedule_many(self, resources):
+        pass
+    
+    def unschedule(self, resource_id: str):
+        pass
+    
+    def start(self):
+        pass
+    
+    async def stop(self):
+        pass
+
+class CrossingScheduler:
+    """
+    Moves resources into and out of the candidate sets as their scores change
+    over time
+    
+    Between accesses Memory Buoyancy follows a curve fixed by its base and last
+    access, so the time at which it falls below each candidate threshold is
+    known in advance (see memory_buoyancy_crossing). Preservation Value rises
+    with age during a resource's first year, and the day it passes each
+    candidate threshold is known as well (see preservation_value_crossing).
+    The scheduler keeps the earlier of the next crossings of every resource in
+    a heap and only rescores the resources whose crossing is due, instead of
+    recomputing the whole store. Resources are rescheduled after every change;
+    superseded heap entries are skipped.
+    """
+    
+    def __init__(self, repository: ResourceRepository, events: ForgettingEvents, thresholds: Optional[List[float]] = None):
+        if thresholds is None:
+            thresholds = [LOW_BUOYANCY_THRESHOLD, ARCHIVE_THRESHOLDS[0], DELETION_THRESHOLDS[0]]
+        self.repository = repository
+        self.events = events
+        self.thresholds = sorted(set(thresholds), reverse=True)
+        # (threshold, inclusive) of the candidate sets' Preservation Value bounds:
+        # archiving needs it above 0.7, deletion below 0.2
+        self.preservation_thresholds = [(ARCHIVE_THRESHOLDS[1], False), (DELETION_THRESHOLDS[1], True)]
+        self.heap: List[tuple] = []  # (due in microseconds since epoch, resource id, (score, threshold))
+        self.due: Dict[str, tuple] = {}  # Current (due, (score, threshold)) of each scheduled resource
+        self.lock = threading.Lock()
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.wakeup: Optional[asyncio.Event] = None
+        self.task: Optional[asyncio.Task] = None
+    
+    def next_crossing(self, resource: Dict) -> Optional[tuple]:
+        """
+        (time, (score, threshold)) of the next threshold the stored Memory
+        Buoyancy will fall below or the stored Preservation Value will rise past
+        """
+        crossings = []
+        base = memory_buoyancy_base(resource)
+        for threshold in self.thresholds:
+            if resource["memory_buoyancy"] >= threshold:
+                at = memory_buoyancy_crossing(base, resource["last_accessed"], threshold)
+                if at is not None:
+                    crossings.append((at, ("memory_buoyancy", threshold)))
+                break
+        for threshold, inclusive in self.preservation_thresholds:
+            pv = resource["preservation_value"]
+            if not (pv >= threshold if inclusive else pv > threshold):
+                at = preservation_value_crossing(resource, threshold, inclusive)
+                if at is not None:
+                    crossings.append((at, ("preservation_value", threshold)))
+        return min(crossings, default=None)
+    
+    def _push(self, resource_id: str, due: int, crossing: tuple) -> bool:
+        """Schedule a crossing (lock held), returning whether it is now the earliest one"""
+        self.due[resource_id] = (due, crossing)
+        heapq.heappush(self.heap, (due, resource_id, crossing))
+        if len(self.heap) > 2 * len(self.due) + 1024:
+            # Drop superseded entries
+            self.heap = [(due, resource_id, crossing) for resource_id, (due, crossing) in self.due.items()]
+            heapq.heapify(self.heap)
+        return self.heap[0][0] == due
+    
+    def _wake(self):
+        loop = self.loop
+        if loop is not None:
+            loop.call_soon_threadsafe(self.wakeup.set)
+    
+    def schedule(self, resource: Dict, not_before: Optional[datetime] = None):
+        """(Re)schedule the next crossing of a created or changed resource"""
+        crossing = self.next_crossing(resource)
+        with self.lock:
+            if crossing is None:
+                self.due.pop(resource["id"], None)
+                return
+            at, score_threshold = crossing
+            if not_before is not None and at < not_before:
+                at = not_before
+            earliest = self._push(resource["id"], _to_microseconds(at), score_threshold)
+        if earliest:
+            self._wake()
+    
+    def schedule_many(self, resources):
+        for resource in resources:
+            self.schedule(resource)
+    
+    def unschedule(self, resource_id: str):
+        with self.lock:
+            self.due.pop(resource_id, None)
+    
+    def schedule_all(self):
+        """Schedule every stored resource, e.g. on startup"""
+        crossings = []
+        for resource in self.repository.iter_resources(None, None, "id"):
+            crossing = self.next_crossing(resource)
+            if crossing is not None:
+                crossings.append((_to_microseconds(crossing[0]), resource["id"], crossing[1]))
+        with self.lock:
+            for due, resource_id, crossing in crossings:
+                self.due.setdefault(resource_id, (due, crossing))
+            self.heap = [(due, resource_id, crossing) for resource_id, (due, crossing) in self.due.items()]
+            heapq.heapify(self.heap)
+        self._wake()
+    
+    def seconds_until_next(self, now: Optional[datetime] = None) -> Optional[float]:
+        """Seconds until the earliest scheduled crossing (negative if overdue), or None"""
+        now_us = _to_microseconds(now or datetime.now())
+        with self.lock:
+            while self.heap and self.due.get(self.heap[0][1]) != (self.heap[0][0], self.heap[0][2]):
+                heapq.heappop(self.heap)
+            if not self.heap:
+                return None
+            return (self.heap[0][0] - now_us) / 1_000_000
+    
+    def _pop_due(self, now_us: int) -> List[tuple]:
+        due_entries = []
+        with self.lock:
+            while self.heap and self.heap[0][0] <= now_us and len(due_entries) < CROSSING_BATCH_SIZE:
+                due, resource_id, crossing = heapq.heappop(self.heap)
+                if self.due.get(resource_id) == (due, crossing):
+                    del self.due[resource_id]
+                    due_entries.append((due, resource_id, crossing))
+        return due_entries
+    
+    def fire_due(self, now: Optional[datetime] = None) -> int:
+        """Rescore the resources whose crossing is due and record their events, returning how many"""
+        now = now or datetime.now()
+        due_entries = self._pop_due(_to_microseconds(now))
+        if not due_entries:
+            return 0
+        
+        # Just before its crossing a resource's Memory Buoyancy was at the
+        # crossed threshold (in lazy mode it is already read past it), while
+        # its stored Preservation Value is still the one from before
+        before = {}
+        for _, resource_id, (score, threshold) in due_entries:
+            resource = self.repository.get(resource_id)
+            if resource is not None:
+                if score == "memory_buoyancy":
+                    resource = dict(resource, memory_buoyancy=threshold)
+                before[resource_id] = candidate_sets(resource)
+        try:
+            rescored = self.repository.rescore(list(before), now)
+        except Exception:
+            with self.lock:
+                for due, resource_id, crossing in due_entries:
+                    if resource_id not in self.due:
+                        self._push(resource_id, due, crossing)
+            raise
+        
+        for resource in rescored:
+            self.events.record(resource, before[resource["id"]], now)
+            # Guard against rounding leaving a resource just above the threshold
+            self.schedule(resource, not_before=now + CROSSING_RETRY)
+        
+        return len(rescored)
+    
+    async def run(self):
+        """Fire crossings as they become due, until cancelled"""
+        self.loop = asyncio.get_running_loop()
+        self.wakeup = asyncio.Event()
+        await run_in_threadpool(self.schedule_all)
+        while True:
+            self.wakeup.clear()
+            delay = self.seconds_until_next()
+            if delay is None or delay > 0:
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), CROSSING_MAX_SLEEP if delay is None else min(delay, CROSSING_MAX_SLEEP))
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            try:
+                await run_in_threadpool(self.fire_due)
+            except Exception:
+                logger.exception("Failed to rescore resources at their threshold crossing")
+                await asyncio.sleep(1.0)
+    
+    def start(self):
+        self.task = asyncio.get_running_loop().create_task(self.run())
+    
+    async def stop(self):
+        self.loop = None
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+
+SSE_QUEUE_SIZE = 1000  # Pending event batches per stream before a slow client is disconnected
+SSE_HEARTBEAT_INTERVAL = 15.0
+SSE_MEDIA_TYPE = "text/event-stream"
+
+class EventBroadcaster:
+    """
+    Fans recorded events out to the open server-sent event streams
+    
+    Events are recorded on worker threads and handed to each stream's event
+    loop. A stream that falls more than SSE_QUEUE_SIZE batches behind is
+    closed; its client reconnects with Last-Event-ID and catches up from the
+    retained history.
+    """
+    
+    def __init__(self):
+        self.subscribers: Dict[asyncio.Queue, asyncio.AbstractEventLoop] = {}
+        self.lock = threading.Lock()
+    
+    def subscribe(self) -> asyncio.Queue:
+        subscriber = asyncio.Queue(maxsize=SSE_QUEUE_SIZE)
+        subscriber.overflowed = False
+        with self.lock:
+            self.subscribers[subscriber] = asyncio.get_running_loop()
+        return subscriber
+    
+    def unsubscribe(self, subscriber: asyncio.Queue):
+        with self.lock:
+            self.subscribers.pop(subscriber, None)
+    
+    @staticmethod
+    def _offer(subscriber: asyncio.Queue, events: List[Dict]):
+        try:
+            subscriber.put_nowait(events)
+        except asyncio.QueueFull:
+            subscriber.overflowed = True
+    
+    def publish(self, events: List[Dict]):
+        with self.lock:
+            subscribers = list(self.subscribers.items())
+        for subscriber, loop in subscribers:
+            try:
+                loop.call_soon_threadsafe(self._offer, subscriber, events)
+            except RuntimeError:
+                # The stream's event loop is closed
+                self.unsubscribe(subscriber)
+
+def format_sse(events: List[Dict]) -> str:
+    return "".join(
+        f"id: {event['event_id']}\nevent: {event['change']}\ndata: {json.dumps(event)}\n\n" for event in events
+    )
+
+async def stream_forgetting_events(subscriber: asyncio.Queue, after_event_id: Optional[int]):
+    """Yield retained events after `after_event_id`, then live events, as server-sent events"""
+    try:
+        last_event_id = forgetting_events.last_event_id if after_event_id is None else after_event_id
+        # Events recorded while the stream was subscribing are deduplicated by id
+        backlog = forgetting_events.since(last_event_id)
+        if backlog:
+            last_event_id = backlog[-1]["event_id"]
+            yield format_sse(backlog)
+        
+        while not subscriber.overflowed:
+            try:
+                events = await asyncio.wait_for(subscriber.get(), SSE_HEARTBEAT_INTERVAL)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            events = [event for event in events if event["event_id"] > last_event_id]
+            if events:
+                last_event_id = events[-1]["event_id"]
+                yield format_sse(events)
+    finally:
+        broadcaster.unsubscribe(subscriber)
+
+# Optional webhook receiving candidate set changes
+WEBHOOK_URL = os.environ.get("FORGETIT_WEBHOOK_URL")
+WEBHOOK_BATCH_SIZE = int(os.environ.get("FORGETIT_WEBHOOK_BATCH_SIZE", "500"))
+WEBHOOK_BATCH_INTERVAL = float(os.environ.get("FORGETIT_WEBHOOK_BATCH_INTERVAL", "0.5"))
+WEBHOOK_MAX_ATTEMPTS = 5
+WEBHOOK_QUEUE_SIZE = 100_000
+
+class WebhookDispatcher:
+    """
+    Posts recorded events to a webhook as JSON arrays
+    
+    Events are queued by the threads that record them and sent from one
+    background thread in batches of up to `batch_size`, at most `interval`
+    seconds after the first event of a batch was queued, so ordering is kept.
+    Failed deliveries are retried with exponential backoff. Batches that still
+    fail and events arriving while the queue is full are dropped and counted.
+    """
+    
+    def __init__(
+        self,
+        url: str,
+        batch_size: int = WEBHOOK_BATCH_SIZE,
+        interval: float = WEBHOOK_BATCH_INTERVAL,
+        max_attempts: int = WEBHOOK_MAX_ATTEMPTS,
+        queue_size: int = WEBHOOK_QUEUE_SIZE
+    ):
+        self.url = url
+        self.batch_size = batch_size
+        self.interval = interval
+        self.max_attempts = max_attempts
+        self.pending = queue.Queue(maxsize=queue_size)
+        self.delivered = 0
+        self.dropped = 0
+        self.stopped = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+    
+    def enqueue(self, events: List[Dict]):
+        for event in events:
+            try:
+                self.pending.put_nowait(event)
+            except queue.Full:
+                self.dropped += 1
+    
+    def _next_batch(self) -> List[Dict]:
+        try:
+            batch = [self.pending.get(timeout=0.5)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.pending.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+    
+    def _deliver(self, batch: List[Dict]) -> bool:
+        body = json.dumps(batch).encode()
+        for attempt in range(self.max_attempts):
+            try:
+                request = urllib.request.Request(
+                    self.url, data=body, headers={"Content-Type": "application/json"}, method="POST"
+                )
+                with urllib.request.urlopen(request, timeout=10) as response:
+                    response.read()
+                return True
+            except (urllib.error.URLError, OSError) as e:
+                logger.warning("Webhook delivery of %d events failed (attempt %d): %s", len(batch), attempt + 1, e)
+                if attempt + 1 < self.max_attempts:
+                    # Back off, but do not hold up shutdown
+                    self.stopped.wait(min(30.0, 0.5 * 2 ** attempt))
+        return False
+    
+    def _run(self):
+        while not (self.stopped.is_set() and self.pending.empty()):
+            batch = self._next_batch()
+            if not batch:
+                continue
+            if self._deliver(batch):
+                self.delivered += len(batch)
+            else:
+                self.dropped += len(batch)
+    
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name="webhook-dispatcher", daemon=True)
+        self.thread.start()
+    
+    def stop(self, timeout: float = 10.0):
+        """Stop after flushing the queued events, waiting at most `timeout` seconds"""
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join(timeout)
+
+if STORAGE_BACKEND == "sharded":
+    # Shard 0 hosts the event log and delivers webhooks
+    forgetting_events = RemoteForgettingEvents(repository.clients[0])
+    scheduler = NullScheduler()
+    webhook_dispatcher = None
+else:
+    forgetting_events = ForgettingEvents()
+    scheduler = CrossingScheduler(repository, forgetting_events)
+    webhook_dispatcher = WebhookDispatcher(WEBHOOK_URL) if WEBHOOK_URL else None
+broadcaster = EventBroadcaster()
+forgetting_events.listeners.append(broadcaster.publish)
+if webhook_dispatcher is not None:
+    forgetting_events.listeners.append(webhook_dispatcher.enqueue)
+
+# Write-behind buffering of resource views
+ACCESS_WRITE_BEHIND = os.environ.get("FORGETIT_ACCESS_WRITE_BEHIND", "").lower() in ("1", "true", "yes")
+ACCESS_FLUSH_INTERVAL = float(os.environ.get("FORGETIT_ACCESS_FLUSH_INTERVAL", "0.1"))
+
+class AccessBuffer:
+    """
+    Views of resources waiting to be applied to the repository
+    
+    Views are collected per resource in striped dicts of timestamps, and a
+    background thread applies them every `interval` seconds, with one touch
+    per resource for all of its views. Until then `view` overlays the pending
+    views on the stored record, so responses count them all the same.
+    """
+    
+    def __init__(
+        self,
+        repository: ResourceRepository,
+        scheduler: Any,
+        events: Any,
+        interval: float = ACCESS_FLUSH_INTERVAL,
+        stripes: int = RESOURCE_LOCK_STRIPES
+    ):
+        self.repository = repository
+        self.scheduler = scheduler
+        self.events = events
+        self.interval = interval
+        self.stripes = [(threading.Lock(), {}) for _ in range(stripes)]
+        self.stopped = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+    
+    def _stripe(self, resource_id: str) -> tuple:
+        return self.stripes[hash(resource_id) % len(self.stripes)]
+    
+    def view(self, resource_id: str, now: datetime) -> Optional[Dict]:
+        """Queue a view of a resource at `now` and return the resource as if it was applied, None if it does not exist"""
+        lock, pending = self._stripe(resource_id)
+        with lock:
+            resource = self.repository.get(resource_id)
+            if resource is None:
+                return None
+            timestamps = pending.setdefault(resource_id, [])
+            timestamps.append(now)
+            resource["access_count"] += len(timestamps)
+        resource["last_accessed"] = now
+        resource["memory_buoyancy"] = calculate_memory_buoyancy(resource, now)
+        return resource
+    
+    def _apply(self, resource_id: str, now: datetime) -> List[tuple]:
+        """Apply the pending views of a resource, returning their access log events"""
+        lock, pending = self._stripe(resource_id)
+        with lock:
+            timestamps = pending.pop(resource_id, None)
+            if timestamps is None:
+                return []
+            stored = self.repository.get(resource_id)
+            resource = self.repository.touch(resource_id, max(timestamps), len(timestamps), now)
+        if resource is None or stored is None:
+            # Deleted since it was viewed
+            return []
+        self.scheduler.schedule(resource)
+        self.events.record(resource, candidate_sets(stored), now)
+        return [(resource_id, timestamp, "view") for timestamp in timestamps]
+    
+    def apply(self, resource_id: str, now: datetime):
+        """Apply the pending views of one resource right away, e.g. before it is edited"""
+        logged = self._apply(resource_id, now)
+        if logged:
+            self.repository.log_accesses(logged)
+    
+    def flush(self) -> int:
+        """Apply all pending views, returning the number of views applied"""
+        now = datetime.now()
+        logged = []
+        for lock, pending in self.stripes:
+            with lock:
+                resource_ids = list(pending)
+            for resource_id in resource_ids:
+                logged.extend(self._apply(resource_id, now))
+        if logged:
+            self.repository.log_accesses(logged)
+        return len(logged)
+    
+    def _run(self):
+        while not self.stopped.wait(self.interval):
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Failed to apply buffered resource views")
+    
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name="access-flusher", daemon=True)
+        self.thread.start()
+    
+    def stop(self):
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+        self.flush()
+
+access_buffer = AccessBuffer(repository, scheduler, forgetting_events) if ACCESS_WRITE_BEHIND else None
+
+def serve_shard(index: int, addresses: List[str], authkey: bytes):
+    """
+    Run shard `index` of a sharded deployment in this process, serving the
+    repository selected by the environment (normally the memory backend)
+    
+    Shard 0 also hosts the event log. The other shards record the events of
+    their threshold crossings there.
+    """
+    if index == 0:
+        events = forgetting_events
+    else:
+        events = RemoteForgettingEvents(ShardClient(addresses[0], authkey), relay=False)
+    shard_scheduler = CrossingScheduler(repository, events)
+    server = ShardServer(repository, addresses[index], authkey, shard_scheduler, events if index == 0 else None)
+    
+    async def serve():
+        stopped = asyncio.Event()
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            asyncio.get_running_loop().add_signal_handler(signum, stopped.set)
+        
+        threading.Thread(target=server.serve_forever, name="shard-server", daemon=True).start()
+        shard_scheduler.start()
+        if webhook_dispatcher is not None:
+            webhook_dispatcher.start()
+        if tiering_sweeper is not None:
+            tiering_sweeper.start()
+        await stopped.wait()
+        
+        await shard_scheduler.stop()
+        if webhook_dispatcher is not None:
+            webhook_dispatcher.stop()
+        if tiering_sweeper is not None:
+            tiering_sweeper.stop()
+        repository.close()
+    
+    asyncio.run(serve())
+
+def stored_candidate_sets(resource_id: str) -> frozenset:
+    """Candidate sets a stored resource belongs to, empty if it does not exist"""
+    resource = repository.get(resource_id)
+    return frozenset() if resource is None else candidate_sets(resource)
+
+# Response serialization
+RESOURCE_RESPONSE_FIELDS = tuple(ResourceResponse.__fields__)
+RESOURCE_SUMMARY_FIELDS = tuple(field for field in RESOURCE_RESPONSE_FIELDS if field != "content")
+
+def response_fields(resource: Dict, fields: tuple = RESOURCE_RESPONSE_FIELDS) -> Dict:
+    """
+    The given fields of a stored record, in ResourceResponse order
+    
+    Records come from the repository with every field present and typed, so
+    they are not validated again on the way out.
+    """
+    return {field: resource[field] for field in fields}
+
+def parse_fields(fields: Optional[str]) -> tuple:
+    """Resolve a `fields` query parameter, defaulting to the summary representation"""
+    if fields is None:
+        return RESOURCE_SUMMARY_FIELDS
+    requested = {field.strip() for field in fields.split(",") if field.strip()}
+    unknown = requested.difference(RESOURCE_RESPONSE_FIELDS)
+    if unknown or not requested:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown fields: {', '.join(sorted(unknown))}" if unknown else "No fields requested"
+        )
+    return tuple(field for field in RESOURCE_RESPONSE_FIELDS if field in requested)
+
+FIELDS_DESCRIPTION = "Comma-separated fields to return (default: every field except content)"
+
+def with_content(resource: Dict) -> Dict:
+    """A resource returned by a repository method, with its content loaded for the response"""
+    content = repository.contents([resource["id"]]).get(resource["id"])
+    if content is None:
+        raise HTTPException(status_code=404, detail="Resource not found")
+    return dict(resource, content=content)
+
+def with_contents(resources: List[Dict], fields: tuple) -> List[Dict]:
+    """Load the content of listed resources, only if the projection includes it"""
+    if "content" not in fields:
+        return resources
+    contents = repository.contents([resource["id"] for resource in resources])
+    # Resources deleted since they were listed are left out
+    return [dict(resource, content=contents[resource["id"]]) for resource in resources if resource["id"] in contents]
+
+def _json_default(value: Any) -> str:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def dump_json(content: Any) -> bytes:
+    """Encode JSON like FastAPI's responses do, with orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":"), default=_json_default).encode()
+
+# Response caching
+RESPONSE_CACHE_BYTES = int(os.environ.get("FORGETIT_RESPONSE_CACHE_BYTES", str(64 * 1024 * 1024)))
+
+class ResponseCache:
+    """
+    Serialized bodies of read-only JSON endpoints, keyed by request and store version
+    
+    Each request key keeps the body of the latest version it was rendered for.
+    Entries are evicted least recently used first once the bodies exceed
+    `capacity` bytes; larger bodies are not cached at all.
+    """
+    
+    def __init__(self, capacity: int = RESPONSE_CACHE_BYTES):
+        self.capacity = capacity
+        self.size = 0
+        self.entries: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self.lock = threading.Lock()
+    
+    def get(self, key: tuple, version: int) -> Optional[tuple]:
+        """Return the (body, headers) rendered for `key` at `version`, if cached"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] != version:
+                return None
+            self.entries.move_to_end(key)
+            return entry[1], entry[2]
+    
+    def put(self, key: tuple, version: int, body: bytes, headers: Dict[str, str]):
+        if len(body) > self.capacity:
+            return
+        with self.lock:
+            previous = self.entries.get(key)
+            if previous is not None:
+                if previous[0] > version:
+                    # Rendered by a slower request against an older version
+                    return
+                self.size -= len(previous[1])
+            self.entries[key] = (version, body, headers)
+            self.entries.move_to_end(key)
+            self.size += len(body)
+            while self.size > self.capacity:
+                _, (_, evicted, _) = self.entries.popitem(last=False)
+                self.size -= len(evicted)
+
+response_cache = ResponseCache()
+
+def make_etag(key: tuple, version: int) -> str:
+    return f'"{version:x}-{zlib.crc32(repr(key).encode()):08x}"'
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Whether the request's If-None-Match header lists `etag`"""
+    header = request.headers.get("if-none-match")
+    if header is None:
+        return False
+    tags = [tag.strip() for tag in header.split(",")]
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+def encode_resources(resources: List[Dict], fields: tuple = RESOURCE_SUMMARY_FIELDS) -> bytes:
+    """Serialize listed resources as a JSON array, with the content loaded if requested"""
+    return dump_json([response_fields(resource, fields) for resource in with_contents(resources, fields)])
+
+def cached_json_response(request: Request, render: Callable[[], tuple]) -> Response:
+    """
+    Serve a read-only endpoint whose body only depends on the request and the
+    stored resources
+    
+    `render()` returns the (body, headers) of a fresh response. Responses carry
+    an ETag derived from the store version, and a matching If-None-Match is
+    answered with 304 before anything is rendered or looked up. In lazy mode
+    responses depend on the clock, so they are neither cached nor tagged.
+    """
+    if LAZY_MEMORY_BUOYANCY:
+        body, headers = render()
+        return Response(body, media_type="application/json", headers=headers)
+    
+    version = repository.version()
+    key = (request.url.path, tuple(sorted(request.query_params.multi_items())))
+    etag = make_etag(key, version)
+    cache_headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=cache_headers)
+    
+    cached = response_cache.get(key, version)
+    if cached is None:
+        body, headers = render()
+        response_cache.put(key, version, body, headers)
+    else:
+        body, headers = cached
+    return Response(body, media_type="application/json", headers={**headers, **cache_headers})
+
+# Listing helpers
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+def encode_cursor(sort_by: str, key: tuple, as_of: Optional[datetime] = None) -> str:
+    """
+    Encode a keyset position as an opaque cursor
+    
+    In lazy mode `as_of` pins the time at which Memory Buoyancy is evaluated,
+    so that later pages see the same ordering as the first one.
+    """
+    values = [value.isoformat() if isinstance(value, datetime) else value for value in key]
+    raw = json.dumps([sort_by, as_of.isoformat() if as_of else None] + values, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_cursor(cursor: str, sort_by: str):
+    """Decode a cursor produced by encode_cursor into (key, as_of)"""
+    try:
+        cursor_sort_by, as_of, *values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if cursor_sort_by != sort_by or len(values) != (2 if sort_by in SORT_FIELDS else 1):
+            raise ValueError("cursor does not match sort order")
+        if sort_by == "last_accessed":
+            values[0] = datetime.fromisoformat(values[0])
+        if as_of is not None:
+            as_of = datetime.fromisoformat(as_of)
+    except (binascii.Error, TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return tuple(values), as_of
+
+TAG_FILTER_DESCRIPTION = "Only resources with this tag; repeat to require several tags"
+CONTENT_TYPE_FILTER_DESCRIPTION = "Only resources of this content type"
+SIMILARITY_DESCRIPTION = "Minimum estimated Jaccard similarity of the tag sets or content shingles"
+
+def facet_summaries(facets: Dict[str, list], name: str) -> List[Dict]:
+    """Turn [count, Memory Buoyancy sum, Preservation Value sum] per value into means, most frequent first"""
+    return [
+        {
+            name: value,
+            "count": count,
+            "mean_memory_buoyancy": memory_buoyancy / count,
+            "mean_preservation_value": preservation_value / count
+        }
+        for value, (count, memory_buoyancy, preservation_value) in sorted(facets.items(), key=lambda item: (-item[1][0], item[0]))
+    ]
+
+def score_distribution(aggregate: list) -> Dict:
+    """Turn an aggregate of ResourceRepository.score_summary into a count plus mean and histogram per score"""
+    count, memory_buoyancy, preservation_value, mb_bins, pv_bins = aggregate
+    return {
+        "count": count,
+        "memory_buoyancy": {"mean": memory_buoyancy / count if count else None, "histogram": mb_bins},
+        "preservation_value": {"mean": preservation_value / count if count else None, "histogram": pv_bins}
+    }
+
+def score_distributions(aggregates: Dict[str, list], name: str) -> List[Dict]:
+    """score_distribution per value, most frequent first"""
+    return [
+        {name: value, **score_distribution(aggregate)}
+        for value, aggregate in sorted(aggregates.items(), key=lambda item: (-item[1][0], item[0]))
+    ]
+
+def stream_resources_ndjson(resources: Iterator[Dict], fields: tuple) -> Iterator[bytes]:
+    """
+    Stream resources as NDJSON lines
+    
+    Repositories fetch listings page by page, so memory stays constant and
+    concurrent writes are tolerated. The exception is the memory backend in
+    lazy mode, which scores and sorts every matching resource before a
+    Memory Buoyancy ordered listing yields its first row.
+    """
+    while True:
+        page = list(itertools.islice(resources, REPOSITORY_PAGE_SIZE))
+        for resource in with_contents(page, fields):
+            yield dump_json(response_fields(resource, fields)) + b"\n"
+        if len(page) < REPOSITORY_PAGE_SIZE:
+            return
+
+# Batch creation helpers
+MAX_BATCH_SIZE = 50_000
+
+def new_resource_record(resource: ResourceCreate, now: datetime) -> Dict:
+    """Build the stored record of a new resource (metrics not yet calculated)"""
+    resource_dict = resource.dict()
+    resource_dict.update({
+        "id": str(uuid.uuid4()),
+        "created_at": now,
+        "last_accessed": now,
+        "access_count": 0
+    })
+    return resource_dict
+
+def insert_resources(resources: List[ResourceCreate]) -> List[str]:
+    """Score a batch of new resources together and insert them in one step"""
+    now = datetime.now()
+    records = [new_resource_record(resource, now) for resource in resources]
+    repository.create_many(records, now)
+    scheduler.schedule_many(records)
+    forgetting_events.record_many([(record, frozenset()) for record in records], now)
+    
+    return [record["id"] for record in records]
+
+async def read_batch_body(request: Request) -> List[ResourceCreate]:
+    """Parse a JSON array or an NDJSON stream of ResourceCreate documents"""
+    resources = []
+    
+    def add(position: int, document: Any):
+        if len(resources) >= MAX_BATCH_SIZE:
+            raise HTTPException(status_code=413, detail=f"Batches are limited to {MAX_BATCH_SIZE} resources")
+        try:
+            resources.append(ResourceCreate.parse_obj(document))
+        except ValidationError as e:
+            raise HTTPException(status_code=422, detail={"index": position, "errors": json.loads(e.json())})
+    
+    try:
+        if NDJSON_MEDIA_TYPE in request.headers.get("content-type", ""):
+            buffer = b""
+            position = 0
+            async for chunk in request.stream():
+                buffer += chunk
+                *lines, buffer = buffer.split(b"\n")
+                for line in lines:
+                    if line.strip():
+                        add(position, json.loads(line))
+                        position += 1
+            if buffer.strip():
+                add(position, json.loads(buffer))
+        else:
+            documents = await request.json()
+            if not isinstance(documents, list):
+                raise HTTPException(status_code=422, detail="Expected a JSON array of resources")
+            for position, document in enumerate(documents):
+                add(position, document)
+    except json.JSONDecodeError:
+        raise HTTPException(status_code=400, detail="Malformed JSON in request body")
+    
+    return resources
+
+# Routes
+@app.on_event("startup")
+async def start_scheduler():
+    scheduler.start()
+    if access_buffer is not None:
+        access_buffer.start()
+    if webhook_dispatcher is not None:
+        webhook_dispatcher.start()
+    if tiering_sweeper is not None:
+        tiering_sweeper.start()
+
+@app.on_event("shutdown")
+async def stop_scheduler():
+    if access_buffer is not None:
+        # Apply the last buffered views while their events can still be delivered
+        await run_in_threadpool(access_buffer.stop)
+    await scheduler.stop()
+    if webhook_dispatcher is not None:
+        await run_in_threadpool(webhook_dispatcher.stop)
+    if tiering_sweeper is not None:
+        await run_in_threadpool(tiering_sweeper.stop)
+
+@app.on_event("shutdown")
+def close_repository():
+    repository.close()
+
+@app.get("/")
+def read_root():
+    return {"message": "Welcome to the ForgetIT API", "version": "1.0.0"}
+
+@app.post("/resources/", response_model=ResourceResponse)
+def create_resource(resource: ResourceCreate):
+    """Create a new resource with initial Memory Buoyancy and Preservation Value"""
+    now = datetime.now()
+    resource_dict = new_resource_record(resource, now)
+    
+    # Calculate initial metrics
+    resource_dict["memory_buoyancy"] = calculate_memory_buoyancy(resource_dict, now)
+    resource_dict["preservation_value"] = calculate_preservation_value(resource_dict, now)
+    
+    repository.create(resource_dict)
+    scheduler.schedule(resource_dict)
+    forgetting_events.record(resource_dict, frozenset(), now)
+    
+    return resource_dict
+
+@app.post(
+    "/resources/batch",
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {
+                    "schema": {"type": "array", "items": {"$ref": "#/components/schemas/ResourceCreate"}}
+                },
+                NDJSON_MEDIA_TYPE: {
+                    "schema": {"$ref": "#/components/schemas/ResourceCreate"}
+                }
+            }
+        }
+    }
+)
+async def create_resources_batch(request: Request):
+    """
+    Create many resources at once from a JSON array or an NDJSON stream
+    
+    Returns the ids of the new resources in input order instead of echoing
+    the full documents.
+    """
+    resources = await read_batch_body(request)
+    resource_ids = await run_in_threadpool(insert_resources, resources)
+    
+    return {"status": "success", "created": len(resource_ids), "ids": resource_ids}
+
+@app.get("/resources/", response_model=List[ResourceSummary])
+def list_resources(
+    request: Request,
+    min_mb: Optional[float] = Query(None, ge=0.0, le=1.0, description="Minimum Memory Buoyancy"),
+    min_pv: Optional[float] = Query(None, ge=0.0, le=1.0, description="Minimum Preservation Value"),
+    sort_by: Optional[str] = Query("memory_buoyancy", description="Sort by field"),
+    limit: Optional[int] = Query(None, ge=1, description="Maximum number of resources to return"),
+    after: Optional[str] = Query(None, description="Cursor from the X-Next-Cursor header of the previous page"),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    tag: Optional[List[str]] = Query(None, description=TAG_FILTER_DESCRIPTION),
+    content_type: Optional[str] = Query(None, description=CONTENT_TYPE_FILTER_DESCRIPTION)
+):
+    """
+    List resources with optional filtering by Memory Buoyancy, Preservation
+    Value, tags and content type
+    
+    Resources are listed without their content unless `fields` asks for it.
+    Pages are requested with `limit` and continued with the `after` cursor
+    returned in the X-Next-Cursor header. Clients sending
+    `Accept: application/x-ndjson` receive a streamed NDJSON export instead.
+    The export runs in constant memory, except with the memory backend in lazy
+    mode sorted by memory_buoyancy: that order depends on the time of the
+    request, so all matching resources are scored and sorted first.
+    JSON responses are cached and can be revalidated with If-None-Match.
+    """
+    after_key, as_of = decode_cursor(after, sort_by) if after is not None else (None, None)
+    if LAZY_MEMORY_BUOYANCY and as_of is None:
+        as_of = datetime.now()
+    projection = parse_fields(fields)
+    
+    if NDJSON_MEDIA_TYPE in request.headers.get("accept", ""):
+        resources = repository.iter_resources(min_mb, min_pv, sort_by, after_key, as_of, tag, content_type)
+        return StreamingResponse(
+            stream_resources_ndjson(itertools.islice(resources, limit), projection),
+            media_type=NDJSON_MEDIA_TYPE
+        )
+    
+    def render():
+        resources = repository.iter_resources(min_mb, min_pv, sort_by, after_key, as_of, tag, content_type)
+        if limit is None:
+            return encode_resources(list(resources), projection), {}
+        
+        # Fetch one extra resource to find out whether another page exists
+        page = list(itertools.islice(resources, limit + 1))
+        if len(page) <= limit:
+            return encode_resources(page, projection), {}
+        page = page[:limit]
+        next_cursor = encode_cursor(sort_by, cursor_key(page[-1], sort_by), as_of)
+        return encode_resources(page, projection), {"X-Next-Cursor": next_cursor}
+    
+    return cached_json_response(request, render)
+
+@app.get("/resources/top", response_model=List[ResourceSummary])
+def get_top_resources(
+    request: Request,
+    k: int = Query(10, ge=1, le=1000, description="Number of resources to return"),
+    rank_by: str = Query("mb", description="Rank by mb, pv, pv-mb or last_accessed, highest first"),
+    min_mb: Optional[float] = Query(None, ge=0.0, le=1.0, description="Minimum Memory Buoyancy"),
+    min_pv: Optional[float] = Query(None, ge=0.0, le=1.0, description="Minimum Preservation Value"),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    tag: Optional[List[str]] = Query(None, description=TAG_FILTER_DESCRIPTION),
+    content_type: Optional[str] = Query(None, description=CONTENT_TYPE_FILTER_DESCRIPTION)
+):
+    """
+    Get the `k` highest ranked resources matching the filters of the listing
+    
+    Only the best `k` are selected instead of sorting every resource: rankings
+    that are listing orders walk a sorted index and stop after `k`, others
+    keep a bounded heap. `pv-mb` puts resources that are worth preserving but
+    rarely used first.
+    """
+    if rank_by not in TOP_RANKINGS:
+        raise HTTPException(status_code=400, detail=f"Unknown ranking: {rank_by}")
+    projection = parse_fields(fields)
+    
+    def render():
+        resources = repository.top(rank_by, k, min_mb, min_pv, tag, content_type, datetime.now())
+        return encode_resources(resources, projection), {}
+    
+    return cached_json_response(request, render)
+
+@app.get("/resources/facets")
+def get_resource_facets(
+    request: Request,
+    tag: Optional[List[str]] = Query(None, description=TAG_FILTER_DESCRIPTION),
+    content_type: Optional[str] = Query(None, description=CONTENT_TYPE_FILTER_DESCRIPTION)
+):
+    """
+    Count resources and average their Memory Buoyancy and Preservation Value
+    per tag and per content type
+    
+    With filters, the facets cover only the matching resources, e.g. the tags
+    that occur together with `tag=project`. Facets are ordered by count.
+    """
+    def render():
+        facets = repository.facets(tag, content_type, datetime.now())
+        return dump_json({
+            "total": facets["total"],
+            "tags": facet_summaries(facets["tags"], "tag"),
+            "content_types": facet_summaries(facets["content_types"], "content_type")
+        }), {}
+    
+    return cached_json_response(request, render)
+
+@app.get("/search", response_model=List[SearchMatch])
+def search_resources(
+    request: Request,
+    q: str = Query(..., description="Words to search for in titles, tags and contents"),
+    k: int = Query(10, ge=1, le=1000, description="Number of resources to return"),
+    mb_weight: float = Query(
+        0.0, ge=0.0, le=1.0,
+        description="Share of the score that depends on Memory Buoyancy: 0 ranks by text relevance only, 1 by relevance times Memory Buoyancy"
+    ),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION)
+):
+    """
+    Find the `k` resources most relevant to a full-text query
+    
+    Resources match any of the words of `q`, case-insensitively, and are ranked
+    by BM25 over their title, tags and content, multiplied by
+    `1 - mb_weight + mb_weight * memory_buoyancy` so that buoyant resources
+    rank higher. Each result carries its `score`.
+    """
+    projection = parse_fields(fields)
+    
+    def render():
+        matches = repository.search(q, k, mb_weight, datetime.now())
+        resources = with_contents([resource for _, resource in matches], projection)
+        scores = {resource["id"]: score for score, resource in matches}
+        return dump_json([
+            dict(response_fields(resource, projection), score=scores[resource["id"]]) for resource in resources
+        ]), {}
+    
+    return cached_json_response(request, render)
+
+@app.get("/resources/clusters", response_model=List[ResourceCluster])
+def get_resource_clusters(
+    request: Request,
+    by: str = Query("tags", description="Cluster by similar tags or by similar content (shared runs of words)"),
+    min_similarity: float = Query(0.5, ge=0.0, le=1.0, description=SIMILARITY_DESCRIPTION),
+    min_size: int = Query(2, ge=2, description="Minimum number of resources of a cluster"),
+    limit: int = Query(20, ge=1, le=1000, description="Number of clusters to return"),
+    members: int = Query(10, ge=1, le=1000, description="Resources to return per cluster"),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION)
+):
+    """
+    Get the largest clusters of resources with similar tags or content
+    
+    Resources are compared by MinHash signatures, and only those sharing a
+    locality-sensitive hashing bucket are compared at all, so clusters are
+    found without comparing every pair of resources. The buckets are updated
+    as resources change. A cluster is a group of resources linked by pairs at
+    least `min_similarity` similar; each lists its `members` resources with
+    the highest Memory Buoyancy.
+    """
+    if by not in SIMILARITY_KINDS:
+        raise HTTPException(status_code=400, detail=f"Unknown feature set: {by}")
+    projection = parse_fields(fields)
+    
+    def render():
+        clusters = repository.clusters(by, min_similarity, min_size, limit, members, datetime.now())
+        return dump_json([
+            {"size": size, "resources": [response_fields(resource, projection) for resource in with_contents(resources, projection)]}
+            for size, resources in clusters
+        ]), {}
+    
+    return cached_json_response(request, render)
+
+@app.get("/resources/{resource_id}/related", response_model=List[RelatedResource])
+def get_related_resources(
+    request: Request,
+    resource_id: str,
+    by: str = Query("tags", description="Compare tags or content (shared runs of words)"),
+    k: int = Query(10, ge=1, le=1000, description="Number of resources to return"),
+    min_similarity: float = Query(0.5, ge=0.0, le=1.0, description=SIMILARITY_DESCRIPTION),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION)
+):
+    """
+    Get the `k` resources whose tags or content are most similar to those of a
+    resource, without registering an access
+    
+    Candidates are the resources sharing a locality-sensitive hashing bucket
+    with it, ranked by the Jaccard similarity estimated from their MinHash
+    signatures. Each result carries its `similarity`.
+    """
+    if by not in SIMILARITY_KINDS:
+        raise HTTPException(status_code=400, detail=f"Unknown feature set: {by}")
+    projection = parse_fields(fields)
+    
+    def render():
+        matches = repository.related(resource_id, by, k, min_similarity, datetime.now())
+        if matches is None:
+            raise HTTPException(status_code=404, detail="Resource not found")
+        resources = with_contents([resource for _, resource in matches], projection)
+        similarities = {resource["id"]: similarity for similarity, resource in matches}
+        return dump_json([
+            dict(response_fields(resource, projection), similarity=similarities[resource["id"]]) for resource in resources
+        ]), {}
+    
+    return cached_json_response(request, render)
+
+@app.get("/resources/{resource_id}", response_model=ResourceResponse)
+def get_resource(resource_id: str):
+    """Get a specific resource by ID and update its access metrics"""
+    now = datetime.now()
+    
+    if access_buffer is not None:
+        # Write-behind: the view is applied to the repository in the background
+        resource = access_buffer.view(resource_id, now)
+        if resource is None:
+            raise HTTPException(status_code=404, detail="Resource not found")
+        return with_content(resource)
+    
+    # Update resource metrics
+    before = stored_candidate_sets(resource_id)
+    resource = repository.touch(resource_id, now, now=now)
+    if resource is None:
+        raise HTTPException(status_code=404, detail="Resource not found")
+    scheduler.schedule(resource)
+    forgetting_events.record(resource, before, now)
+    
+    # Log the access
+    repository.log_access(resource_id, now, "view")
+    
+    return with_content(resource)
+
+@app.put("/resources/{resource_id}", response_model=ResourceResponse)
+def update_resource(resource_id: str, update_data: ResourceUpdate):
+    """Update a resource and recalculate its metrics"""
+    now = datetime.now()
+    
+    # Update fields and resource metrics
+    update_dict = update_data.dict(exclude_unset=True)
+    if access_buffer is not None:
+        # Earlier views must not move last_accessed back after the edit
+        access_buffer.apply(resource_id, now)
+    before = stored_candidate_sets(resource_id)
+    resource = repository.update(resource_id, update_dict, now)
+    if resource is None:
+        raise HTTPException(status_code=404, detail="Resource not found")
+    scheduler.schedule(resource)
+    forgetting_events.record(resource, before, now)
+    
+    # Log the access
+    repository.log_access(resource_id, now, "edit")
+    
+    return with_content(resource)
+
+@app.delete("/resources/{resource_id}")
+def delete_resource(resource_id: str):
+    """Delete a resource"""
+    resource = repository.get(resource_id)
+    if not repository.delete(resource_id):
+        raise HTTPException(status_code=404, detail="Resource not found")
+    scheduler.unschedule(resource_id)
+    if resource is not None:
+        forgetting_events.record(resource, candidate_sets(resource), datetime.now(), after=frozenset())
+    
+    return {"status": "success", "message": "Resource deleted"}
+
+@app.get("/metrics/low-buoyancy", response_model=List[ResourceSummary])
+def get_low_buoyancy_resources(
+    request: Request,
+    threshold: float = Query(LOW_BUOYANCY_THRESHOLD, ge=0.0, le=1.0),
+    limit: Optional[int] = Query(None, ge=1),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION)
+):
+    """Get resources with low Memory Buoyancy (candidates for managed forgetting)"""
+    projection = parse_fields(fields)
+    return cached_json_response(request, lambda: (encode_resources(repository.low_buoyancy(threshold, limit), projection), {}))
+
+@app.get("/metrics/archive-candidates", response_model=List[ResourceSummary])
+def get_archive_candidates(
+    request: Request,
+    max_mb: float = Query(ARCHIVE_THRESHOLDS[0], ge=0.0, le=1.0),
+    min_pv: float = Query(ARCHIVE_THRESHOLDS[1], ge=0.0, le=1.0),
+    limit: Optional[int] = Query(None, ge=1),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION)
+):
+    """
+    Get resources that are candidates for archiving:
+    - Low Memory Buoyancy (not currently relevant)
+    - High Preservation Value (worth preserving)
+    """
+    projection = parse_fields(fields)
+    return cached_json_response(request, lambda: (encode_resources(repository.archive_candidates(max_mb, min_pv, limit), projection), {}))
+
+@app.get("/metrics/deletion-candidates", response_model=List[ResourceSummary])
+def get_deletion_candidates(
+    request: Request,
+    max_mb: float = Query(DELETION_THRESHOLDS[0], ge=0.0, le=1.0),
+    max_pv: float = Query(DELETION_THRESHOLDS[1], ge=0.0, le=1.0),
+    limit: Optional[int] = Query(None, ge=1),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION)
+):
+    """
+    Get resources that are candidates for deletion:
+    - Low Memory Buoyancy (not currently relevant)
+    - Low Preservation Value (not worth preserving)
+    """
+    projection = parse_fields(fields)
+    return cached_json_response(request, lambda: (encode_resources(repository.deletion_candidates(max_mb, max_pv, limit), projection), {}))
+
+@app.get("/metrics/forgetting-events")
+def get_forgetting_events(
+    after: int = Query(0, ge=0, description="Return events with a higher event_id"),
+    limit: Optional[int] = Query(100, ge=1)
+):
+    """
+    Get recent changes of the candidate sets: resources entering or leaving
+    the low-buoyancy, archive and deletion sets as their Memory Buoyancy decays
+    """
+    return forgetting_events.since(after, limit)
+
+@app.get("/metrics/forgetting-events/stream", response_class=StreamingResponse)
+async def stream_forgetting_event_changes(
+    request: Request,
+    after: Optional[int] = Query(None, ge=0, description="Replay retained events with a higher event_id first")
+):
+    """
+    Stream changes of the candidate sets as server-sent events
+    
+    Reconnecting clients send the standard Last-Event-ID header (or `after`)
+    to receive the retained events they missed before the live ones.
+    """
+    last_event_id = request.headers.get("last-event-id")
+    if last_event_id is not None:
+        try:
+            after = int(last_event_id)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid Last-Event-ID header")
+    
+    return StreamingResponse(
+        stream_forgetting_events(broadcaster.subscribe(), after),
+        media_type=SSE_MEDIA_TYPE,
+        headers={"Cache-Control": "no-cache"}
+    )
+
+@app.get("/metrics/tiers")
+def get_tier_usage():
+    """
+    Resources and bytes held in memory and in the cold tier, with the number
+    of demotions and promotions and the latency of recent promotions
+    """
+    usage = repository.tier_usage()
+    if usage is None:
+        raise HTTPException(status_code=404, detail="This storage backend does not tier resources")
+    
+    latencies = np.array(usage["cold"].pop("promotion_latencies")) * 1000
+    usage["cold"]["recent_promotion_ms"] = None if len(latencies) == 0 else {
+        "samples": len(latencies),
+        "mean": float(latencies.mean()),
+        "p50": float(np.percentile(latencies, 50)),
+        "p99": float(np.percentile(latencies, 99)),
+        "max": float(latencies.max())
+    }
+    return usage
+
+@app.get("/metrics/summary")
+def get_score_summary(request: Request):
+    """
+    Distributions of Memory Buoyancy and Preservation Value over all resources
+    and per content type and tag
+    
+    Each distribution has a count and, for both scores, the mean and a
+    histogram over the bins given by `bin_edges`. The memory backend keeps
+    these aggregates up to date as resources change, so reading them does not
+    depend on the number of resources. Groups are ordered by count.
+    """
+    def render():
+        summary = repository.score_summary(datetime.now())
+        bins = summary["bins"]
+        return dump_json({
+            "bin_edges": [position / bins for position in range(bins + 1)],
+            "total": score_distribution(summary["total"]),
+            "content_types": score_distributions(summary["content_types"], "content_type"),
+            "tags": score_distributions(summary["tags"], "tag")
+        }), {}
+    
+    return cached_json_response(request, render)
+
+@app.post("/access-log")
+def log_resource_access(log_entry: AccessLog):
+    """Log a resource access event and update metrics"""
+    # Reject an access type the log cannot store before changing anything
+    try:
+        repository.check_accesses([(log_entry.resource_id, log_entry.timestamp, log_entry.access_type)])
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    
+    # Update resource
+    now = datetime.now()
+    before = stored_candidate_sets(log_entry.resource_id)
+    resource = repository.touch(log_entry.resource_id, log_entry.timestamp, now=now)
+    if resource is None:
+        raise HTTPException(status_code=404, detail="Resource not found")
+    scheduler.schedule(resource)
+    forgetting_events.record(resource, before, now)
+    
+    # Add to access logs
+    repository.log_access(log_entry.resource_id, log_entry.timestamp, log_entry.access_type)
+    
+    return {"status": "success", "message": "Access logged", "resource_id": log_entry.resource_id}
+
+@app.get("/access-log/{resource_id}", response_model=List[AccessLog])
+def get_access_history(resource_id: str, limit: Optional[int] = Query(100, ge=1, description="Maximum number of events")):
+    """Get the retained access history of a resource, newest first"""
+    if repository.get(resource_id) is None:
+        raise HTTPException(status_code=404, detail="Resource not found")
+    
+    return repository.access_history(resource_id, limit)
+
+@app.post("/access-log/batch")
+def log_resource_access_batch(log_entries: List[AccessLog]):
+    """
+    Log many access events for many resources at once
+    
+    Events are grouped per resource: each resource gets the timestamp of its
+    latest event in the batch and the summed access count applied once, and its
+    Memory Buoyancy is recomputed once. Events for unknown resources are skipped
+    and reported.
+    """
+    if len(log_entries) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=413, detail=f"Batches are limited to {MAX_BATCH_SIZE} events")
+    
+    # Reject access types the log cannot store before changing anything
+    events = [(log_entry.resource_id, log_entry.timestamp, log_entry.access_type) for log_entry in log_entries]
+    try:
+        repository.check_accesses(events)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    
+    # Coalesce events per resource: (latest timestamp, number of events)
+    coalesced: Dict[str, list] = {}
+    for log_entry in log_entries:
+        entry = coalesced.setdefault(log_entry.resource_id, [log_entry.timestamp, 0])
+        entry[0] = max(entry[0], log_entry.timestamp)
+        entry[1] += 1
+    
+    # Update each affected resource once
+    now = datetime.now()
+    unknown_resource_ids = set()
+    for resource_id, (timestamp, count) in coalesced.items():
+        before = stored_candidate_sets(resource_id)
+        resource = repository.touch(resource_id, timestamp, count, now)
+        if resource is None:
+            unknown_resource_ids.add(resource_id)
+        else:
+            scheduler.schedule(resource)
+            forgetting_events.record(resource, before, now)
+    
+    # Add to access logs
+    accepted = [event for event in events if event[0] not in unknown_resource_ids]
+    repository.log_accesses(accepted)
+    
+    return {
+        "status": "success",
+        "logged": len(accepted),
+        "resources_updated": len(coalesced) - len(unknown_resource_ids),
+        "unknown_resource_ids": sorted(unknown_resource_ids)
+    }
+
+@app.post("/update-metrics")
+def update_all_metrics():
+    """Update Memory Buoyancy and Preservation Value for all resources"""
+    now = datetime.now()
+    count, changes = repository.recompute_all(now)
+    forgetting_events.record_many(changes, now)
     
     return {
         "status": "success", 
-        "message": f"Updated metrics for {len(resources_db)} resources"
+        "message": f"Updated metrics for {count} resources"
     }
 
 # For testing purposes, if run directly
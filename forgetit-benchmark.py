@@ -0,0 +1,553 @@
+import argparse
+import base64
+import http.client
+import importlib.util
+import itertools
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import urllib.parse
+from datetime import datetime, timedelta
+
+def load_api():
+    """Import forgetit-api.py as a module (its file name is not a valid identifier)"""
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "forgetit-api.py")
+    spec = importlib.util.spec_from_file_location("forgetit_api", path)
+    api = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(api)
+    return api
+
+def sample_records(api, start, count, now):
+    """Generate `count` new resource records, numbered from `start`, with varied scoring inputs"""
+    content_types = list(api.CONTENT_TYPE_FACTORS) + ["video"]
+    tags = ["project", "important", "archive", "family", "reference", "notes", "temporary"]
+    records = []
+    for i in range(start, start + count):
+        records.append({
+            "id": f"{i:012d}",
+            "title": f"Resource {i}",
+            "content_type": random.choice(content_types),
+            "content": f"Content of resource {i}",
+            "tags": random.sample(tags, random.randint(0, 4)),
+            "context": {"importance": random.random(), "preservation_importance": random.random()},
+            "created_at": now,
+            "last_accessed": now,
+            "access_count": 0
+        })
+    return records
+
+def benchmark_startup(api, resources, tail_operations, batch_size):
+    """Measure snapshot and recovery time of the durable in-memory repository"""
+    directory = tempfile.mkdtemp(prefix="forgetit-wal-")
+    try:
+        repository = api.DurableInMemoryRepository(directory, snapshot_interval=0)
+        now = datetime.now()
+
+        start = time.perf_counter()
+        for offset in range(0, resources, batch_size):
+            repository.create_many(sample_records(api, offset, min(batch_size, resources - offset), now), now)
+        print(f"Loaded {resources} resources in {time.perf_counter() - start:.2f}s")
+
+        start = time.perf_counter()
+        repository.snapshot()
+        print(f"Snapshot written in {time.perf_counter() - start:.2f}s")
+
+        # Operations logged after the snapshot have to be replayed on startup
+        resource_ids = list(repository.resources)
+        for _ in range(tail_operations):
+            resource_id = random.choice(resource_ids)
+            timestamp = now - timedelta(days=random.random() * 30)
+            repository.touch(resource_id, timestamp)
+            repository.log_access(resource_id, timestamp, "view")
+        repository.close(snapshot=False)
+
+        sizes = {name: os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory)}
+        for name, size in sorted(sizes.items()):
+            print(f"  {name}: {size / 1e6:.1f} MB")
+
+        start = time.perf_counter()
+        recovered = api.DurableInMemoryRepository(directory, snapshot_interval=0)
+        elapsed = time.perf_counter() - start
+        print(f"Recovered {recovered.count()} resources and replayed {2 * tail_operations} operations in {elapsed:.2f}s")
+        recovered.close(snapshot=False)
+    finally:
+        shutil.rmtree(directory)
+
+def stress(api, clients, requests_per_client, resources):
+    """
+    Hit a few resources from parallel threads through the route functions, as
+    FastAPI's threadpool does, while sweeps, snapshots and unrelated single and
+    batch creates and deletes run alongside. Returns whether every access was
+    counted exactly once and nothing raised.
+    """
+    now = datetime.now()
+    records = sample_records(api, 0, resources, now)
+    api.repository.create_many(records, now)
+    resource_ids = [record["id"] for record in records]
+    expected = {resource_id: 0 for resource_id in resource_ids}
+    expected_lock = threading.Lock()
+    errors = []
+    
+    def client(seed):
+        generator = random.Random(seed)
+        counts = {resource_id: 0 for resource_id in resource_ids}
+        try:
+            for i in range(requests_per_client):
+                resource_id = generator.choice(resource_ids)
+                action = generator.random()
+                if action < 0.4:
+                    api.get_resource(resource_id)
+                elif action < 0.8:
+                    api.log_resource_access(api.AccessLog(resource_id=resource_id, timestamp=datetime.now(), access_type="view"))
+                elif action < 0.9:
+                    api.update_resource(resource_id, api.ResourceUpdate(tags=["project"] * generator.randint(0, 3)))
+                else:
+                    entries = [
+                        api.AccessLog(resource_id=generator.choice(resource_ids), timestamp=datetime.now(), access_type="share")
+                        for _ in range(5)
+                    ]
+                    api.log_resource_access_batch(entries)
+                    for entry in entries:
+                        counts[entry.resource_id] += 1
+                    continue
+                counts[resource_id] += 1
+        except Exception as e:
+            errors.append(repr(e))
+        with expected_lock:
+            for resource_id, count in counts.items():
+                expected[resource_id] += count
+    
+    def sweeper(stop):
+        try:
+            while not stop.is_set():
+                api.update_all_metrics()
+                list(api.repository.iter_resources(None, None, "last_accessed"))
+                api.repository.archive_candidates(max_mb=0.9, min_pv=0.0)
+        except Exception as e:
+            errors.append(repr(e))
+    
+    def churner(stop):
+        try:
+            while not stop.is_set():
+                created = api.create_resource(api.ResourceCreate(title="churn", content_type="note", content="", tags=[]))
+                api.get_resource(created["id"])
+                api.delete_resource(created["id"])
+        except Exception as e:
+            errors.append(repr(e))
+    
+    def batcher(stop):
+        # Keep the batches until the end, so that the store grows (and its
+        # dict resizes) while snapshots iterate over it
+        created = []
+        try:
+            while not stop.is_set():
+                batch = [api.ResourceCreate(title="batch", content_type="note", content="", tags=["project"]) for _ in range(200)]
+                created.extend(api.insert_resources(batch))
+            for resource_id in created:
+                api.delete_resource(resource_id)
+        except Exception as e:
+            errors.append(repr(e))
+    
+    def snapshotter(stop):
+        try:
+            while not stop.is_set():
+                api.repository.snapshot_resources()
+        except Exception as e:
+            errors.append(repr(e))
+    
+    stop = threading.Event()
+    background = [
+        threading.Thread(target=target, args=(stop,))
+        for target in (sweeper, churner, batcher, snapshotter)
+    ]
+    workers = [threading.Thread(target=client, args=(seed,)) for seed in range(clients)]
+    start = time.perf_counter()
+    for thread in background + workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    stop.set()
+    for thread in background:
+        thread.join()
+    if api.access_buffer is not None:
+        api.access_buffer.flush()
+    elapsed = time.perf_counter() - start
+    
+    lost = {
+        resource_id: expected[resource_id] - api.repository.get(resource_id)["access_count"]
+        for resource_id in resource_ids
+        if api.repository.get(resource_id)["access_count"] != expected[resource_id]
+    }
+    history = sum(len(api.repository.access_history(resource_id)) for resource_id in resource_ids)
+    print(f"{clients} clients made {sum(expected.values())} accesses in {elapsed:.2f}s")
+    print(f"Access counts off for {len(lost)} of {resources} resources, {history} access events retained")
+    for error in errors[:10]:
+        print(f"  error: {error}")
+    
+    return not lost and not errors and history == sum(expected.values())
+
+def benchmark_reads(api, resources, reads):
+    """Latency of GET /resources/{id} applying every view right away and with write-behind, against a plain read"""
+    now = datetime.now()
+    records = sample_records(api, 0, resources, now)
+    api.repository.create_many(records, now)
+    resource_ids = [record["id"] for record in records]
+    sample = [random.choice(resource_ids) for _ in range(reads)]
+    
+    def timed(name, read):
+        start = time.perf_counter()
+        for resource_id in sample:
+            read(resource_id)
+        print(f"{name}: {(time.perf_counter() - start) / reads * 1e6:.1f} us per read")
+    
+    timed("Plain read, no access registered", lambda resource_id: api.with_content(api.repository.get(resource_id)))
+    api.access_buffer = None
+    timed("GET /resources/{id}, write-through", api.get_resource)
+    api.access_buffer = api.AccessBuffer(api.repository, api.scheduler, api.forgetting_events)
+    timed("GET /resources/{id}, write-behind", api.get_resource)
+    start = time.perf_counter()
+    applied = api.access_buffer.flush()
+    print(f"Applied {applied} buffered views in {(time.perf_counter() - start) * 1000:.0f}ms")
+
+def benchmark_search(api, resources, vocabulary, words_per_resource, queries):
+    """Indexing time and query latency of full-text search over resources with Zipf-distributed words"""
+    now = datetime.now()
+    words = [f"w{rank}" for rank in range(vocabulary)]
+    cumulative_weights = list(itertools.accumulate(1 / rank for rank in range(1, vocabulary + 1)))
+    repository = api.InMemoryRepository()
+    start = time.perf_counter()
+    for offset in range(0, resources, 10_000):
+        records = sample_records(api, offset, min(10_000, resources - offset), now)
+        for record in records:
+            record["content"] = " ".join(random.choices(words, cum_weights=cumulative_weights, k=words_per_resource))
+        repository.create_many(records, now)
+    print(f"Created and indexed {resources} resources in {time.perf_counter() - start:.1f}s")
+    
+    # Common, medium and rare words, alone and combined
+    ranks = {"common": (0, 10), "medium": (100, 1000), "rare": (5000, vocabulary)}
+    for name, (low, high) in ranks.items():
+        for size in (1, 3):
+            for mb_weight in (0.0, 0.5):
+                timings = []
+                for _ in range(queries):
+                    query = " ".join(random.choice(words[low:min(high, vocabulary)]) for _ in range(size))
+                    started = time.perf_counter()
+                    repository.search(query, 10, mb_weight)
+                    timings.append(time.perf_counter() - started)
+                timings.sort()
+                print(
+                    f"{size} {name} word{'s' if size > 1 else ''}, mb_weight {mb_weight}: "
+                    f"median {timings[len(timings) // 2] * 1000:.1f}ms, p99 {timings[int(len(timings) * 0.99)] * 1000:.1f}ms"
+                )
+
+def benchmark_similarity(api, resources, queries):
+    """Indexing time and latency of related resources and clusters over tags and near-duplicate contents"""
+    now = datetime.now()
+    tags = [f"tag{rank}" for rank in range(200)]
+    tag_weights = list(itertools.accumulate(1 / rank for rank in range(1, len(tags) + 1)))
+    words = [f"w{rank}" for rank in range(5000)]
+    # Threads of messages quoting each other: copies of a few texts with some words changed
+    threads = [random.choices(words, k=40) for _ in range(max(1, resources // 100))]
+    repository = api.InMemoryRepository()
+    start = time.perf_counter()
+    for offset in range(0, resources, 10_000):
+        records = sample_records(api, offset, min(10_000, resources - offset), now)
+        for record in records:
+            record["tags"] = list(set(random.choices(tags, cum_weights=tag_weights, k=random.randint(2, 5))))
+            text = list(random.choice(threads))
+            for _ in range(random.randint(0, 6)):
+                text[random.randrange(len(text))] = random.choice(words)
+            record["content"] = " ".join(text)
+        repository.create_many(records, now)
+    print(f"Created and indexed {resources} resources in {time.perf_counter() - start:.1f}s")
+    
+    for kind in api.SIMILARITY_KINDS:
+        timings = []
+        for _ in range(queries):
+            resource_id = f"{random.randrange(resources):012d}"
+            started = time.perf_counter()
+            repository.related(resource_id, kind, 10, 0.5, now)
+            timings.append(time.perf_counter() - started)
+        timings.sort()
+        print(
+            f"Related by {kind}: median {timings[len(timings) // 2] * 1000:.1f}ms, "
+            f"p99 {timings[int(len(timings) * 0.99)] * 1000:.1f}ms"
+        )
+        started = time.perf_counter()
+        clusters = repository.clusters(kind, 0.5, 2, 20, 10, now)
+        print(
+            f"Clusters by {kind}: {(time.perf_counter() - started) * 1000:.0f}ms, "
+            f"largest {', '.join(str(size) for size, _ in clusters[:5])}"
+        )
+    
+    # Comparing the tag sets of every pair of resources instead
+    sample = [set(resource["tags"]) for resource in repository.snapshot_resources()[:1000]]
+    started = time.perf_counter()
+    for position, first in enumerate(sample):
+        for second in sample[position + 1:]:
+            len(first & second) / len(first | second)
+    pairs = len(sample) * (len(sample) - 1) / 2
+    estimate = (time.perf_counter() - started) / pairs * resources * (resources - 1) / 2
+    print(f"Comparing the tags of all pairs of {resources} resources would take about {estimate:.0f}s")
+
+def benchmark_serialization(api, items, repeat):
+    """
+    Compare per-item Pydantic validation with the direct encoder for one large
+    list response, without content as `GET /resources/` returns it by default
+    """
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse
+    
+    now = datetime.now()
+    records = sample_records(api, 0, items, now)
+    for record in records:
+        record["memory_buoyancy"] = api.calculate_memory_buoyancy(record, now)
+        record["preservation_value"] = api.calculate_preservation_value(record, now)
+    
+    def validated():
+        return JSONResponse(jsonable_encoder([api.ResourceSummary.parse_obj(record) for record in records])).body
+    
+    def direct():
+        return api.encode_resources(records)
+    
+    if json.loads(validated()) != json.loads(direct()):
+        raise RuntimeError("The encoders produce different documents")
+    
+    encoder = "orjson" if api.orjson is not None else "json"
+    for name, encode in (("Pydantic validation", validated), (f"direct ({encoder})", direct)):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            body = encode()
+            timings.append(time.perf_counter() - start)
+        timings.sort()
+        print(f"{name}: {items} items, {len(body) / 1e6:.1f} MB, median {timings[len(timings) // 2] * 1000:.1f}ms, best {timings[0] * 1000:.1f}ms")
+
+def email_corpus(count, attachments, attachment_size):
+    """
+    Synthetic mailbox as (content_type, content) pairs: replies quoting the
+    earlier messages of their thread, copies of a few newsletters, and
+    attachments stored as resources of their own and sent around many times
+    """
+    words = ["meeting", "project", "deadline", "report", "budget", "review", "draft", "client", "update",
+             "schedule", "please", "attached", "thanks", "regards", "agenda", "follow", "quarter", "team"]
+    signatures = [f"\n--\nPerson {i}\nDepartment {i % 5}\nPhone +1 555 01{i:02d}\n" for i in range(20)]
+    newsletters = [" ".join(random.choice(words) for _ in range(2000)) for _ in range(10)]
+    files = [base64.b64encode(os.urandom(attachment_size)).decode() for _ in range(attachments)]
+    corpus = []
+    thread = []
+    while len(corpus) < count:
+        if random.random() < 0.1:
+            corpus.append(("email", random.choice(newsletters)))
+            continue
+        if random.random() < 0.25:
+            thread = []
+        body = " ".join(random.choice(words) for _ in range(random.randint(20, 120)))
+        message = f"Hello,\n{body}\n{random.choice(signatures)}"
+        corpus.append(("email", message + "".join("\n> " + line for earlier in thread[-3:] for line in earlier.splitlines())))
+        thread.append(message)
+        if random.random() < 0.3:
+            corpus.append(("document", random.choice(files)))
+    return corpus[:count]
+
+def benchmark_content(api, resources, attachments, attachment_size):
+    """Memory taken by the contents of an email corpus in the deduplicated, compressed blob store"""
+    now = datetime.now()
+    records = sample_records(api, 0, resources, now)
+    for record, (content_type, content) in zip(records, email_corpus(resources, attachments, attachment_size)):
+        record["content_type"] = content_type
+        record["content"] = content
+    raw_bytes = sum(len(record["content"].encode()) for record in records)
+    unique_bytes = sum(len(content.encode()) for content in {record["content"] for record in records})
+    
+    repository = api.InMemoryRepository()
+    start = time.perf_counter()
+    repository.create_many(records, now)
+    elapsed = time.perf_counter() - start
+    usage = repository.blobs.usage()
+    print(f"Stored {resources} resources in {elapsed:.2f}s using {api.CONTENT_COMPRESSION} compression")
+    print(f"  contents as given:   {raw_bytes / 1e6:.1f} MB")
+    print(f"  after deduplication: {unique_bytes / 1e6:.1f} MB in {usage['blobs']} blobs")
+    print(f"  after compression:   {usage['stored_bytes'] / 1e6:.1f} MB ({raw_bytes / usage['stored_bytes']:.1f}x smaller overall)")
+    
+    resource_ids = [record["id"] for record in records]
+    start = time.perf_counter()
+    for offset in range(0, len(resource_ids), 1000):
+        repository.contents(resource_ids[offset:offset + 1000])
+    print(f"Read every content back in {time.perf_counter() - start:.2f}s")
+
+def benchmark_tiering(api, resources, hot_fraction, content_size):
+    """Memory held by the in-memory repository before and after demoting low-buoyancy resources to the cold tier"""
+    now = datetime.now()
+    old = now - timedelta(days=90)
+    words = ["memory", "archive", "project", "meeting", "report", "draft", "family", "budget", "travel", "notes"]
+    cold_ids = []
+    
+    directory = tempfile.mkdtemp(prefix="forgetit-tiering-")
+    try:
+        tracemalloc.start()
+        repository = api.InMemoryRepository(api.ColdTier(directory))
+        for start in range(0, resources, 10_000):
+            records = sample_records(api, start, min(10_000, resources - start), now)
+            for record in records:
+                record["content"] = " ".join(random.choices(words, k=content_size // 7))
+                if random.random() >= hot_fraction:
+                    # Not accessed for months and unimportant: Memory Buoyancy well below the threshold
+                    record["last_accessed"] = old
+                    record["context"]["importance"] *= 0.5
+                    cold_ids.append(record["id"])
+            repository.create_many(records, now)
+        records = None
+        all_hot = tracemalloc.get_traced_memory()[0]
+        
+        start = time.perf_counter()
+        demoted = repository.demote_cold(now)
+        elapsed = time.perf_counter() - start
+        tiered = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        usage = repository.tier_usage()
+        print(f"Demoted {demoted} of {resources} resources in {elapsed:.2f}s")
+        print(f"  Python heap with every resource hot: {all_hot / 1e6:.1f} MB")
+        print(f"  Python heap with {usage['hot']['resources']} hot:  {tiered / 1e6:.1f} MB ({tiered / resources:.0f} bytes per resource)")
+        print(f"  Cold tier file: {usage['cold']['file_bytes'] / 1e6:.1f} MB")
+        
+        sample = random.sample(cold_ids, min(1000, len(cold_ids)))
+        start = time.perf_counter()
+        for resource_id in sample:
+            repository.get(resource_id)
+        print(f"Read a cold resource without promoting it in {(time.perf_counter() - start) / len(sample) * 1e6:.0f} us on average")
+        for resource_id in sample:
+            repository.touch(resource_id, now, now=now)
+        latencies = sorted(repository.cold_tier.promotion_latencies)
+        print(
+            f"Promoted {len(latencies)} resources on access: "
+            f"p50 {latencies[len(latencies) // 2] * 1e6:.0f} us, p99 {latencies[int(len(latencies) * 0.99)] * 1e6:.0f} us"
+        )
+        repository.close()
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+def hammer(url, resource_ids, seconds, seed):
+    """One client process: view and log accesses of random resources over a keep-alive connection"""
+    address = urllib.parse.urlsplit(url)
+    connection = http.client.HTTPConnection(address.hostname, address.port)
+    generator = random.Random(seed)
+    requests = 0
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        resource_id = generator.choice(resource_ids)
+        if generator.random() < 0.5:
+            connection.request("GET", f"/resources/{resource_id}")
+        else:
+            body = json.dumps({"resource_id": resource_id, "timestamp": datetime.now().isoformat(), "access_type": "view"})
+            connection.request("POST", "/access-log", body, {"Content-Type": "application/json"})
+        response = connection.getresponse()
+        response.read()
+        if response.status != 200:
+            raise RuntimeError(f"{resource_id}: HTTP {response.status}")
+        requests += 1
+    return requests
+
+def benchmark_throughput(url, clients, seconds, resources):
+    """Measure requests per second of a running server, e.g. plain uvicorn against forgetit-cluster.py"""
+    address = urllib.parse.urlsplit(url)
+    connection = http.client.HTTPConnection(address.hostname, address.port)
+    documents = [
+        {"title": f"Resource {i}", "content_type": "note", "content": f"Content of resource {i}", "tags": []}
+        for i in range(resources)
+    ]
+    connection.request("POST", "/resources/batch", json.dumps(documents), {"Content-Type": "application/json"})
+    resource_ids = json.loads(connection.getresponse().read())["ids"]
+    connection.close()
+
+    # Client processes rather than threads, so the load generator is not limited by one core
+    with multiprocessing.Pool(clients) as pool:
+        start = time.perf_counter()
+        counts = pool.starmap(hammer, [(url, resource_ids, seconds, seed) for seed in range(clients)])
+        elapsed = time.perf_counter() - start
+    print(f"{clients} clients made {sum(counts)} requests in {elapsed:.2f}s: {sum(counts) / elapsed:.0f} requests/s")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks for the ForgetIT API storage layer")
+    subcommands = parser.add_subparsers(dest="benchmark", required=True)
+
+    startup = subcommands.add_parser("startup", help="Snapshot and recovery time of the durable in-memory mode")
+    startup.add_argument("--resources", type=int, default=1_000_000)
+    startup.add_argument("--tail-operations", type=int, default=50_000, help="Accesses logged after the snapshot")
+    startup.add_argument("--batch-size", type=int, default=50_000)
+
+    stress_test = subcommands.add_parser("stress", help="Check that access counts stay exact under parallel clients")
+    stress_test.add_argument("--clients", type=int, default=16)
+    stress_test.add_argument("--requests", type=int, default=2000, help="Requests per client")
+    stress_test.add_argument("--resources", type=int, default=20)
+    
+    content = subcommands.add_parser("content", help="Memory taken by contents in the blob store")
+    content.add_argument("--resources", type=int, default=20_000)
+    content.add_argument("--attachments", type=int, default=50, help="Distinct attachments")
+    content.add_argument("--attachment-size", type=int, default=30_000, help="Bytes per attachment before base64")
+    
+    tiering = subcommands.add_parser("tiering", help="Memory saved by the cold tier and promotion latency")
+    tiering.add_argument("--resources", type=int, default=100_000)
+    tiering.add_argument("--hot-fraction", type=float, default=0.1, help="Share of resources that stay hot")
+    tiering.add_argument("--content-size", type=int, default=2000, help="Approximate bytes of content per resource")
+    
+    reads = subcommands.add_parser("reads", help="Latency of resource reads with and without write-behind")
+    reads.add_argument("--resources", type=int, default=100_000)
+    reads.add_argument("--reads", type=int, default=100_000)
+    
+    search = subcommands.add_parser("search", help="Indexing time and latency of full-text search")
+    search.add_argument("--resources", type=int, default=1_000_000)
+    search.add_argument("--vocabulary", type=int, default=50_000, help="Distinct words")
+    search.add_argument("--words", type=int, default=30, help="Words of content per resource")
+    search.add_argument("--queries", type=int, default=50, help="Queries per kind")
+    
+    similarity = subcommands.add_parser("similarity", help="Latency of related resources and clusters")
+    similarity.add_argument("--resources", type=int, default=200_000)
+    similarity.add_argument("--queries", type=int, default=200, help="Related resource queries per feature set")
+    
+    serialization = subcommands.add_parser("serialization", help="Latency of encoding large list responses")
+    serialization.add_argument("--items", type=int, default=10_000)
+    serialization.add_argument("--repeat", type=int, default=20)
+    
+    throughput = subcommands.add_parser("throughput", help="Requests per second of a running server")
+    throughput.add_argument("--url", default="http://127.0.0.1:8000")
+    throughput.add_argument("--clients", type=int, default=os.cpu_count())
+    throughput.add_argument("--seconds", type=float, default=10.0)
+    throughput.add_argument("--resources", type=int, default=10_000)
+    
+    args = parser.parse_args()
+    random.seed(0)
+    if args.benchmark == "throughput":
+        benchmark_throughput(args.url, args.clients, args.seconds, args.resources)
+        return
+    api = load_api()
+
+    if args.benchmark == "startup":
+        benchmark_startup(api, args.resources, args.tail_operations, args.batch_size)
+    elif args.benchmark == "content":
+        benchmark_content(api, args.resources, args.attachments, args.attachment_size)
+    elif args.benchmark == "tiering":
+        benchmark_tiering(api, args.resources, args.hot_fraction, args.content_size)
+    elif args.benchmark == "reads":
+        benchmark_reads(api, args.resources, args.reads)
+    elif args.benchmark == "search":
+        benchmark_search(api, args.resources, args.vocabulary, args.words, args.queries)
+    elif args.benchmark == "similarity":
+        benchmark_similarity(api, args.resources, args.queries)
+    elif args.benchmark == "serialization":
+        benchmark_serialization(api, args.items, args.repeat)
+    elif args.benchmark == "stress":
+        # Switch threads often to make lost updates likely if there is a race
+        sys.setswitchinterval(1e-6)
+        if not stress(api, args.clients, args.requests, args.resources):
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+import argparse
+import importlib.util
+import os
+import secrets
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+API_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+
+def load_api():
+    """Import forgetit-api.py as a module (its file name is not a valid identifier)"""
+    spec = importlib.util.spec_from_file_location("forgetit_api", os.path.join(API_DIRECTORY, "forgetit-api.py"))
+    api = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(api)
+    return api
+
+def shard_environment(index, sockets, authkey):
+    """Environment of one shard process: the memory backend, with its own WAL directory if durable"""
+    environment = dict(
+        os.environ,
+        FORGETIT_STORAGE="memory",
+        FORGETIT_SHARD_SOCKETS=",".join(sockets),
+        FORGETIT_SHARD_AUTHKEY=authkey
+    )
+    if os.environ.get("FORGETIT_WAL_DIR"):
+        environment["FORGETIT_WAL_DIR"] = os.path.join(os.environ["FORGETIT_WAL_DIR"], f"shard-{index}")
+    if index != 0:
+        # Only shard 0 hosts the event log, so only it delivers webhooks
+        environment.pop("FORGETIT_WEBHOOK_URL", None)
+    return environment
+
+def wait_for_shards(shards, sockets, timeout=60.0):
+    deadline = time.monotonic() + timeout
+    while not all(os.path.exists(path) for path in sockets):
+        for index, shard in enumerate(shards):
+            if shard.poll() is not None:
+                raise RuntimeError(f"Shard {index} exited with status {shard.returncode}")
+        if time.monotonic() > deadline:
+            raise RuntimeError("Timed out waiting for the shards to start")
+        time.sleep(0.1)
+
+def listen_socket(host, port):
+    """
+    HTTP listening socket with Nagle's algorithm disabled
+    
+    uvicorn's workers leave it enabled, which holds back the body of every
+    response until the client's delayed ACK of the headers (about 40ms).
+    Accepted connections inherit the option from this socket.
+    """
+    listener = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+    listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    listener.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    listener.bind((host, port))
+    listener.set_inheritable(True)
+    return listener
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Run the ForgetIT API with resources sharded across processes and several API workers"
+    )
+    parser.add_argument("--shards", type=int, default=os.cpu_count(), help="Shard processes holding the resources")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="uvicorn worker processes serving the API")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--socket-dir", help="Directory for the shard sockets (default: a temporary directory)")
+    parser.add_argument("--serve-shard", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve_shard is not None:
+        api = load_api()
+        api.serve_shard(args.serve_shard, api.SHARD_SOCKETS, api.SHARD_AUTHKEY)
+        return
+
+    socket_dir = args.socket_dir or tempfile.mkdtemp(prefix="forgetit-shards-")
+    os.makedirs(socket_dir, exist_ok=True)
+    sockets = [os.path.join(socket_dir, f"shard-{index}.sock") for index in range(args.shards)]
+    authkey = secrets.token_hex(16)
+
+    shards = [
+        subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), "--serve-shard", str(index)],
+            env=shard_environment(index, sockets, authkey)
+        )
+        for index in range(args.shards)
+    ]
+    try:
+        wait_for_shards(shards, sockets)
+        print(f"Started {args.shards} shards, sockets in {socket_dir}")
+
+        # The API workers inherit this environment
+        os.environ.update(
+            FORGETIT_STORAGE="sharded",
+            FORGETIT_SHARD_SOCKETS=",".join(sockets),
+            FORGETIT_SHARD_AUTHKEY=authkey
+        )
+        import uvicorn
+        listener = listen_socket(args.host, args.port)
+        uvicorn.run("forgetit-api:app", fd=listener.fileno(), workers=args.workers, app_dir=API_DIRECTORY)
+    finally:
+        for shard in shards:
+            shard.terminate()
+        for shard in shards:
+            shard.wait()
+        if not args.socket_dir:
+            shutil.rmtree(socket_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
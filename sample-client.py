@@ -62,10 +62,15 @@ def create_sample_resources():
     
     # Clear any existing resources first
     try:
-        existing_resources = requests.get(f"{BASE_URL}/resources/").json()
-        for resource in existing_resources:
-            requests.delete(f"{BASE_URL}/resources/{resource['id']}")
-        print(f"Cleared {len(existing_resources)} existing resources")
+        cleared = 0
+        while True:
+            existing_resources = requests.get(f"{BASE_URL}/resources/", params={"limit": 100}).json()
+            if not existing_resources:
+                break
+            for resource in existing_resources:
+                requests.delete(f"{BASE_URL}/resources/{resource['id']}")
+            cleared += len(existing_resources)
+        print(f"Cleared {cleared} existing resources")
     except Exception as e:
         print(f"Error clearing existing resources: {e}")
     
@@ -82,20 +87,22 @@ def create_sample_resources():
 
 def simulate_resource_access(resources, access_patterns):
     """Simulate access patterns to resources to affect their Memory Buoyancy"""
+    log_entries = []
     for resource_id, access_count in access_patterns.items():
         for _ in range(access_count):
-            log_data = {
+            log_entries.append({
                 "resource_id": resource_id,
                 "timestamp": datetime.now().isoformat(),
                 "access_type": "view"
-            }
-            response = requests.post(f"{BASE_URL}/access-log", json=log_data)
-            if response.status_code != 200:
-                print(f"Failed to log access: {response.text}")
+            })
     
-    # Update all metrics
-    requests.post(f"{BASE_URL}/update-metrics")
-    print("Updated all resource metrics")
+    # Log all events in one request; the server updates each resource's metrics once
+    response = requests.post(f"{BASE_URL}/access-log/batch", json=log_entries)
+    if response.status_code == 200:
+        result = response.json()
+        print(f"Logged {result['logged']} access events for {result['resources_updated']} resources")
+    else:
+        print(f"Failed to log access: {response.text}")
 
 def check_metrics():
     """Check current metrics for all resources"""
@@ -137,7 +144,11 @@ def check_managed_forgetting_recommendations():
 
 def demonstrate_intelligent_condensation():
     """Demonstrate the concept of intelligent condensation based on Memory Buoyancy"""
-    response = requests.get(f"{BASE_URL}/resources/")
+    # Listings leave out the content unless it is requested
+    response = requests.get(
+        f"{BASE_URL}/resources/",
+        params={"fields": "id,title,content,memory_buoyancy,preservation_value"}
+    )
     if response.status_code == 200:
         resources = response.json()
         
@@ -190,59 +201,59 @@ def demonstrate_intelligent_condensation():
                 preview = f"[Condensed content: {len(content)} characters]"
             else:
                 preview = "[Archived content - reference only]"
-                
+            
             print(f"   Content Preview: {preview}")
 
 def demonstrate_contextual_organization():
     """Demonstrate contextual organization of resources"""
-    response = requests.get(f"{BASE_URL}/resources/")
+    response = requests.get(f"{BASE_URL}/resources/facets")
     if response.status_code == 200:
-        resources = response.json()
+        facets = response.json()
+        summary_fields = {"fields": "title,memory_buoyancy,preservation_value"}
         
         print("\nContextual Organization Simulation:")
         print("-" * 80)
         
-        # Build a simplified semantic context graph
-        contexts = {}
-        
-        # Group by tags (simplified semantic clustering)
-        tag_groups = {}
-        for resource in resources:
-            for tag in resource["tags"]:
-                if tag not in tag_groups:
-                    tag_groups[tag] = []
-                tag_groups[tag].append(resource)
-        
-        # Show tag-based organization
+        # Group by tags (simplified semantic clustering); the server keeps
+        # an index of the resources carrying each tag
         print("Tag-Based Clusters:")
-        for tag, items in tag_groups.items():
-            if len(items) > 1:  # Only show meaningful clusters
-                print(f"\n  [{tag.upper()}] Related Resources:")
+        for facet in facets["tags"]:
+            if facet["count"] > 1:  # Only show meaningful clusters
+                print(f"\n  [{facet['tag'].upper()}] Related Resources "
+                      f"(mean MB: {facet['mean_memory_buoyancy']:.2f}, mean PV: {facet['mean_preservation_value']:.2f}):")
+                items = requests.get(f"{BASE_URL}/resources/", params=dict(summary_fields, tag=facet["tag"])).json()
                 for item in items:
                     print(f"    - {item['title']} (MB: {item['memory_buoyancy']:.2f}, PV: {item['preservation_value']:.2f})")
         
+        # Resources with similar (not only shared) tags, clustered by the server
+        print("\nSimilar Tag Sets:")
+        clusters = requests.get(
+            f"{BASE_URL}/resources/clusters", params=dict(summary_fields, by="tags", min_similarity=0.2)
+        ).json()
+        if not clusters:
+            print("  No resources with similar tags")
+        for number, cluster in enumerate(clusters, start=1):
+            print(f"\n  [CLUSTER {number}] {cluster['size']} resources:")
+            for item in cluster["resources"]:
+                print(f"    - {item['title']} (MB: {item['memory_buoyancy']:.2f}, PV: {item['preservation_value']:.2f})")
+        
         # Content type organization
         print("\nContent Type Organization:")
-        type_groups = {}
-        for resource in resources:
-            content_type = resource["content_type"]
-            if content_type not in type_groups:
-                type_groups[content_type] = []
-            type_groups[content_type].append(resource)
-        
-        for content_type, items in type_groups.items():
-            print(f"\n  [{content_type.upper()}] Resources:")
+        for facet in facets["content_types"]:
+            print(f"\n  [{facet['content_type'].upper()}] Resources:")
+            items = requests.get(f"{BASE_URL}/resources/", params=dict(summary_fields, content_type=facet["content_type"])).json()
             for item in items:
                 print(f"    - {item['title']} (MB: {item['memory_buoyancy']:.2f}, PV: {item['preservation_value']:.2f})")
         
         # Temporal organization (simulation - in real system would use actual timestamps)
+        top_fields = {"k": 2, "fields": "title,access_count,memory_buoyancy,preservation_value"}
         print("\nTemporal Organization:")
         print("  [RECENT] Frequently accessed resources:")
-        for resource in sorted(resources, key=lambda x: x["memory_buoyancy"], reverse=True)[:2]:
+        for resource in requests.get(f"{BASE_URL}/resources/top", params=dict(top_fields, rank_by="mb")).json():
             print(f"    - {resource['title']} (Last accessed: recently, Access count: {resource['access_count']})")
         
         print("\n  [HISTORICAL] Infrequently accessed but preserved resources:")
-        for resource in sorted(resources, key=lambda x: x["preservation_value"] - x["memory_buoyancy"], reverse=True)[:2]:
+        for resource in requests.get(f"{BASE_URL}/resources/top", params=dict(top_fields, rank_by="pv-mb")).json():
             print(f"    - {resource['title']} (Access count: {resource['access_count']}, Preservation value: {resource['preservation_value']:.2f})")
 
 def main():